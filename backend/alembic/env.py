@@ -16,6 +16,9 @@ sys.path.insert(0, app_path)
 from app.db.base import Base
 from app.models.user import User
 from app.models.TokenLLM import TokenLLM
+from app.models.TrafficHistory import TrafficHistory
+from app.models.TrafficRollup import TrafficRollupMinute, TrafficRollupHour, TrafficRollupDay
+from app.models.VehicleEvent import VehicleEvent
 from app.core.config import settings_server
 
 # this is the Alembic Config object, which provides
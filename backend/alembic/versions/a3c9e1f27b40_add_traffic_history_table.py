@@ -0,0 +1,39 @@
+"""Add traffic_history table
+
+Revision ID: a3c9e1f27b40
+Revises: 54be4477c094
+Create Date: 2026-10-18 09:12:31.418205
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e1f27b40'
+down_revision: Union[str, Sequence[str], None] = '54be4477c094'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('traffic_history',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('road_name', sa.String(length=100), nullable=False),
+    sa.Column('recorded_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('car_count', sa.Float(), nullable=False),
+    sa.Column('motor_count', sa.Float(), nullable=False),
+    sa.Column('car_speed', sa.Float(), nullable=False),
+    sa.Column('motor_speed', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_traffic_history_road_recorded_at', 'traffic_history', ['road_name', 'recorded_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_traffic_history_road_recorded_at', table_name='traffic_history')
+    op.drop_table('traffic_history')
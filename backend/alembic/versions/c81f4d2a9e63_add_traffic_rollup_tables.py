@@ -0,0 +1,64 @@
+"""Add traffic rollup tables
+
+Revision ID: c81f4d2a9e63
+Revises: a3c9e1f27b40
+Create Date: 2026-10-18 14:37:05.902114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c81f4d2a9e63'
+down_revision: Union[str, Sequence[str], None] = 'a3c9e1f27b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tên bảng -> độ dài bucket (giây), trùng với RESOLUTIONS của HistoryStore
+ROLLUP_TABLES = {
+    'traffic_rollup_minute': 60,
+    'traffic_rollup_hour': 3600,
+    'traffic_rollup_day': 86400,
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table_name, seconds in ROLLUP_TABLES.items():
+        op.create_table(table_name,
+        sa.Column('road_name', sa.String(length=100), nullable=False),
+        sa.Column('bucket', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('samples', sa.Integer(), nullable=False),
+        sa.Column('car_count_sum', sa.Float(), nullable=False),
+        sa.Column('motor_count_sum', sa.Float(), nullable=False),
+        sa.Column('car_speed_sum', sa.Float(), nullable=False),
+        sa.Column('car_speed_samples', sa.Integer(), nullable=False),
+        sa.Column('motor_speed_sum', sa.Float(), nullable=False),
+        sa.Column('motor_speed_samples', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('road_name', 'bucket')
+        )
+        # Tổng hợp lịch sử đã ghi trước khi có rollup, bucket căn theo epoch giống HistoryStore.bucket_start
+        op.execute(f"""
+            INSERT INTO {table_name} (road_name, bucket, samples, car_count_sum, motor_count_sum,
+                                      car_speed_sum, car_speed_samples, motor_speed_sum, motor_speed_samples)
+            SELECT road_name,
+                   to_timestamp(floor(extract(epoch FROM recorded_at) / {seconds}) * {seconds}),
+                   count(*),
+                   sum(car_count),
+                   sum(motor_count),
+                   coalesce(sum(car_speed) FILTER (WHERE car_speed > 0), 0),
+                   count(*) FILTER (WHERE car_speed > 0),
+                   coalesce(sum(motor_speed) FILTER (WHERE motor_speed > 0), 0),
+                   count(*) FILTER (WHERE motor_speed > 0)
+            FROM traffic_history
+            GROUP BY 1, 2
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name in reversed(list(ROLLUP_TABLES)):
+        op.drop_table(table_name)
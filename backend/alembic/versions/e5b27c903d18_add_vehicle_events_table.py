@@ -0,0 +1,39 @@
+"""Add vehicle_events table
+
+Revision ID: e5b27c903d18
+Revises: c81f4d2a9e63
+Create Date: 2026-10-18 17:05:48.227361
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b27c903d18'
+down_revision: Union[str, Sequence[str], None] = 'c81f4d2a9e63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('vehicle_events',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('road_name', sa.String(length=100), nullable=False),
+    sa.Column('track_id', sa.BigInteger(), nullable=False),
+    sa.Column('vehicle', sa.String(length=20), nullable=False),
+    sa.Column('entered_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('left_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('speed', sa.Float(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_vehicle_events_road_left_at', 'vehicle_events', ['road_name', 'left_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_vehicle_events_road_left_at', table_name='vehicle_events')
+    op.drop_table('vehicle_events')
@@ -1 +1 @@
-from api.v1 import api_auth, api_chatbot, api_vehicles_frames, state, api_user, api_admin
\ No newline at end of file
+from api.v1 import api_auth, api_chatbot, api_vehicles_frames, state, api_user, api_admin, api_metrics, api_history
\ No newline at end of file
@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta, timezone
+from typing import List
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from api.v1 import state
+from services.history_services.HistoryStore import HistoryRetention, query_history
+from services.history_services.HistoryExport import EXPORT_FORMATS, export_stream, export_tables
+from services.history_services import HistoryExport
+from core.config import settings_history
+from utils.jwt_handler import get_current_user
+
+router = APIRouter()
+
+
+@router.on_event("startup")
+def start_up():
+    if state.history_retention is None and settings_history.HISTORY_ENABLED:
+        state.history_retention = HistoryRetention()
+        state.history_retention.start()
+
+
+@router.on_event("shutdown")
+async def shut_down():
+    if state.history_retention is not None:
+        await state.history_retention.stop()
+        state.history_retention = None
+
+
+def _as_utc(value: datetime) -> datetime:
+    """Thời điểm không có múi giờ được hiểu là UTC"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+async def _history_response(road_names: list, start: datetime, end: datetime, step: int):
+    unknown = [name for name in road_names if name not in state.analyzer.names]
+    if unknown:
+        return JSONResponse(content={"error": f"Không tìm thấy tuyến đường {', '.join(unknown)}"}, status_code=404)
+    end = _as_utc(end) if end is not None else datetime.now(timezone.utc)
+    start = _as_utc(start) if start is not None else end - timedelta(seconds=settings_history.HISTORY_DEFAULT_RANGE)
+    try:
+        return JSONResponse(content=await query_history(road_names, start, end, step))
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    except Exception as e:
+        return JSONResponse(content={"error": f"Lỗi khi truy vấn lịch sử: {e}"}, status_code=500)
+
+
+@router.get(path='/history')
+async def get_history(roads: List[str] = Query(default=None), start: datetime = None, end: datetime = None,
+                      step: int = None):
+    """
+    Lịch sử số xe và tốc độ trung bình của nhiều tuyến đường (?roads=A&roads=B, mặc định tất cả) trong [start, end).
+    start/end theo ISO 8601 (không có múi giờ = UTC), mặc định HISTORY_DEFAULT_RANGE giây gần nhất.
+    step (giây, bội số của 60) là độ dài mỗi điểm, bỏ trống thì tự chọn để không quá HISTORY_MAX_POINTS điểm.
+    Mức rollup đã bị xoá theo HISTORY_RETENTION_DAYS thì step phải là bội số của mức còn dữ liệu (vd giờ).
+    Dữ liệu đọc từ mức rollup (phút/giờ/ngày) phù hợp nên thời gian truy vấn không tăng theo lượng lịch sử đã lưu.
+    """
+    return await _history_response(roads or list(state.analyzer.names), start, end, step)
+
+
+@router.get(path='/history/{road_name}')
+async def get_history_road(road_name: str, start: datetime = None, end: datetime = None, step: int = None):
+    """
+    Lịch sử số xe và tốc độ trung bình của tuyến đường road_name, tham số như /history.
+    """
+    return await _history_response([road_name], start, end, step)
+
+
+@router.get(path='/export/{kind}')
+async def export_history(kind: str, roads: List[str] = Query(default=None), start: datetime = None,
+                         end: datetime = None, format: str = "parquet", current_user=Depends(get_current_user)):
+    """
+    Stream file Parquet hoặc Arrow IPC (format=parquet|arrow) của lịch sử giao thông để phân tích offline.
+    kind: history (thông tin phương tiện theo time_step), minute/hour/day (rollup), events (từng phương tiện).
+    roads, start, end như /history. Dữ liệu được đọc và ghi theo từng đoạn thời gian nên không bị giữ hết trong
+    bộ nhớ. File Arrow mở được bằng memory map (pyarrow.memory_map). Cần xác thực JWT như /roads_name.
+    """
+    if HistoryExport.pa is None:
+        return JSONResponse(content={"error": "Server chưa cài pyarrow"}, status_code=501)
+    if kind not in export_tables():
+        return JSONResponse(content={"error": f"kind không hợp lệ, chọn một trong {list(export_tables())}"},
+                            status_code=400)
+    if format not in EXPORT_FORMATS:
+        return JSONResponse(content={"error": f"format không hợp lệ, chọn một trong {list(EXPORT_FORMATS)}"},
+                            status_code=400)
+    unknown = [name for name in roads or [] if name not in state.analyzer.names]
+    if unknown:
+        return JSONResponse(content={"error": f"Không tìm thấy tuyến đường {', '.join(unknown)}"}, status_code=404)
+    end = _as_utc(end) if end is not None else datetime.now(timezone.utc)
+    start = _as_utc(start) if start is not None else end - timedelta(seconds=settings_history.HISTORY_DEFAULT_RANGE)
+    if not start < end or (end - start).total_seconds() > settings_history.HISTORY_MAX_RANGE:
+        return JSONResponse(content={"error": f"Khoảng thời gian không hợp lệ (tối đa "
+                                              f"{settings_history.HISTORY_MAX_RANGE} giây)"}, status_code=400)
+    media_type, extension = EXPORT_FORMATS[format]
+    filename = f"{kind}_{start:%Y%m%dT%H%M}_{end:%Y%m%dT%H%M}{extension}"
+    return StreamingResponse(export_stream(kind, format, start, end, roads), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
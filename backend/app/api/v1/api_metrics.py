@@ -0,0 +1,134 @@
+import time
+from fastapi import APIRouter
+from fastapi.responses import Response
+from api.v1 import state
+from services.stream_services.LoopLagMonitor import LoopLagMonitor
+from core.config import settings_monitoring
+from utils.prometheus import PrometheusText, CONTENT_TYPE
+
+router = APIRouter()
+
+
+@router.on_event("startup")
+def start_up():
+    if state.loop_monitor is None:
+        state.loop_monitor = LoopLagMonitor(interval=settings_monitoring.LOOP_LAG_INTERVAL)
+        state.loop_monitor.start()
+
+
+@router.on_event("shutdown")
+async def shut_down():
+    if state.loop_monitor is not None:
+        await state.loop_monitor.stop()
+        state.loop_monitor = None
+
+
+def _road_metrics(metrics: PrometheusText, now: float):
+    """Metric của các process con xử lý video, đọc từ vùng nhớ chia sẻ của từng tuyến đường"""
+    roads = {}
+    for name in state.analyzer.names:
+        stats = state.analyzer.get_road_stats(name)
+        if stats is not None:
+            roads[name] = stats
+
+    def samples(key):
+        return [({"road": name}, stats[key]) for name, stats in roads.items()]
+
+    metrics.add("worker_up", "gauge", "Process con xử lý video của tuyến đường còn chạy (1) hay không (0)",
+                [({"road": name}, int(stats["alive"])) for name, stats in roads.items()])
+    metrics.add("frames_processed_total", "counter", "Số frame đã xử lý", samples("frames_processed"))
+    metrics.add("frames_dropped_total", "counter", "Số frame lỗi khi xử lý hoặc publish", samples("frames_dropped"))
+    metrics.add("frames_skipped_total", "counter", "Số frame bỏ qua vì trễ so với nhịp của video",
+                samples("frames_skipped"))
+    metrics.add("source_connected", "gauge", "Nguồn frame (camera) đang có kết nối", samples("source_connected"))
+    metrics.add("source_reconnects_total", "counter", "Số lần kết nối lại camera", samples("source_reconnects"))
+    metrics.add("detections_total", "counter", "Số frame đã chạy detect", samples("detections"))
+    metrics.add("tracks_stored", "gauge", "Số track đang giữ trạng thái (tốc độ, lịch sử vị trí)",
+                samples("tracks_stored"))
+    metrics.add("tracks_evicted_total", "counter", "Số track bị xoá vì không xuất hiện quá TRACK_TTL frame",
+                samples("tracks_evicted"))
+    metrics.add("motion_checks_total", "counter", "Số frame được MotionGate kiểm tra trước khi detect",
+                samples("motion_checks"))
+    metrics.add("motion_skipped_total", "counter", "Số frame bỏ qua detect vì region không có chuyển động",
+                samples("motion_skipped"))
+    metrics.add("motion_skip_ratio", "gauge", "Tỉ lệ frame bỏ qua detect trên số frame MotionGate kiểm tra",
+                [({"road": name}, stats["motion_skipped"] / stats["motion_checks"] if stats["motion_checks"] else 0)
+                 for name, stats in roads.items()])
+    metrics.add("pipeline_queue_depth", "gauge", "Số frame đang chờ trong hàng đợi giữa các thread của process con",
+                [({"road": name, "queue": queue}, stats[f"{queue}_queue_depth"])
+                 for name, stats in roads.items() for queue in ("decode", "render")])
+    metrics.add("pipeline_queue_dropped_total", "counter", "Số frame bị bỏ vì công đoạn sau của pipeline không kịp xử lý",
+                [({"road": name, "queue": queue}, stats[f"{queue}_queue_dropped"])
+                 for name, stats in roads.items() for queue in ("decode", "render")])
+    metrics.add("processing_fps", "gauge", "Số frame xử lý mỗi giây", samples("processing_fps"))
+    metrics.add("inference_fps", "gauge", "Số frame chạy detect mỗi giây", samples("inference_fps"))
+    metrics.add("publish_age_seconds", "gauge", "Thời gian từ lúc capture frame mới nhất đã publish tới hiện tại",
+                [({"road": name}, now - stats["frame_timestamp"] if stats["frame_id"] else None)
+                 for name, stats in roads.items()])
+    metrics.add("stats_age_seconds", "gauge", "Thời gian từ lần cuối process con ghi thống kê (worker bị treo nếu tăng mãi)",
+                [({"road": name}, now - stats["updated_at"] if stats["updated_at"] else None)
+                 for name, stats in roads.items()])
+
+    traffic = {name: state.analyzer.get_traffic_windows(name) for name in roads}
+    window_samples = [
+        ({"road": name, "vehicle": vehicle, "window": f"{seconds}s"}, values)
+        for name, data in traffic.items() if data is not None and data["updated_at"]
+        for seconds, vehicles in data["windows"].items() for vehicle, values in vehicles.items()
+    ]
+    metrics.add("vehicle_count", "gauge", "Số xe trung bình trong vùng theo cửa sổ trượt",
+                [(labels, values["count"]) for labels, values in window_samples])
+    metrics.add("vehicle_speed_kmh", "gauge", "Tốc độ (km/h) trung bình, p50, p85 theo cửa sổ trượt",
+                [({**labels, "stat": stat}, values[f"speed_{stat}"])
+                 for labels, values in window_samples for stat in ("mean", "p50", "p85")])
+
+    stage_samples = []
+    for name, stats in roads.items():
+        for stage, stage_stats in stats["stages"].items():
+            if not stage_stats["count"]:
+                continue
+            labels = {"road": name, "stage": stage}
+            for quantile, value in stage_stats["quantiles"].items():
+                stage_samples.append(("", {**labels, "quantile": quantile}, value))
+            stage_samples.append(("_sum", labels, stage_stats["sum"]))
+            stage_samples.append(("_count", labels, stage_stats["count"]))
+    metrics.add("stage_duration_seconds", "summary", "Thời gian từng công đoạn của pipeline xử lý video", stage_samples)
+
+
+def _api_metrics(metrics: PrometheusText):
+    """Metric của process API: số client đang xem, hàng đợi gửi, hàng đợi ghi lịch sử, độ trễ event loop"""
+    hubs = {"frames": state.frame_hub, "info": state.info_hub}
+    names = state.analyzer.names if state.analyzer is not None else []
+    metrics.add("stream_subscribers", "gauge", "Số kết nối đang nhận dữ liệu của tuyến đường",
+                [({"road": name, "stream": stream}, hub.subscriber_count(name))
+                 for stream, hub in hubs.items() if hub is not None for name in names])
+    metrics.add("stream_queue_depth", "gauge", "Số phần tử đang chờ gửi trong hàng đợi của các kết nối",
+                [({"road": name, "stream": stream}, hub.queue_depth(name))
+                 for stream, hub in hubs.items() if hub is not None for name in names])
+    writers = {"traffic_history": state.history_writer, "vehicle_events": state.event_writer}
+    writers = {table: writer for table, writer in writers.items() if writer is not None}
+    metrics.add("history_rows_written_total", "counter", "Số dòng lịch sử đã ghi vào database",
+                [({"table": table}, writer.written) for table, writer in writers.items()])
+    metrics.add("history_rows_dropped_total", "counter", "Số dòng lịch sử bị bỏ vì hàng đợi ghi đầy",
+                [({"table": table}, writer.dropped) for table, writer in writers.items()])
+    metrics.add("history_rows_failed_total", "counter", "Số dòng lịch sử thuộc các lô ghi lỗi",
+                [({"table": table}, writer.failed) for table, writer in writers.items()])
+    metrics.add("history_queue_depth", "gauge", "Số dòng lịch sử đang chờ ghi",
+                [({"table": table}, writer.queue_depth()) for table, writer in writers.items()])
+    monitor = state.loop_monitor
+    metrics.add("event_loop_lag_seconds", "gauge", "Độ trễ event loop của API ở lần đo gần nhất",
+                [({}, monitor.lag if monitor is not None else None)])
+    metrics.add("event_loop_lag_max_seconds", "gauge", "Độ trễ event loop lớn nhất trong cửa sổ đo gần đây",
+                [({}, monitor.max_lag if monitor is not None else None)])
+
+
+@router.get(path='/metrics')
+async def get_metrics():
+    """
+    Metric vận hành theo Prometheus text format (KHÔNG xác thực JWT, giống /info): fps, số frame xử lý/lỗi,
+    tuổi frame đã publish, thời gian từng công đoạn của mỗi tuyến đường, số client, hàng đợi gửi, độ trễ event loop.
+    """
+    metrics = PrometheusText(prefix=settings_monitoring.METRICS_PREFIX)
+    if state.analyzer is not None:
+        _road_metrics(metrics, time.time())
+    _api_metrics(metrics)
+    return Response(content=metrics.render(), media_type=CONTENT_TYPE)
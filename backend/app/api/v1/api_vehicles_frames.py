@@ -2,8 +2,14 @@ from fastapi import APIRouter
 from fastapi.responses import JSONResponse
 from api.v1 import state
 import asyncio
+import json
+import time
 from services.road_services.AnalyzeOnRoadForMultiProcessing import AnalyzeOnRoadForMultiprocessing
-from fastapi.responses import Response
+from services.stream_services.BroadcastHub import BroadcastHub
+from services.stream_services.FrameClient import FrameClient
+from services.history_services.HistoryWriter import HistoryWriter, history_row, insert_vehicle_events, vehicle_event_rows
+from core.config import settings_streaming, settings_metric_transport, settings_history
+from fastapi.responses import Response, StreamingResponse
 from fastapi import WebSocket, WebSocketDisconnect, status, Request
 from utils.jwt_handler import get_current_user, get_user_by_token, decode_access_token          
 from db.base import AsyncSessionLocal
@@ -11,11 +17,87 @@ from fastapi import Depends
 
 router = APIRouter()
 
+def _read_frame(road_name: str):
+    packet = state.analyzer.get_frame_ladder(road_name)
+    if packet is None:
+        return None
+    return packet[0], packet
+
+def _invalid_variant(variant: str):
+    if variant in settings_metric_transport.FRAME_VARIANTS:
+        return None
+    return JSONResponse(
+        content={"error": f"variant không hợp lệ, chọn một trong {list(settings_metric_transport.FRAME_VARIANTS)}"},
+        status_code=400
+    )
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """Kiểm tra header If-None-Match của request có chứa etag hay không"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in [tag.strip().removeprefix("W/") for tag in header.split(",")]
+
+def _long_poll_timeout(timeout: float) -> float:
+    return min(max(timeout, 0.0), settings_streaming.LONG_POLL_MAX_TIMEOUT)
+
 @router.on_event("startup")
 def start_up():
     if state.analyzer is None:
         state.analyzer = AnalyzeOnRoadForMultiprocessing()
         state.analyzer.run_multiprocessing()
+    if state.frame_hub is None:
+        state.frame_hub = BroadcastHub(
+            get_version=state.analyzer.get_frame_id,
+            read=_read_frame,
+            poll_interval=settings_streaming.FRAME_POLL_INTERVAL,
+            queue_size=settings_streaming.SUBSCRIBER_QUEUE_SIZE,
+        )
+    if state.info_hub is None:
+        state.info_hub = BroadcastHub(
+            get_version=state.analyzer.get_info_version,
+            read=state.analyzer.get_info_packet,
+            poll_interval=settings_streaming.INFO_POLL_INTERVAL,
+            queue_size=settings_streaming.SUBSCRIBER_QUEUE_SIZE,
+        )
+    if state.history_writer is None and settings_history.HISTORY_ENABLED:
+        state.history_writer = HistoryWriter()
+        state.history_writer.start()
+    if state.event_writer is None and settings_history.HISTORY_ENABLED and settings_history.VEHICLE_EVENTS_ENABLED:
+        state.event_writer = HistoryWriter(sink=insert_vehicle_events)
+        state.event_writer.start()
+
+    # Process con báo có thông tin mới -> đánh thức producer của info_hub ngay trên event loop và gửi 1 dòng
+    # lịch sử cho history_writer (đọc shared memory ở thread nền, event loop chỉ nhận dòng đã dựng sẵn)
+    loop = asyncio.get_running_loop()
+
+    def on_info(road_name):
+        loop.call_soon_threadsafe(state.info_hub.notify, road_name)
+        if state.history_writer is not None:
+            row = history_row(road_name, state.analyzer.get_info_road(road_name))
+            loop.call_soon_threadsafe(state.history_writer.submit, row)
+
+    state.analyzer.start_info_listener(on_info)
+
+    def on_vehicle_events(road_name, departures):
+        if state.event_writer is not None:
+            loop.call_soon_threadsafe(state.event_writer.submit_many, vehicle_event_rows(road_name, departures))
+
+    state.analyzer.start_vehicle_event_listener(on_vehicle_events)
+
+@router.on_event("shutdown")
+async def shut_down():
+    for hub in (state.frame_hub, state.info_hub):
+        if hub is not None:
+            await hub.close()
+    if state.history_writer is not None:
+        await state.history_writer.close()
+        state.history_writer = None
+    if state.event_writer is not None:
+        await state.event_writer.close()
+        state.event_writer = None
 
 @router.get(path= '/roads_name')
 async def get_road_names(current_user=Depends(get_current_user)):
@@ -25,9 +107,13 @@ async def get_road_names(current_user=Depends(get_current_user)):
     return JSONResponse(content={"road_names": state.analyzer.names})
 
 @router.websocket("/ws/frames/{road_name}")
-async def websocket_frames(websocket: WebSocket, road_name: str):
+async def websocket_frames(websocket: WebSocket, road_name: str,
+                           variant: str = settings_metric_transport.DEFAULT_FRAME_VARIANT):
     """
     WebSocket endpoint truyền liên tục frame (byte code) của tuyến đường road_name.
+    Mọi client cùng xem 1 tuyến đường dùng chung 1 producer của frame_hub, mỗi frame mới chỉ được gửi 1 lần.
+    Mỗi client chỉ giữ frame mới nhất và tự điều chỉnh fps/chất lượng theo tốc độ mạng của nó.
+    Query parameter variant chọn kích thước ảnh (thumb, medium, full), mặc định là full.
     """
     await websocket.accept()
     token = (
@@ -48,20 +134,42 @@ async def websocket_frames(websocket: WebSocket, road_name: str):
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
     
+    if road_name not in state.analyzer.names:
+        await websocket.send_json({"detail": f"Không tìm thấy tuyến đường {road_name}"})
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if variant not in settings_metric_transport.FRAME_VARIANTS:
+        await websocket.send_json({"detail": f"variant không hợp lệ: {variant}"})
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    client = FrameClient(road_name, variant=variant)
     try:
-        while True:
-            frame_bytes = await asyncio.to_thread(state.analyzer.get_frame_road, road_name)
-            await websocket.send_bytes(frame_bytes)
-            await asyncio.sleep(1/30)
+        async with state.frame_hub.subscribe(road_name, client):
+            while True:
+                _, _, frames = await client.next_packet()
+                frame_bytes = frames[client.variant]
+                started = time.monotonic()
+                await asyncio.wait_for(websocket.send_bytes(frame_bytes), timeout=settings_streaming.SEND_TIMEOUT)
+                client.record_send(len(frame_bytes), time.monotonic() - started)
     except WebSocketDisconnect:
         pass
     except Exception as e:
         await websocket.close()
+
+@router.get(path='/streams/{road_name}/clients')
+async def get_stream_clients(road_name: str, current_user=Depends(get_current_user)):
+    """
+    Thống kê của từng kết nối đang xem frame tuyến đường road_name (bậc chất lượng, sent, dropped, fps thực tế).
+    """
+    clients = [client.as_dict() for client in state.frame_hub.subscribers(road_name)]
+    return JSONResponse(content={"road_name": road_name, "clients": clients})
         
 @router.websocket("/ws/info/{road_name}")
 async def websocket_info(websocket: WebSocket, road_name: str):
     """
-    WebSocket endpoint truyền liên tục info (thông tin phương tiện) của tuyến đường road_name.
+    WebSocket endpoint truyền info (thông tin phương tiện) của tuyến đường road_name mỗi khi process con cập nhật.
+    Ngay khi kết nối client nhận snapshot hiện tại, sau đó mỗi message mang version mới hơn message trước.
     """
     await websocket.accept()
     token = (
@@ -82,11 +190,15 @@ async def websocket_info(websocket: WebSocket, road_name: str):
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
     
+    if road_name not in state.analyzer.names:
+        await websocket.send_json({"detail": f"Không tìm thấy tuyến đường {road_name}"})
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
     try:
-        while True:
-            data = await asyncio.to_thread(state.analyzer.get_info_road, road_name)
-            await websocket.send_json(data)
-            await asyncio.sleep(5)
+        async with state.info_hub.subscribe(road_name) as subscription:
+            async for data in subscription:
+                await websocket.send_json(data)
     except WebSocketDisconnect:
         pass
     except Exception as e:
@@ -95,22 +207,106 @@ async def websocket_info(websocket: WebSocket, road_name: str):
 
 
 
+async def _info_event_stream(road_name: str):
+    """Generator Server-Sent Events: snapshot hiện tại khi kết nối, sau đó 1 event cho mỗi version mới"""
+    async with state.info_hub.subscribe(road_name) as subscription:
+        while True:
+            try:
+                data = await asyncio.wait_for(subscription.get(), timeout=settings_streaming.SSE_HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield f"id: {data['version']}\nevent: info\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.get(path='/sse/info/{road_name}')
+async def sse_info_road(road_name: str):
+    """
+    Server-Sent Events truyền info của tuyến đường road_name (KHÔNG xác thực JWT, giống /info) cho các client
+    không giữ được WebSocket. Event đầu tiên là snapshot hiện tại, các event sau được đẩy ngay khi có version mới.
+    """
+    if road_name not in state.analyzer.names:
+        return JSONResponse(content={"error": f"Không tìm thấy tuyến đường {road_name}"}, status_code=404)
+    return StreamingResponse(
+        _info_event_stream(road_name),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get(path='/info/{road_name}')
-async def get_info_road(road_name: str):
+async def get_info_road(road_name: str, request: Request, after: int = None,
+                        timeout: float = settings_streaming.LONG_POLL_TIMEOUT):
     """
     API trả về thông tin phương tiện của tuyến đường road_name (KHÔNG xác thực JWT).
+    Response có ETag / X-Info-Version, gửi lại If-None-Match sẽ nhận 304 nếu chưa có version mới.
+    Long-poll: ?after=<version> giữ request tới khi có version > after hoặc hết timeout (trả 304).
     """
-    data = await asyncio.to_thread(state.analyzer.get_info_road, road_name)
-    if data is None:
+    if road_name not in state.analyzer.names:
+        return JSONResponse(content={"error": f"Không tìm thấy tuyến đường {road_name}"}, status_code=404)
+    if after is not None and state.analyzer.get_info_version(road_name) <= after:
+        await state.info_hub.wait_for_newer(road_name, after, _long_poll_timeout(timeout))
+    packet = state.analyzer.get_info_packet(road_name)
+    if packet is None:
         return JSONResponse(content={
             "Lỗi: Dữ liệu bị lỗi, kiểm tra road_services"
             }, status_code=500)
-    return JSONResponse(content=data)
+    version, data = packet
+    etag = f'"{version}"'
+    headers = {"ETag": etag, "X-Info-Version": str(version), "Cache-Control": "no-cache"}
+    if (after is not None and version <= after) or _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=data, headers=headers)
 
 
+@router.get(path='/info/{road_name}/windows')
+async def get_info_windows(road_name: str):
+    """
+    API trả về số xe trung bình, tốc độ trung bình, p50 và p85 của tuyến đường road_name theo từng cửa sổ trượt
+    (TRAFFIC_WINDOWS, ví dụ 10 giây, 1 phút, 5 phút), cập nhật mỗi STATS_INTERVAL giây (KHÔNG xác thực JWT, giống /info).
+    """
+    if road_name not in state.analyzer.names:
+        return JSONResponse(content={"error": f"Không tìm thấy tuyến đường {road_name}"}, status_code=404)
+    data = state.analyzer.get_traffic_windows(road_name)
+    data["windows"] = {f"{seconds}s": values for seconds, values in data["windows"].items()}
+    return JSONResponse(content=data, headers={"Cache-Control": "no-cache"})
+
+
+async def _frame_response(request: Request, road_name: str, variant: str, after: int, timeout: float):
+    """Response JPEG của 1 variant kèm ETag / X-Frame-Id, dùng chung cho /frames và /frames_no_auth"""
+    invalid = _invalid_variant(variant)
+    if invalid is not None:
+        return invalid
+    if road_name not in state.analyzer.names:
+        return JSONResponse(content={"error": f"Không tìm thấy tuyến đường {road_name}"}, status_code=404)
+    if after is not None and state.analyzer.get_frame_id(road_name) <= after:
+        await state.frame_hub.wait_for_newer(road_name, after, _long_poll_timeout(timeout))
+    packet = state.analyzer.get_frame_packet(road_name, variant)
+    if packet is None:
+        return JSONResponse(
+            content={"error": "Lỗi: Dữ liệu bị lỗi, kiểm tra core"},
+            status_code=500
+        )
+    frame_id, timestamp, frame_bytes = packet
+    etag = f'"{frame_id}-{variant}"'
+    headers = {
+        "ETag": etag,
+        "X-Frame-Id": str(frame_id),
+        "X-Frame-Timestamp": f"{timestamp:.3f}",
+        "Cache-Control": "no-cache",
+    }
+    if (after is not None and frame_id <= after) or _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=frame_bytes, media_type="image/jpeg", headers=headers)
+
 
 @router.get(path='/frames/{road_name}')
-async def get_frame_road(road_name: str, request: Request):
+async def get_frame_road(road_name: str, request: Request,
+                         variant: str = settings_metric_transport.DEFAULT_FRAME_VARIANT,
+                         after: int = None, timeout: float = settings_streaming.LONG_POLL_TIMEOUT):
+    """
+    Frame JPEG mới nhất của tuyến đường road_name. Hỗ trợ If-None-Match (304) và long-poll ?after=<frame_id>.
+    """
     # Chấp nhận token qua query string, cookie, hoặc header
     token = (
         request.query_params.get("token")
@@ -126,21 +322,57 @@ async def get_frame_road(road_name: str, request: Request):
             content={"error": "Unauthorized — missing or invalid token"},
             status_code=401
         )
-    frame_bytes = await asyncio.to_thread(state.analyzer.get_frame_road, road_name)
-    if frame_bytes is None:
-        return JSONResponse(
-            content={"error": "Lỗi: Dữ liệu bị lỗi, kiểm tra core"},
-            status_code=500
-        )
-    return Response(content=frame_bytes, media_type="image/jpeg")
+    return await _frame_response(request, road_name, variant, after, timeout)
 
 
 @router.get(path='/frames_no_auth/{road_name}')
-async def get_frame_road(road_name: str):
-    frame_bytes = await asyncio.to_thread(state.analyzer.get_frame_road, road_name)
-    if frame_bytes is None:
+async def get_frame_road_no_auth(road_name: str, request: Request,
+                                 variant: str = settings_metric_transport.DEFAULT_FRAME_VARIANT,
+                                 after: int = None, timeout: float = settings_streaming.LONG_POLL_TIMEOUT):
+    return await _frame_response(request, road_name, variant, after, timeout)
+
+
+async def _mjpeg_stream(road_name: str, variant: str, max_fps: float):
+    """Generator các part JPEG của luồng multipart/x-mixed-replace, dùng chung frame_hub với WebSocket"""
+    client = FrameClient(road_name, tiers=[(variant, max_fps)])
+    async with state.frame_hub.subscribe(road_name, client):
+        while True:
+            _, _, frames = await client.next_packet()
+            frame_bytes = frames[variant]
+            started = time.monotonic()
+            yield (b"--frame\r\nContent-Type: image/jpeg\r\nContent-Length: "
+                   + str(len(frame_bytes)).encode() + b"\r\n\r\n" + frame_bytes + b"\r\n")
+            client.record_send(len(frame_bytes), time.monotonic() - started)
+
+
+@router.get(path='/mjpeg/{road_name}')
+async def get_mjpeg_road(road_name: str, request: Request,
+                         variant: str = settings_metric_transport.DEFAULT_FRAME_VARIANT,
+                         max_fps: float = settings_streaming.MJPEG_MAX_FPS):
+    """
+    Luồng MJPEG (multipart/x-mixed-replace) của tuyến đường road_name, dùng được trực tiếp trong thẻ <img>,
+    VLC hoặc NVR với 1 kết nối duy nhất. max_fps bị giới hạn bởi MJPEG_MAX_FPS.
+    """
+    token = (
+        request.query_params.get("token")
+        or request.cookies.get("access_token")
+        or request.headers.get("authorization")
+    )
+    if token and token.lower().startswith("bearer "):
+        token = token.split(" ", 1)[1]
+    if not token or decode_access_token(token) is None:
         return JSONResponse(
-            content={"error": "Lỗi: Dữ liệu bị lỗi, kiểm tra core"},
-            status_code=500
+            content={"error": "Unauthorized — missing or invalid token"},
+            status_code=401
         )
-    return Response(content=frame_bytes, media_type="image/jpeg")
+    if road_name not in state.analyzer.names:
+        return JSONResponse(content={"error": f"Không tìm thấy tuyến đường {road_name}"}, status_code=404)
+    invalid = _invalid_variant(variant)
+    if invalid is not None:
+        return invalid
+    max_fps = min(max(max_fps, 0.1), settings_streaming.MJPEG_MAX_FPS)
+    return StreamingResponse(
+        _mjpeg_stream(road_name, variant, max_fps),
+        media_type="multipart/x-mixed-replace; boundary=frame",
+        headers={"Cache-Control": "no-cache, no-store", "Pragma": "no-cache"},
+    )
@@ -10,6 +10,17 @@ from services.chat_services.ChatBotAgent import ChatBotAgent
 
 # Phần states chính thức
 analyzer = None
+# Hub fan-out frame/info của từng tuyến đường tới các WebSocket client
+frame_hub = None
+info_hub = None
+# Ghi lịch sử thông tin phương tiện vào database theo lô
+history_writer = None
+# Ghi sự kiện từng phương tiện (vehicle_events) theo lô
+event_writer = None
+# Xoá lịch sử thô và rollup quá hạn giữ lại
+history_retention = None
+# Đo độ trễ event loop cho /metrics
+loop_monitor = None
 # chat_bot = None
 agent = None
 
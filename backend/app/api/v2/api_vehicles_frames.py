@@ -42,11 +42,16 @@ async def websocket_frames(websocket: WebSocket, road_name: str):
         await websocket.send_json({"detail": "Unauthorized — missing or invalid token"})
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
         return
+    if road_name not in state.analyzer.names:
+        await websocket.send_json({"error": f"Không tìm thấy tuyến đường {road_name}"})
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
     
     try:
         while True:
             frame_bytes = await asyncio.to_thread(state.analyzer.get_frame_road, road_name)
-            await websocket.send_bytes(frame_bytes)
+            if frame_bytes is not None:
+                await websocket.send_bytes(frame_bytes)
             await asyncio.sleep(1/30)
     except WebSocketDisconnect:
         pass
@@ -100,6 +105,8 @@ async def get_info_road(road_name: str):
 @router.get(path='/frames/{road_name}')
 async def get_frame_road(road_name: str):
     """API endpoint trả về frame (byte code) của tuyến đường road_name dưới dạng image/jpeg."""
+    if road_name not in state.analyzer.names:
+        return JSONResponse(content={"error": f"Không tìm thấy tuyến đường {road_name}"}, status_code=404)
     frame_bytes = await asyncio.to_thread(state.analyzer.get_frame_road, road_name)
     if frame_bytes is None:
         return JSONResponse(
@@ -0,0 +1,246 @@
+"""Benchmark pipeline xử lý video (không cần API, không hiển thị).
+
+Chạy AnalyzeOnRoad.process_on_single_video trên video có sẵn hoặc đoạn video giả lập (cố định theo seed) với
+1..N tuyến đường chạy đồng thời (mỗi tuyến đường 1 process như khi chạy thật). Kết quả gồm latency percentile
+từng công đoạn (decode, resize, motion, inference, tracking, drawing, encode, publish), fps duy trì, CPU, RSS của từng
+tuyến đường và đường cong scaling, ghi ra JSON để so sánh giữa các commit và các máy.
+
+Examples:
+    cd backend/app
+    python -m benchmarks.pipeline_benchmark --max-roads 4 --frames 300 --output bench.json
+    python -m benchmarks.pipeline_benchmark --videos "./video_test/Văn Quán.mp4" --backend onnx --stride 3
+    python -m benchmarks.pipeline_benchmark --max-roads 1 --imgsz 320
+    python -m benchmarks.pipeline_benchmark --max-roads 1 --no-pipelined
+    python -m benchmarks.pipeline_benchmark --max-roads 2 --realtime
+    python -m benchmarks.pipeline_benchmark --videos "stream+file://./video_test/Văn Phú.mp4" synthetic://1
+"""
+import argparse
+import json
+import os
+import platform
+import queue
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from multiprocessing import Process, Queue
+
+try:
+    import psutil  # type: ignore
+except Exception:  # pragma: no cover
+    psutil = None  # type: ignore
+
+from benchmarks.synthetic_clip import write_synthetic_clip
+from core.config import settings_metric_transport, settings_inference
+from services.inference_services.InferenceServer import InferenceServer
+from services.road_services.AnalyzeOnRoad import AnalyzeOnRoad
+from services.road_services.SharedRoadSlot import SharedRoadSlot
+from utils.transport_utils import region_crop_box, inference_size_for, shared_inference_size
+
+
+def _resource_usage() -> dict:
+    if psutil is None:
+        return {"cpu_seconds": None, "rss_mb": None}
+    process = psutil.Process()
+    cpu = process.cpu_times()
+    return {"cpu_seconds": cpu.user + cpu.system, "rss_mb": process.memory_info().rss / 2**20}
+
+
+def run_road(index, path_video, meter_per_pixel, region, frames, warmup, detection_stride, backend, imgsz, detector,
+             pipelined, realtime, results):
+    """Chạy 1 tuyến đường trong process riêng và gửi kết quả đo vào results"""
+    slot = SharedRoadSlot.create(
+        frame_capacities=SharedRoadSlot.capacities_for(settings_metric_transport.FRAME_VARIANTS))
+    try:
+        analyzer = AnalyzeOnRoad(
+            path_video=path_video,
+            meter_per_pixel=meter_per_pixel,
+            shared_slot=slot,
+            region=region,
+            show=False,
+            detector=detector,
+            detection_stride=detection_stride,
+            backend=backend,
+            imgsz=imgsz,
+        )
+        # Bỏ qua các frame đầu (load model, cache...) khỏi kết quả đo
+        analyzer.process_on_single_video(max_frames=warmup, pipelined=pipelined, realtime=realtime)
+        analyzer.timer.reset()
+
+        before = _resource_usage()
+        started = time.perf_counter()
+        analyzer.process_on_single_video(max_frames=frames, pipelined=pipelined, realtime=realtime)
+        elapsed = time.perf_counter() - started
+        after = _resource_usage()
+
+        processed = analyzer.timer.stage("frame").count
+        cpu_seconds = None
+        if before["cpu_seconds"] is not None:
+            cpu_seconds = after["cpu_seconds"] - before["cpu_seconds"]
+        results.put({
+            "road": index,
+            "video": path_video,
+            "frames": processed,
+            "seconds": round(elapsed, 3),
+            "fps": round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+            "imgsz": list(analyzer.imgsz),
+            "detections": analyzer.scheduler.detections,
+            "predictions": analyzer.scheduler.predictions,
+            "queue_dropped": {name: q.dropped for name, q in analyzer.stage_queues.items()} if pipelined else None,
+            "frames_skipped": analyzer.clock.skipped,
+            "motion_skip_rate": round(analyzer.motion_gate.skip_rate, 3) if analyzer.motion_gate is not None else None,
+            "cpu_seconds": None if cpu_seconds is None else round(cpu_seconds, 3),
+            "cpu_percent": None if cpu_seconds is None else round(cpu_seconds / elapsed * 100, 1),
+            "rss_mb": None if after["rss_mb"] is None else round(after["rss_mb"], 1),
+            "stages": analyzer.timer.summary(),
+        })
+    except Exception as e:
+        results.put({"road": index, "video": path_video, "error": str(e)})
+    finally:
+        slot.close()
+        slot.unlink()
+
+
+def run_concurrent(n_roads, videos, frames, warmup, detection_stride, backend, imgsz, use_inference_server,
+                   pipelined=settings_metric_transport.PIPELINED_WORKER, realtime=False) -> dict:
+    """Chạy đồng thời n_roads tuyến đường (các video được dùng lặp vòng) và tổng hợp kết quả"""
+    results = Queue()
+    servers = {}  # Tên backend -> InferenceServer dùng chung, giống AnalyzeOnRoadForMultiprocessing
+    processes = []
+    sizes = []
+    for index in range(n_roads):
+        region = settings_metric_transport.REGIONS[index % len(settings_metric_transport.REGIONS)]
+        size = imgsz
+        if size is None:
+            size = settings_metric_transport.INFERENCE_SIZES[index % len(settings_metric_transport.INFERENCE_SIZES)]
+        crop_box = region_crop_box(region, settings_metric_transport.FRAME_SIZE,
+                                   settings_metric_transport.REGION_CROP_MARGIN)
+        sizes.append(inference_size_for(crop_box, settings_inference.IMGSZ if size is None else size))
+    if use_inference_server:
+        servers[backend] = InferenceServer(backend=backend, imgsz=shared_inference_size(sizes))
+    for index, size in enumerate(sizes):
+        region = settings_metric_transport.REGIONS[index % len(settings_metric_transport.REGIONS)]
+        detector = servers[backend].create_client() if use_inference_server else None
+        processes.append(Process(target=run_road, args=(
+            index,
+            videos[index % len(videos)],
+            settings_metric_transport.METER_PER_PIXELS[index % len(settings_metric_transport.METER_PER_PIXELS)],
+            region, frames, warmup, detection_stride, backend, size, detector, pipelined, realtime, results,
+        )))
+    for server in servers.values():
+        server.start()
+    try:
+        for p in processes:
+            p.start()
+        roads = []
+        while len(roads) < len(processes):
+            try:
+                roads.append(results.get(timeout=1))
+            except queue.Empty:
+                # InferenceServer chết (ví dụ không load được model) thì các tuyến đường không bao giờ xong
+                if any(not server.process.is_alive() for server in servers.values()):
+                    raise RuntimeError(f"InferenceServer ({backend}) đã dừng, kiểm tra log phía trên")
+        for p in processes:
+            p.join()
+    finally:
+        for p in processes:
+            if p.is_alive():
+                p.terminate()
+        for server in servers.values():
+            server.stop()
+
+    roads.sort(key=lambda road: road["road"])
+    ok = [road for road in roads if "error" not in road]
+    return {
+        "roads": n_roads,
+        "total_fps": round(sum(road["fps"] for road in ok), 2),
+        "min_road_fps": min((road["fps"] for road in ok), default=0.0),
+        "total_rss_mb": round(sum(road["rss_mb"] or 0 for road in ok), 1),
+        "per_road": roads,
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline xử lý video theo từng công đoạn")
+    parser.add_argument("--videos", nargs="*", default=None,
+                        help="Các nguồn frame (file, thư mục ảnh, rtsp://, stream+file://, synthetic://), "
+                             "bỏ trống để dùng đoạn video giả lập")
+    parser.add_argument("--max-roads", type=int, default=len(settings_metric_transport.PATH_VIDEOS),
+                        help="Đo scaling với 1..N tuyến đường chạy đồng thời")
+    parser.add_argument("--frames", type=int, default=300, help="Số frame đo của mỗi tuyến đường")
+    parser.add_argument("--warmup", type=int, default=30, help="Số frame chạy trước khi đo")
+    parser.add_argument("--stride", type=int, default=1, help="Số frame giữa 2 lần chạy detect")
+    parser.add_argument("--backend", default=settings_inference.DEFAULT_BACKEND,
+                        help="Backend suy luận (openvino, onnx, ncnn, mnn, ultralytics)")
+    parser.add_argument("--imgsz", type=int, nargs="+", default=None,
+                        help="Kích thước đầu vào model: 1 số = cạnh dài theo tỉ lệ vùng crop, 2 số = height width. "
+                             "Bỏ trống để dùng INFERENCE_SIZES")
+    parser.add_argument("--inference-server", action=argparse.BooleanOptionalAction,
+                        default=settings_inference.USE_INFERENCE_SERVER,
+                        help="Dùng InferenceServer chung thay vì mỗi tuyến đường 1 model")
+    parser.add_argument("--pipelined", action=argparse.BooleanOptionalAction,
+                        default=settings_metric_transport.PIPELINED_WORKER,
+                        help="Chạy decode, suy luận và vẽ + encode trên các thread riêng thay vì tuần tự")
+    parser.add_argument("--realtime", action=argparse.BooleanOptionalAction, default=False,
+                        help="Phát video đúng fps gốc (trễ thì bỏ frame) thay vì đọc nhanh nhất có thể")
+    parser.add_argument("--seed", type=int, default=0, help="Seed của đoạn video giả lập")
+    parser.add_argument("--output", default=None, help="File JSON kết quả, bỏ trống để in ra stdout")
+    args = parser.parse_args(argv)
+
+    imgsz = args.imgsz[0] if args.imgsz and len(args.imgsz) == 1 else args.imgsz
+    videos = args.videos
+    if not videos:
+        clip = os.path.join(tempfile.gettempdir(), f"synthetic_traffic_{args.seed}.mp4")
+        videos = [write_synthetic_clip(clip, n_frames=args.frames + args.warmup, seed=args.seed)]
+
+    runs = []
+    for n_roads in range(1, args.max_roads + 1):
+        print(f"Đang đo {n_roads} tuyến đường...", file=sys.stderr)
+        runs.append(run_concurrent(n_roads, videos, args.frames, args.warmup, args.stride, args.backend, imgsz,
+                                   args.inference_server, args.pipelined, args.realtime))
+        print(f"  {runs[-1]['total_fps']} fps tổng", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "host": platform.node(),
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "videos": videos if args.videos else ["synthetic"],
+            "seed": args.seed,
+            "frames": args.frames,
+            "warmup": args.warmup,
+            "detection_stride": args.stride,
+            "backend": args.backend,
+            "imgsz": imgsz,
+            "inference_server": args.inference_server,
+            "pipelined": args.pipelined,
+            "realtime": args.realtime,
+            "frame_size": list(settings_metric_transport.FRAME_SIZE),
+        },
+        "scaling": [{"roads": run["roads"], "total_fps": run["total_fps"], "min_road_fps": run["min_road_fps"]}
+                    for run in runs],
+        "runs": runs,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
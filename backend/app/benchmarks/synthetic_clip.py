@@ -0,0 +1,47 @@
+import cv2
+import numpy as np
+from core.config import settings_metric_transport
+
+
+def render_synthetic_frame(index: int, size=settings_metric_transport.FRAME_SIZE, seed: int = 0,
+                           n_vehicles: int = 12) -> np.ndarray:
+    """Vẽ frame thứ index của 1 đoạn video giao thông giả lập, cùng (index, size, seed) luôn cho cùng 1 ảnh
+
+    Args:
+        index (int): Số thứ tự frame
+        size (tuple): Kích thước (width, height)
+        seed (int): Seed sinh vị trí, tốc độ, màu của các xe
+        n_vehicles (int): Số xe trên đường
+    """
+    width, height = size
+    rng = np.random.RandomState(seed)
+    frame = np.full((height, width, 3), 90, dtype=np.uint8)
+    lanes = np.linspace(height * 0.35, height * 0.9, 5)
+    for y in lanes[1:-1]:
+        for x in range(0, width, 40):
+            cv2.line(frame, (x, int(y)), (x + 20, int(y)), (230, 230, 230), 2)
+
+    for _ in range(n_vehicles):
+        lane = rng.randint(0, len(lanes) - 1)
+        is_car = rng.rand() < 0.4
+        w, h = (rng.randint(50, 80), rng.randint(30, 45)) if is_car else (rng.randint(18, 28), rng.randint(28, 40))
+        speed = rng.uniform(2, 8) * (1 if lane % 2 == 0 else -1)
+        offset = rng.uniform(0, width + 200)
+        color = tuple(int(c) for c in rng.randint(30, 255, size=3))
+        x = int((offset + speed * index) % (width + 200)) - 100
+        y = int((lanes[lane] + lanes[lane + 1]) / 2 - h / 2)
+        cv2.rectangle(frame, (x, y), (x + w, y + h), color, -1)
+        cv2.rectangle(frame, (x + w // 5, y + h // 5), (x + w - w // 5, y + h // 2), (40, 40, 40), -1)
+    return frame
+
+
+def write_synthetic_clip(path: str, n_frames: int = 300, fps: int = 30, size=settings_metric_transport.FRAME_SIZE,
+                         seed: int = 0) -> str:
+    """Ghi đoạn video giả lập ra file mp4 để benchmark cả công đoạn decode"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    try:
+        for index in range(n_frames):
+            writer.write(render_synthetic_frame(index, size, seed))
+    finally:
+        writer.release()
+    return path
@@ -12,6 +12,8 @@ class SettingServer:
     ACCESS_TOKEN_EXPIRE_DAYS = int(os.getenv("ACCESS_TOKEN_EXPIRE_DAYS"))
 
 class SettingMetricTransport:
+    # Vùng phân tích của từng tuyến đường, chỉ phương tiện có tâm nằm trong vùng mới được đếm và tính tốc độ.
+    # 1 camera có nhiều vùng thì dùng dict tên vùng -> đa giác, ví dụ {"chieu_di": np.array(...), "chieu_ve": ...}
     REGIONS = [
         np.array([[50, 400], [50, 265], [370, 130], [540, 130], [490, 400]]),
         np.array([[230, 400], [90, 260], [350, 200], [600, 320], [600, 400]]),
@@ -20,6 +22,9 @@ class SettingMetricTransport:
         # np.array([[50, 400], [50, 320], [390, 130], [550, 220], [480, 400]]),
     ]
 
+    # Nguồn frame của từng tuyến đường: file video (hết thì phát lại), thư mục ảnh, camera "rtsp://..." / "http://...",
+    # "stream+file://<file>" (file phát như camera live để thử ở local), "synthetic://<seed>" (video giả lập).
+    # Tên tuyến đường lấy từ tên file / thư mục hoặc host + path của camera
     PATH_VIDEOS = [
         "./video_test/Văn Quán.mp4",
         "./video_test/Văn Phú.mp4",
@@ -28,6 +33,9 @@ class SettingMetricTransport:
         # "./video_test/Đường Láng.mp4",
     ]
 
+    # Quy đổi pixel ra mét của từng tuyến đường: 1 tỉ lệ mét/pixel cho cả ảnh, hoặc homography từ 4 điểm trên frame
+    # tới 4 điểm đo ngoài thực tế (mét) khi camera nhìn xiên, ví dụ
+    # {"image": [[180, 400], [480, 400], [390, 140], [300, 140]], "world": [[0, 0], [7, 0], [7, 40], [0, 40]]}
     METER_PER_PIXELS = [0.03,
                         0.09,
                         # 0.5,
@@ -38,6 +46,184 @@ class SettingMetricTransport:
 
     DEVICE = 'cpu'
 
+    # Backend suy luận của từng tuyến đường (openvino, onnx, ncnn, mnn, ultralytics), xem SettingInference.MODEL_PATHS.
+    # Các tuyến đường dùng chung 1 backend sẽ dùng chung 1 InferenceServer
+    INFERENCE_BACKENDS = ["openvino",
+                          "openvino",
+                          # "openvino",
+                          # "openvino",
+                          # "openvino"
+                          ]
+
+    # Số frame giữa 2 lần chạy model detect của từng tuyến đường (1 = detect mọi frame), các frame ở giữa chỉ
+    # đẩy track bằng Kalman filter của ByteTrack
+    DETECTION_STRIDES = [3,
+                         3,
+                         # 3,
+                         # 3,
+                         # 3
+                         ]
+
+    # Kích thước ảnh đầu vào model của từng tuyến đường. Ảnh đưa vào model là vùng crop theo bounding box của
+    # REGIONS (cộng REGION_CROP_MARGIN). Số nguyên = cạnh dài, cạnh còn lại theo tỉ lệ vùng crop (làm tròn lên bội
+    # số 32, ví dụ 320/416/480), tuple (height, width) = cố định, None = settings_inference.IMGSZ
+    INFERENCE_SIZES = [480,
+                       480,
+                       # 480,
+                       # 480,
+                       # 480
+                       ]
+    REGION_CROP_MARGIN = 10
+
+    # Chạy decode, suy luận và vẽ + encode + publish của mỗi tuyến đường trên 3 thread nối nhau bằng hàng đợi
+    # PIPELINE_QUEUE_SIZE phần tử (đầy thì bỏ frame cũ nhất) thay vì tuần tự
+    PIPELINED_WORKER = True
+    PIPELINE_QUEUE_SIZE = 2
+
+    # Phát video đúng fps gốc (trễ thì bỏ frame), False = đọc nhanh nhất có thể (chạy offline, benchmark).
+    # Tốc độ và thống kê luôn tính theo PTS của frame nên không phụ thuộc chế độ này
+    REALTIME_SOURCE = True
+
+    # Các cửa sổ trượt (giây) tổng hợp số xe, tốc độ trung bình, p50, p85, mỗi cửa sổ chia TRAFFIC_WINDOW_BUCKETS ngăn
+    TRAFFIC_WINDOWS = [10, 60, 300]
+    TRAFFIC_WINDOW_BUCKETS = 10
+
+    # fps của nguồn thư mục ảnh
+    IMAGE_SOURCE_FPS = 10
+    # Camera live: thời gian chờ frame mới tối đa mỗi lần đọc, thời gian chờ kết nối lại (gấp đôi sau mỗi lần
+    # thất bại, từ MIN tới MAX giây)
+    STREAM_READ_TIMEOUT = 1.0
+    STREAM_RECONNECT_MIN = 0.5
+    STREAM_RECONNECT_MAX = 30.0
+
+    # Kích thước frame sau khi resize (width, height)
+    FRAME_SIZE = (600, 400)
+    # Các variant (kích thước (width, height), chất lượng JPEG) process con encode cho mỗi frame, mỗi variant chỉ
+    # encode 1 lần mỗi frame. Client chọn variant qua query parameter ?variant=
+    FRAME_VARIANTS = {
+        "thumb": {"size": (200, 134), "quality": 60},
+        "medium": {"size": (400, 267), "quality": 70},
+        "full": {"size": FRAME_SIZE, "quality": 80},
+    }
+    DEFAULT_FRAME_VARIANT = "full"
+
+class SettingStreaming:
+    # Chu kỳ producer của mỗi tuyến đường kiểm tra frame/thông tin mới trong shared memory (giây). Thông tin phương
+    # tiện được đẩy ngay khi process con báo qua info_events, chu kỳ poll chỉ là dự phòng
+    FRAME_POLL_INTERVAL = 0.01
+    INFO_POLL_INTERVAL = 1.0
+    # Số phần tử tối đa trong hàng đợi của mỗi client, đầy thì bỏ phần tử cũ nhất
+    SUBSCRIBER_QUEUE_SIZE = 2
+    # Các bậc (variant, fps tối đa) cho client xem frame, bậc 0 là tốt nhất. Client bắt đầu ở bậc đầu tiên
+    # có variant nó yêu cầu và chỉ bị hạ xuống các bậc phía sau
+    QUALITY_TIERS = [("full", 30), ("medium", 15), ("medium", 8), ("thumb", 4)]
+    # Hạ bậc khi thời gian send trung bình > tỉ lệ này * chu kỳ frame, nâng bậc khi < tỉ lệ này * chu kỳ bậc trên
+    DEGRADE_LATENCY_RATIO = 0.5
+    UPGRADE_LATENCY_RATIO = 0.2
+    # Số lần gửi tối thiểu giữa 2 lần đổi bậc để tránh dao động
+    TIER_CHANGE_MIN_SENDS = 10
+    # Quá thời gian này mà send chưa xong thì coi như client đã chết và đóng kết nối (giây)
+    SEND_TIMEOUT = 5.0
+    # fps tối đa (và mặc định) của luồng MJPEG multipart/x-mixed-replace
+    MJPEG_MAX_FPS = 15
+    # Chu kỳ gửi comment giữ kết nối Server-Sent Events khi chưa có thông tin mới (giây)
+    SSE_HEARTBEAT_INTERVAL = 15
+    # Thời gian chờ mặc định/tối đa của long-poll /frames và /info với ?after= (giây)
+    LONG_POLL_TIMEOUT = 20
+    LONG_POLL_MAX_TIMEOUT = 60
+
+class SettingInference:
+    # Dùng 1 process suy luận chung cho mọi tuyến đường (1 bản model, frame được gom thành batch động) thay vì
+    # mỗi process con tự load 1 bản model và chạy batch=1
+    USE_INFERENCE_SERVER = True
+    # Số frame tối đa trong 1 batch và thời gian tối đa chờ gom batch (giây)
+    MAX_BATCH_SIZE = 8
+    MAX_WAIT = 0.005
+    # Process con chờ kết quả quá thời gian này thì bỏ qua frame (giây)
+    REQUEST_TIMEOUT = 10.0
+    CONF = 0.2
+    IOU = 0.3
+    # Kích thước (height, width) đầu vào của model
+    IMGSZ = (640, 640)
+    # Backend mặc định và đường dẫn model của từng backend (các định dạng có sẵn trong ai_models/model N)
+    DEFAULT_BACKEND = "openvino"
+    MODEL_PATHS = {
+        "ultralytics": SettingMetricTransport.MODELS_PATH,
+        "openvino": SettingMetricTransport.MODELS_PATH,
+        "onnx": r'./ai_models/model N/onnx models/best_int8.onnx',
+        "ncnn": r'./ai_models/model N/bench marks/best_ncnn_model',
+        "mnn": r'./ai_models/model N/mnn models/best_int8.mnn',
+    }
+    # Tham số ByteTrack (giống bytetrack.yaml của ultralytics)
+    TRACKER_ARGS = {
+        "tracker_type": "bytetrack",
+        "track_high_thresh": 0.25,
+        "track_low_thresh": 0.1,
+        "new_track_thresh": 0.25,
+        "track_buffer": 30,
+        "match_thresh": 0.8,
+        "fuse_score": True,
+    }
+    # Khi detect cách frame: quay về detect mọi frame nếu độ tin cậy trung bình của track < MIN_TRACK_SCORE hoặc
+    # tỉ lệ detection chưa có track tương ứng > MAX_UNMATCHED_RATIO. USE_OPTICAL_FLOW hiệu chỉnh vị trí track ở
+    # frame không detect bằng sparse optical flow (Lucas-Kanade)
+    MIN_TRACK_SCORE = 0.4
+    MAX_UNMATCHED_RATIO = 0.3
+    USE_OPTICAL_FLOW = False
+    # Tốc độ (SpeedEngine): quãng đường giữa mẫu cũ nhất và mới nhất trong SPEED_MAX_HIST vị trí gần nhất của track
+    # (cách nhau ít nhất SPEED_MIN_SPAN giây), làm mượt bằng EMA cửa sổ SPEED_SMOOTHING lần cập nhật. Theo dõi tối đa
+    # SPEED_CAPACITY track cùng lúc, track không xuất hiện quá TRACK_TTL frame bị xoá. Tốc độ tối đa (km/h) và fps của video dùng khi frame không có PTS
+    SPEED_MAX_HIST = 20
+    SPEED_MIN_SPAN = 0.5
+    SPEED_SMOOTHING = 5
+    SPEED_CAPACITY = 256
+    TRACK_TTL = 90
+    MAX_SPEED = 120
+    VIDEO_FPS = 30
+    # Bỏ qua detect khi vùng region gần như không thay đổi so với lần detect gần nhất (ảnh xám thu nhỏ MOTION_SCALE,
+    # pixel lệch > MOTION_PIXEL_THRESHOLD mức xám được coi là thay đổi, cần >= MOTION_MIN_CHANGED_RATIO diện tích
+    # region thay đổi). Bỏ qua tối đa MOTION_MAX_SKIP lần liên tiếp để track không bị cũ
+    USE_MOTION_GATE = True
+    MOTION_SCALE = 0.25
+    MOTION_PIXEL_THRESHOLD = 25
+    MOTION_MIN_CHANGED_RATIO = 0.002
+    MOTION_MAX_SKIP = 15
+
+class SettingMonitoring:
+    # Chu kỳ process con ghi thống kê (số frame, fps, thời gian từng công đoạn) vào shared memory (giây)
+    STATS_INTERVAL = 1.0
+    # Chu kỳ đo độ trễ event loop của API (giây)
+    LOOP_LAG_INTERVAL = 0.5
+    # Tiền tố tên metric xuất ra /metrics (Prometheus)
+    METRICS_PREFIX = "traffic"
+
+class SettingHistory:
+    # Lưu lịch sử thông tin phương tiện của từng tuyến đường vào bảng traffic_history
+    HISTORY_ENABLED = True
+    # Số dòng tối đa chờ ghi, đầy thì dòng mới bị bỏ (không chặn event loop, không chặn process con)
+    HISTORY_QUEUE_SIZE = 10000
+    # Ghi theo lô: tối đa HISTORY_BATCH_SIZE dòng hoặc sau HISTORY_FLUSH_INTERVAL giây kể từ dòng đầu tiên của lô
+    HISTORY_BATCH_SIZE = 500
+    HISTORY_FLUSH_INTERVAL = 5.0
+    # Lưu sự kiện từng phương tiện (track_id, nhãn, thời điểm vào/ra, tốc độ) vào bảng vehicle_events. Process con
+    # gửi theo lô mỗi STATS_INTERVAL, hàng đợi (số lô) đầy thì bỏ
+    VEHICLE_EVENTS_ENABLED = True
+    VEHICLE_EVENT_QUEUE_SIZE = 1000
+    # Số điểm tối đa mỗi tuyến đường trong 1 lần truy vấn /history, không truyền step thì step là giá trị nhỏ nhất
+    # trong HISTORY_STEPS (giây) cho ra không quá HISTORY_MAX_POINTS điểm
+    HISTORY_MAX_POINTS = 1000
+    HISTORY_STEPS = [60, 300, 900, 1800, 3600, 3 * 3600, 6 * 3600, 12 * 3600, 86400, 7 * 86400]
+    # Khoảng thời gian mặc định (không truyền start) và tối đa của 1 lần truy vấn (giây)
+    HISTORY_DEFAULT_RANGE = 24 * 3600
+    HISTORY_MAX_RANGE = 366 * 86400
+    # Số ngày giữ lại dữ liệu thô và từng mức rollup (None = giữ mãi), kiểm tra mỗi HISTORY_RETENTION_INTERVAL giây.
+    # Rollup được cộng dồn ngay khi ghi nên xoá dữ liệu thô cũ không làm mất các mức tổng hợp
+    HISTORY_RETENTION_DAYS = {"raw": 7, "minute": 30, "hour": 365, "day": None, "events": 30}
+    HISTORY_RETENTION_INTERVAL = 3600
+    # Export Parquet/Arrow: mỗi truy vấn lấy 1 đoạn EXPORT_CHUNK giây, ghi thành các batch tối đa EXPORT_BATCH_SIZE dòng
+    EXPORT_CHUNK = 86400
+    EXPORT_BATCH_SIZE = 65536
+
 class SettingChatBot:
     MODELNAME = ""
 
@@ -47,5 +233,9 @@ class SettingNetwork:
 
 settings_server = SettingServer()
 settings_metric_transport = SettingMetricTransport()
+settings_inference = SettingInference()
+settings_streaming = SettingStreaming()
+settings_monitoring = SettingMonitoring()
+settings_history = SettingHistory()
 settings_chat_bot = SettingChatBot()
 settings_network = SettingNetwork()
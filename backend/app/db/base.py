@@ -11,6 +11,9 @@ async def create_tables():
     # Import models để đảm bảo chúng được đăng ký với Base
     from models.user import User
     from models.TokenLLM import TokenLLM
+    from models.TrafficHistory import TrafficHistory
+    from models.TrafficRollup import TrafficRollupMinute, TrafficRollupHour, TrafficRollupDay
+    from models.VehicleEvent import VehicleEvent
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
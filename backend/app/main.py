@@ -11,6 +11,9 @@ from core.config import settings_network
 # Import all models để SQLAlchemy registry biết về relationships
 from models.user import User
 from models.TokenLLM import TokenLLM
+from models.TrafficHistory import TrafficHistory
+from models.TrafficRollup import TrafficRollupMinute, TrafficRollupHour, TrafficRollupDay
+from models.VehicleEvent import VehicleEvent
 
 # Ưu tiên DirectShow, tắt MSMF để tránh kẹt Ctrl+C trên Windows
 os.environ["OPENCV_VIDEOIO_PRIORITY_MSMF"] = "0"
@@ -99,6 +102,17 @@ app.include_router(
     tags=["Admin Tools"],
 )
 
+app.include_router(
+    v1.api_history.router,
+    prefix="/api/v1",
+    tags=["Traffic History"],
+)
+
+app.include_router(
+    v1.api_metrics.router,
+    tags=["Monitoring"],
+)
+
 # V2 APIs (commented out)
 # app.include_router(v2.api_chatbot.router, prefix="/api/v2", tags=["AI Chatbot V2"])
 # app.include_router(v2.api_vehicles_frames.router, prefix="/api/v2", tags=["Traffic Monitoring V2"])
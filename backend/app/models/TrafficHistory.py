@@ -0,0 +1,21 @@
+from sqlalchemy import BigInteger, Column, DateTime, Float, Index, String
+from db.base import Base
+
+
+class TrafficHistory(Base):
+    __tablename__ = "traffic_history"
+
+    # Mỗi dòng là thông tin phương tiện (trung bình trong time_step) của 1 tuyến đường tại 1 thời điểm,
+    # chỉ được thêm mới (append-only) bởi HistoryWriter
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    road_name = Column(String(100), nullable=False)
+    recorded_at = Column(DateTime(timezone=True), nullable=False)
+    car_count = Column(Float, nullable=False, default=0)
+    motor_count = Column(Float, nullable=False, default=0)
+    car_speed = Column(Float, nullable=False, default=0)
+    motor_speed = Column(Float, nullable=False, default=0)
+
+    __table_args__ = (
+        # Mọi truy vấn xu hướng đều lọc theo tuyến đường và khoảng thời gian
+        Index("ix_traffic_history_road_recorded_at", "road_name", "recorded_at"),
+    )
@@ -0,0 +1,28 @@
+from sqlalchemy import Column, DateTime, Float, Integer, String
+from db.base import Base
+
+
+class TrafficRollupMixin:
+    # Tổng (không phải trung bình) của các dòng traffic_history trong bucket để cộng dồn được khi có dòng mới
+    # và gộp được nhiều bucket thành 1 điểm khi truy vấn. Tốc độ 0 (không có xe) không được tính vào *_speed_*
+    road_name = Column(String(100), primary_key=True)
+    bucket = Column(DateTime(timezone=True), primary_key=True)
+    samples = Column(Integer, nullable=False, default=0)
+    car_count_sum = Column(Float, nullable=False, default=0)
+    motor_count_sum = Column(Float, nullable=False, default=0)
+    car_speed_sum = Column(Float, nullable=False, default=0)
+    car_speed_samples = Column(Integer, nullable=False, default=0)
+    motor_speed_sum = Column(Float, nullable=False, default=0)
+    motor_speed_samples = Column(Integer, nullable=False, default=0)
+
+
+class TrafficRollupMinute(TrafficRollupMixin, Base):
+    __tablename__ = "traffic_rollup_minute"
+
+
+class TrafficRollupHour(TrafficRollupMixin, Base):
+    __tablename__ = "traffic_rollup_hour"
+
+
+class TrafficRollupDay(TrafficRollupMixin, Base):
+    __tablename__ = "traffic_rollup_day"
@@ -0,0 +1,19 @@
+from sqlalchemy import BigInteger, Column, DateTime, Float, Index, String
+from db.base import Base
+
+
+class VehicleEvent(Base):
+    __tablename__ = "vehicle_events"
+
+    # Mỗi dòng là 1 phương tiện đã rời khung hình của 1 tuyến đường (track bị xoá khỏi TrackStore)
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    road_name = Column(String(100), nullable=False)
+    track_id = Column(BigInteger, nullable=False)
+    vehicle = Column(String(20), nullable=False)
+    entered_at = Column(DateTime(timezone=True), nullable=False)
+    left_at = Column(DateTime(timezone=True), nullable=False)
+    speed = Column(Float, nullable=True)  # Tốc độ (km/h) cuối cùng, NULL nếu chưa đủ dữ liệu để tính
+
+    __table_args__ = (
+        Index("ix_vehicle_events_road_left_at", "road_name", "left_at"),
+    )
@@ -6,6 +6,9 @@ from core.config import settings_network
 
 BASE_URL = f"{settings_network.BASE_URL_API}/api/v1"
 
+# Cache (etag, data) của /info theo tuyến đường, server trả 304 khi info chưa đổi nên không phải tải lại body
+_info_cache = {}
+
 @tool
 def get_roads() -> str:
     """Lấy danh sách các tuyến đường hiện có từ API.
@@ -49,9 +52,15 @@ def get_info_road(road_name: Annotated[str, "Tên tuyến đường"]) -> str:
     """
     try:
         url = f"{BASE_URL}/info/{road_name}"
-        response = requests.get(url)
+        cached = _info_cache.get(road_name)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        response = requests.get(url, headers=headers)
+        if response.status_code == 304 and cached:
+            return json.dumps(cached[1], ensure_ascii=False)
         if response.status_code == 200:
             data = response.json()
+            if response.headers.get("ETag"):
+                _info_cache[road_name] = (response.headers["ETag"], data)
             if data and data != {}:
                 return json.dumps(data, ensure_ascii=False)
             else:
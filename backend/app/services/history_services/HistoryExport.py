@@ -0,0 +1,234 @@
+"""Export lịch sử giao thông (traffic_history, các mức rollup) và sự kiện từng phương tiện (vehicle_events) ra
+Parquet hoặc Arrow IPC file để phân tích offline (pandas, polars, DuckDB...).
+
+Dữ liệu được đọc theo từng đoạn EXPORT_CHUNK giây (truy vấn theo index thời gian) bằng server-side cursor, mỗi
+lô EXPORT_BATCH_SIZE dòng thành 1 RecordBatch rồi ghi ngay nên bộ nhớ không tăng theo độ dài khoảng export.
+File Arrow (không nén) mở được bằng memory map: pa.ipc.open_file(pa.memory_map(path)).read_all().
+
+Examples:
+    cd backend/app
+    python -m services.history_services.HistoryExport history --start 2026-09-01 --end 2026-10-01 -o history.parquet
+    python -m services.history_services.HistoryExport events --roads "Văn Quán" --format arrow -o events.arrow
+    python -m services.history_services.HistoryExport hour --start 2026-01-01
+"""
+import argparse
+import asyncio
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import BigInteger, DateTime, Float, Integer, String, select
+from core.config import settings_history
+
+try:
+    import pyarrow as pa  # type: ignore
+    import pyarrow.parquet as pq  # type: ignore
+except ImportError:  # pragma: no cover
+    pa = pq = None  # type: ignore
+
+# Định dạng -> (media type, phần mở rộng)
+EXPORT_FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "arrow": ("application/vnd.apache.arrow.file", ".arrow"),
+}
+
+
+def export_tables() -> dict:
+    """{loại export: (bảng, cột thời gian)}"""
+    from models.TrafficHistory import TrafficHistory
+    from models.VehicleEvent import VehicleEvent
+    from services.history_services.HistoryStore import rollup_tables
+    tables = {"history": (TrafficHistory.__table__, "recorded_at"), "events": (VehicleEvent.__table__, "left_at")}
+    tables.update({name: (table, "bucket") for name, table in rollup_tables().items()})
+    return tables
+
+
+def export_columns(table) -> list:
+    """Các cột được export (bỏ id tự tăng)"""
+    return [column for column in table.columns if column.name != "id"]
+
+
+def arrow_schema(table):
+    """Schema Arrow tương ứng các cột export của bảng SQLAlchemy"""
+    fields = []
+    for column in export_columns(table):
+        if isinstance(column.type, BigInteger):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int32()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us", tz="UTC" if column.type.timezone else None)
+        elif isinstance(column.type, String):
+            arrow_type = pa.string()
+        else:
+            raise TypeError(f"Không hỗ trợ export cột {column.name} kiểu {column.type}")
+        fields.append(pa.field(column.name, arrow_type, nullable=column.nullable))
+    return pa.schema(fields)
+
+
+def rows_to_batch(rows, schema):
+    """RecordBatch từ các dòng (tuple theo thứ tự cột của schema)"""
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    return pa.RecordBatch.from_arrays([pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                                      schema=schema)
+
+
+def time_chunks(start: datetime, end: datetime, seconds: float):
+    """Các đoạn [lo, hi) liên tiếp dài tối đa seconds giây phủ [start, end)"""
+    step = timedelta(seconds=seconds)
+    lo = start
+    while lo < end:
+        hi = min(lo + step, end)
+        yield lo, hi
+        lo = hi
+
+
+class _ByteSink:
+    """File-like chỉ ghi, giữ các bytes đã ghi cho tới khi drain() lấy ra"""
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ExportWriter:
+    """Ghi các RecordBatch ra Parquet (nén zstd) hoặc Arrow IPC file. Không có path thì ghi vào bộ đệm trong bộ nhớ
+    và drain() lấy ra phần bytes đã ghi để stream đi ngay
+
+    Examples:
+        >>> writer = ExportWriter("arrow", schema)
+        >>> writer.write(batch)
+        >>> chunk = writer.drain()
+        >>> writer.close()
+        >>> tail = writer.drain()
+    """
+    def __init__(self, fmt: str, schema, path: str = None):
+        """
+        Args:
+            fmt (str): "parquet" hoặc "arrow"
+            schema (pa.Schema): Schema của các batch
+            path (str, optional): File đích. Defaults to None (bộ đệm trong bộ nhớ).
+        """
+        if pa is None:
+            raise RuntimeError("Cần cài pyarrow để export Parquet/Arrow (pip install pyarrow)")
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"format không hợp lệ, chọn một trong {list(EXPORT_FORMATS)}")
+        self._sink = None if path else _ByteSink()
+        target = path if path else pa.PythonFile(self._sink, mode="w")
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(target, schema, compression="zstd")
+        else:
+            self._writer = pa.ipc.new_file(target, schema)
+        self.rows = 0
+
+    def write(self, batch):
+        self._writer.write_batch(batch)
+        self.rows += batch.num_rows
+
+    def drain(self) -> bytes:
+        return self._sink.drain() if self._sink is not None else b""
+
+    def close(self):
+        self._writer.close()
+
+
+async def iter_batches(kind: str, start: datetime, end: datetime, road_names: list = None,
+                       chunk: float = settings_history.EXPORT_CHUNK,
+                       batch_size: int = settings_history.EXPORT_BATCH_SIZE):
+    """Async generator các RecordBatch của bảng kind trong [start, end), tăng dần theo thời gian
+
+    Args:
+        kind (str): Loại export (history, events, minute, hour, day)
+        road_names (list, optional): Chỉ lấy các tuyến đường này. Defaults to None (tất cả).
+        chunk (float): Độ dài mỗi đoạn truy vấn (giây)
+        batch_size (int): Số dòng tối đa mỗi batch
+    """
+    from db.base import engine
+    table, time_column = export_tables()[kind]
+    columns = export_columns(table)
+    schema = arrow_schema(table)
+    async with engine.connect() as conn:
+        for lo, hi in time_chunks(start, end, chunk):
+            stmt = select(*columns).where(table.c[time_column] >= lo, table.c[time_column] < hi)
+            if road_names is not None:
+                stmt = stmt.where(table.c.road_name.in_(road_names))
+            stmt = stmt.order_by(table.c[time_column]).execution_options(yield_per=batch_size)
+            result = await conn.stream(stmt)
+            async for rows in result.partitions(batch_size):
+                yield rows_to_batch(rows, schema)
+
+
+async def export_stream(kind: str, fmt: str, start: datetime, end: datetime, road_names: list = None):
+    """Async generator các đoạn bytes của file export, dùng cho StreamingResponse"""
+    table, _ = export_tables()[kind]
+    writer = ExportWriter(fmt, arrow_schema(table))
+    async for batch in iter_batches(kind, start, end, road_names):
+        writer.write(batch)
+        data = writer.drain()
+        if data:
+            yield data
+    writer.close()
+    yield writer.drain()
+
+
+async def export_file(path: str, kind: str, fmt: str, start: datetime, end: datetime, road_names: list = None) -> int:
+    """Export ra file path, trả về số dòng đã ghi"""
+    table, _ = export_tables()[kind]
+    writer = ExportWriter(fmt, arrow_schema(table), path)
+    try:
+        async for batch in iter_batches(kind, start, end, road_names):
+            writer.write(batch)
+    finally:
+        writer.close()
+    return writer.rows
+
+
+def _parse_time(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed.replace(tzinfo=timezone.utc) if parsed.tzinfo is None else parsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export lịch sử giao thông ra Parquet/Arrow")
+    parser.add_argument("kind", choices=["history", "events", "minute", "hour", "day"])
+    parser.add_argument("--roads", nargs="*", default=None, help="Tên các tuyến đường (mặc định tất cả)")
+    parser.add_argument("--start", type=_parse_time, default=None,
+                        help="ISO 8601, không có múi giờ = UTC (mặc định HISTORY_DEFAULT_RANGE giây trước end)")
+    parser.add_argument("--end", type=_parse_time, default=None, help="ISO 8601 (mặc định hiện tại)")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default=None,
+                        help="Mặc định theo phần mở rộng của --output, không có thì parquet")
+    parser.add_argument("-o", "--output", default=None)
+    args = parser.parse_args()
+
+    end = args.end or datetime.now(timezone.utc)
+    start = args.start or end - timedelta(seconds=settings_history.HISTORY_DEFAULT_RANGE)
+    fmt = args.format
+    if fmt is None:
+        fmt = next((name for name, (_, ext) in EXPORT_FORMATS.items()
+                    if args.output and args.output.endswith(ext)), "parquet")
+    output = args.output or f"{args.kind}_{start:%Y%m%dT%H%M}_{end:%Y%m%dT%H%M}{EXPORT_FORMATS[fmt][1]}"
+    rows = asyncio.run(export_file(output, args.kind, fmt, start, end, args.roads))
+    print(f"Đã ghi {rows} dòng vào {output}")
+
+
+if __name__ == "__main__":
+    main()
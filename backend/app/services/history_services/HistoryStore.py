@@ -0,0 +1,246 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+from core.config import settings_history
+
+# Độ phân giải (giây) của các mức rollup, từ mịn tới thô
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+# Các cột tổng của bảng rollup (xem models.TrafficRollup), cộng dồn được
+ROLLUP_SUMS = ("samples", "car_count_sum", "motor_count_sum", "car_speed_sum", "car_speed_samples",
+               "motor_speed_sum", "motor_speed_samples")
+
+
+def rollup_tables() -> dict:
+    """{mức: bảng rollup} theo thứ tự RESOLUTIONS"""
+    from models.TrafficRollup import TrafficRollupMinute, TrafficRollupHour, TrafficRollupDay
+    return {"minute": TrafficRollupMinute.__table__, "hour": TrafficRollupHour.__table__,
+            "day": TrafficRollupDay.__table__}
+
+
+def bucket_start(timestamp: float, seconds: int) -> float:
+    """Đầu bucket seconds giây chứa timestamp, các bucket được căn theo epoch (ngày tính theo UTC)"""
+    return timestamp - timestamp % seconds
+
+
+def _utc(timestamp: float) -> datetime:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
+
+
+def rollup_rows(rows: list, seconds: int) -> list:
+    """Gộp các dòng traffic_history (xem history_row) thành các dòng rollup theo (road_name, bucket seconds giây)
+
+    Examples:
+        >>> rollup_rows(rows, RESOLUTIONS["minute"])
+        [{"road_name": "Văn Quán", "bucket": datetime(...), "samples": 2, "car_count_sum": 7.0, ...}, ...]
+    """
+    buckets = {}
+    for row in rows:
+        key = (row["road_name"], bucket_start(row["recorded_at"].timestamp(), seconds))
+        sums = buckets.get(key)
+        if sums is None:
+            sums = buckets[key] = dict.fromkeys(ROLLUP_SUMS, 0)
+        sums["samples"] += 1
+        sums["car_count_sum"] += row["car_count"]
+        sums["motor_count_sum"] += row["motor_count"]
+        for vehicle in ("car", "motor"):
+            speed = row[f"{vehicle}_speed"]
+            if speed > 0:
+                sums[f"{vehicle}_speed_sum"] += speed
+                sums[f"{vehicle}_speed_samples"] += 1
+    return [{"road_name": road_name, "bucket": _utc(start), **sums}
+            for (road_name, start), sums in sorted(buckets.items())]
+
+
+async def upsert_rollups(conn, rows: list):
+    """Cộng dồn 1 lô dòng traffic_history vào các bảng rollup (INSERT ... ON CONFLICT DO UPDATE), chạy trong
+    transaction ghi lô đó nên rollup luôn khớp với dữ liệu thô đã ghi
+
+    Args:
+        conn (AsyncConnection): Kết nối đang mở transaction
+        rows (list): Các dòng traffic_history
+    """
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    for name, table in rollup_tables().items():
+        stmt = insert(table).values(rollup_rows(rows, RESOLUTIONS[name]))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["road_name", "bucket"],
+            set_={column: table.c[column] + stmt.excluded[column] for column in ROLLUP_SUMS},
+        )
+        await conn.execute(stmt)
+
+
+def available_resolutions(start: float, now: float = None) -> list:
+    """Các mức rollup còn giữ dữ liệu từ start (chưa bị apply_retention xoá), từ mịn tới thô
+
+    Args:
+        start (float): Thời điểm bắt đầu truy vấn (epoch giây)
+        now (float, optional): Thời điểm hiện tại (epoch giây). Defaults to None (time.time()).
+    """
+    now = time.time() if now is None else now
+    retention = settings_history.HISTORY_RETENTION_DAYS
+    return [name for name in RESOLUTIONS
+            if retention.get(name) is None or start >= now - retention[name] * 86400]
+
+
+def plan_query(start: float, end: float, step: int = None,
+               max_points: int = settings_history.HISTORY_MAX_POINTS, now: float = None) -> tuple:
+    """Chọn step và mức rollup cho truy vấn [start, end). Rollup cộng dồn được nên mức thô nhất mà step chia hết
+    vẫn cho kết quả chính xác và đọc ít dòng nhất, số dòng đọc chỉ phụ thuộc khoảng thời gian và step, không phụ
+    thuộc lượng lịch sử đã lưu. Chỉ dùng các mức còn giữ dữ liệu từ start theo HISTORY_RETENTION_DAYS, step tự chọn
+    được làm tròn lên bội số độ phân giải của mức mịn nhất còn dữ liệu
+
+    Args:
+        start (float): Thời điểm bắt đầu (epoch giây)
+        end (float): Thời điểm kết thúc (epoch giây)
+        step (int, optional): Độ dài mỗi điểm (giây), bội số của 60. Defaults to None (tự chọn theo HISTORY_STEPS).
+        max_points (int): Số điểm tối đa mỗi tuyến đường
+        now (float, optional): Thời điểm hiện tại (epoch giây). Defaults to None (time.time()).
+
+    Returns:
+        tuple: (tên mức rollup, step)
+
+    Raises:
+        ValueError: Khoảng thời gian hoặc step không hợp lệ, hoặc step cần dữ liệu đã bị xoá
+    """
+    span = end - start
+    if span <= 0:
+        raise ValueError("end phải sau start")
+    if span > settings_history.HISTORY_MAX_RANGE:
+        raise ValueError(f"Khoảng thời gian tối đa là {settings_history.HISTORY_MAX_RANGE} giây")
+    available = available_resolutions(start, now)
+    if not available:
+        raise ValueError("Dữ liệu lịch sử từ start đã bị xoá theo HISTORY_RETENTION_DAYS")
+    finest = RESOLUTIONS[available[0]]
+    if step is None:
+        steps = [candidate for candidate in settings_history.HISTORY_STEPS if candidate % finest == 0] or [finest]
+        step = next((candidate for candidate in steps if span / candidate <= max_points), steps[-1])
+    elif step < RESOLUTIONS["minute"] or step % RESOLUTIONS["minute"]:
+        raise ValueError("step phải là bội số của 60 giây")
+    elif span / step > max_points:
+        raise ValueError(f"Quá {max_points} điểm, hãy tăng step hoặc thu hẹp khoảng thời gian")
+    elif step % finest:
+        raise ValueError(f"Dữ liệu mức {', '.join(name for name in RESOLUTIONS if name not in available)} từ start "
+                         f"đã bị xoá, step phải là bội số của {finest} giây")
+    resolution = max((name for name in available if step % RESOLUTIONS[name] == 0), key=RESOLUTIONS.get)
+    return resolution, step
+
+
+def history_point(start: float, sums: dict) -> dict:
+    """1 điểm của chuỗi lịch sử: trung bình số xe và tốc độ trong [start, start + step)"""
+    samples = sums["samples"]
+    point = {"timestamp": _utc(start).isoformat(), "samples": samples}
+    for vehicle in ("car", "motor"):
+        speed_samples = sums[f"{vehicle}_speed_samples"]
+        point[f"{vehicle}_count"] = round(sums[f"{vehicle}_count_sum"] / samples, 2) if samples else 0.0
+        point[f"{vehicle}_speed"] = round(sums[f"{vehicle}_speed_sum"] / speed_samples, 2) if speed_samples else 0.0
+    return point
+
+
+def merge_buckets(rollups, step: int) -> dict:
+    """Gộp các dòng rollup thành các điểm step giây của từng tuyến đường
+
+    Returns:
+        dict: {road_name: [history_point, ...]} tăng dần theo thời gian
+    """
+    series = {}
+    for row in rollups:
+        start = bucket_start(row["bucket"].timestamp(), step)
+        points = series.setdefault(row["road_name"], {})
+        sums = points.get(start)
+        if sums is None:
+            sums = points[start] = dict.fromkeys(ROLLUP_SUMS, 0)
+        for column in ROLLUP_SUMS:
+            sums[column] += row[column]
+    return {road_name: [history_point(start, sums) for start, sums in sorted(points.items())]
+            for road_name, points in series.items()}
+
+
+async def query_history(road_names: list, start: datetime, end: datetime, step: int = None) -> dict:
+    """Lịch sử số xe và tốc độ của các tuyến đường trong [start, end), 1 truy vấn theo khoá chính (road_name,
+    bucket) của mức rollup được plan_query chọn
+
+    Raises:
+        ValueError: Khoảng thời gian hoặc step không hợp lệ
+    """
+    from db.base import engine
+    resolution, step = plan_query(start.timestamp(), end.timestamp(), step)
+    table = rollup_tables()[resolution]
+    # Lùi start về đầu step để điểm đầu tiên đủ dữ liệu
+    first = _utc(bucket_start(start.timestamp(), step))
+    stmt = (select(table)
+            .where(table.c.road_name.in_(road_names), table.c.bucket >= first, table.c.bucket < end)
+            .order_by(table.c.road_name, table.c.bucket))
+    async with engine.connect() as conn:
+        rollups = (await conn.execute(stmt)).mappings().all()
+    series = merge_buckets(rollups, step)
+    return {
+        "resolution": resolution,
+        "step": step,
+        "start": first.isoformat(),
+        "end": end.isoformat(),
+        "roads": {road_name: series.get(road_name, []) for road_name in road_names},
+    }
+
+
+async def apply_retention(now: datetime = None) -> dict:
+    """Xoá dữ liệu thô, rollup và sự kiện phương tiện cũ hơn HISTORY_RETENTION_DAYS
+
+    Returns:
+        dict: {mức ("raw", "minute", ..., "events"): số dòng đã xoá}
+    """
+    from db.base import engine
+    from models.TrafficHistory import TrafficHistory
+    from models.VehicleEvent import VehicleEvent
+    now = now or datetime.now(timezone.utc)
+    columns = {"raw": TrafficHistory.__table__.c.recorded_at,
+               **{name: table.c.bucket for name, table in rollup_tables().items()},
+               "events": VehicleEvent.__table__.c.left_at}
+    deleted = {}
+    async with engine.begin() as conn:
+        for name, days in settings_history.HISTORY_RETENTION_DAYS.items():
+            if days is None:
+                continue
+            column = columns[name]
+            result = await conn.execute(column.table.delete().where(column < now - timedelta(days=days)))
+            deleted[name] = result.rowcount
+    return deleted
+
+
+class HistoryRetention:
+    """Task nền chạy apply_retention mỗi interval giây (lần đầu ngay khi start)
+
+    Examples:
+        >>> retention = HistoryRetention()
+        >>> retention.start()  # gọi trên event loop
+        >>> await retention.stop()
+    """
+    def __init__(self, interval: float = settings_history.HISTORY_RETENTION_INTERVAL):
+        self.interval = interval
+        self.deleted = dict.fromkeys(settings_history.HISTORY_RETENTION_DAYS, 0)
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            try:
+                for name, count in (await apply_retention()).items():
+                    self.deleted[name] += count
+            except Exception as e:
+                print(f"Lỗi khi xoá lịch sử giao thông cũ: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,186 @@
+import asyncio
+import math
+from datetime import datetime, timezone
+from core.config import settings_history
+from services.history_services.HistoryStore import upsert_rollups
+from services.road_services.TrafficAggregator import VEHICLE_CLASSES
+
+# Thứ tự cột khi ghi bằng COPY
+HISTORY_COLUMNS = ("road_name", "recorded_at", "car_count", "motor_count", "car_speed", "motor_speed")
+VEHICLE_EVENT_COLUMNS = ("road_name", "track_id", "vehicle", "entered_at", "left_at", "speed")
+
+
+def history_row(road_name: str, info: dict) -> dict:
+    """Dòng traffic_history từ thông tin phương tiện đọc ở SharedRoadSlot.read_metrics
+
+    Examples:
+        >>> history_row("Văn Quán", {"count_car": 3, "count_motor": 12, "speed_car": 31, "speed_motor": 28,
+        >>>                          "updated_at": 1760000000.0, ...})
+    """
+    return {
+        "road_name": road_name,
+        "recorded_at": datetime.fromtimestamp(info["updated_at"], tz=timezone.utc),
+        "car_count": float(info["count_car"]),
+        "motor_count": float(info["count_motor"]),
+        "car_speed": float(info["speed_car"]),
+        "motor_speed": float(info["speed_motor"]),
+    }
+
+
+def vehicle_event_rows(road_name: str, departures: dict) -> list:
+    """Các dòng vehicle_events từ bản ghi phương tiện đã rời khung hình (xem AnalyzeOnRoad.publish_departures)"""
+    rows = []
+    for track_id, class_id, first_time, last_time, speed in zip(
+            departures["track_id"].tolist(), departures["class_id"].tolist(), departures["first_time"].tolist(),
+            departures["last_time"].tolist(), departures["speed"].tolist()):
+        rows.append({
+            "road_name": road_name,
+            "track_id": int(track_id),
+            "vehicle": VEHICLE_CLASSES[class_id] if 0 <= class_id < len(VEHICLE_CLASSES) else "unknown",
+            "entered_at": datetime.fromtimestamp(first_time, tz=timezone.utc),
+            "left_at": datetime.fromtimestamp(last_time, tz=timezone.utc),
+            "speed": None if math.isnan(speed) else speed,
+        })
+    return rows
+
+
+async def _copy_rows(conn, table, columns: tuple, rows: list):
+    """Ghi các dòng vào table: COPY của asyncpg khi dùng PostgreSQL, bulk insert (executemany) với driver khác"""
+    if conn.dialect.driver == "asyncpg":
+        raw = await conn.get_raw_connection()
+        await raw.driver_connection.copy_records_to_table(
+            table.name,
+            records=[tuple(row[column] for column in columns) for row in rows],
+            columns=columns,
+        )
+    else:
+        await conn.execute(table.insert(), rows)
+
+
+async def insert_traffic_history(rows: list):
+    """Ghi 1 lô dòng vào traffic_history trong 1 transaction, các bảng rollup được cộng dồn trong cùng transaction"""
+    from db.base import engine
+    from models.TrafficHistory import TrafficHistory
+    async with engine.begin() as conn:
+        await _copy_rows(conn, TrafficHistory.__table__, HISTORY_COLUMNS, rows)
+        await upsert_rollups(conn, rows)
+
+
+async def insert_vehicle_events(rows: list):
+    """Ghi 1 lô dòng vào vehicle_events trong 1 transaction"""
+    from db.base import engine
+    from models.VehicleEvent import VehicleEvent
+    async with engine.begin() as conn:
+        await _copy_rows(conn, VehicleEvent.__table__, VEHICLE_EVENT_COLUMNS, rows)
+
+
+class HistoryWriter:
+    """Ghi lịch sử thông tin phương tiện vào database ở nền, theo lô. Chạy trên event loop của API nên process con
+    xử lý video không phải làm thêm gì: thread đọc info_events chỉ đọc shared memory rồi gửi dòng sang qua
+    loop.call_soon_threadsafe(writer.submit, row).
+
+    Hàng đợi có giới hạn, khi database chậm hoặc mất kết nối mà hàng đợi đầy thì dòng mới bị bỏ (dropped), lô ghi
+    lỗi bị bỏ qua (failed) thay vì thử lại mãi, nên bộ nhớ và độ trễ của API luôn bị chặn.
+
+    Examples:
+        >>> writer = HistoryWriter()
+        >>> writer.start()                      # gọi trên event loop
+        >>> writer.submit(history_row(road_name, info))
+        >>> await writer.close()                # ghi nốt các dòng còn lại
+    """
+    def __init__(self, sink=insert_traffic_history, queue_size: int = settings_history.HISTORY_QUEUE_SIZE,
+                 batch_size: int = settings_history.HISTORY_BATCH_SIZE,
+                 flush_interval: float = settings_history.HISTORY_FLUSH_INTERVAL):
+        """
+        Args:
+            sink (callable): Coroutine function nhận list dòng và ghi chúng. Defaults to insert_traffic_history.
+            queue_size (int): Số dòng tối đa chờ ghi
+            batch_size (int): Số dòng tối đa mỗi lô
+            flush_interval (float): Thời gian chờ gom lô tối đa (giây) kể từ dòng đầu tiên của lô
+        """
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+        self._batch = []
+        self._task = None
+
+    def submit(self, row: dict) -> bool:
+        """Thêm 1 dòng chờ ghi, không chặn. Gọi trên event loop
+
+        Returns:
+            bool: False nếu hàng đợi đầy và dòng bị bỏ
+        """
+        try:
+            self.queue.put_nowait(row)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    def submit_many(self, rows: list) -> int:
+        """Thêm nhiều dòng chờ ghi, không chặn. Gọi trên event loop
+
+        Returns:
+            int: Số dòng được nhận, các dòng còn lại bị bỏ vì hàng đợi đầy
+        """
+        return sum(self.submit(row) for row in rows)
+
+    def queue_depth(self) -> int:
+        return self.queue.qsize() + len(self._batch)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._batch.append(await self.queue.get())
+            deadline = loop.time() + self.flush_interval
+            while len(self._batch) < self.batch_size:
+                if not self.queue.empty():
+                    self._batch.append(self.queue.get_nowait())
+                    continue
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush()
+
+    async def _flush(self):
+        batch = self._batch
+        try:
+            await self.sink(batch)
+            self.written += len(batch)
+        except asyncio.CancelledError:
+            # Bị huỷ giữa chừng (close) thì giữ lại lô để close ghi lại trong transaction mới
+            raise
+        except Exception as e:
+            self.failed += len(batch)
+            print(f"Lỗi khi ghi {len(batch)} dòng lịch sử giao thông: {e}")
+        self.batches += 1
+        self._batch = []
+
+    async def close(self):
+        """Dừng task nền và ghi nốt các dòng đang chờ"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while not self.queue.empty():
+            self._batch.append(self.queue.get_nowait())
+            if len(self._batch) >= self.batch_size:
+                await self._flush()
+        if self._batch:
+            await self._flush()
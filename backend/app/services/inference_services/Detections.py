@@ -0,0 +1,34 @@
+import numpy as np
+
+
+class Detections:
+    """Kết quả detect của 1 frame dưới dạng numpy, tách khỏi kiểu Results của ultralytics để có thể gửi qua
+    process khác và đưa thẳng vào BYTETracker (tracker chỉ cần conf, cls, xywh và lọc bằng mask).
+
+    Attributes:
+        xyxy (np.ndarray): (N, 4) float32 toạ độ bounding box theo pixel của frame đầu vào
+        conf (np.ndarray): (N,) float32 độ tin cậy
+        cls (np.ndarray): (N,) float32 nhãn (0: car, 1: Motor)
+    """
+    def __init__(self, xyxy=None, conf=None, cls=None):
+        self.xyxy = np.empty((0, 4), np.float32) if xyxy is None else np.asarray(xyxy, np.float32).reshape(-1, 4)
+        self.conf = np.empty(0, np.float32) if conf is None else np.asarray(conf, np.float32).reshape(-1)
+        self.cls = np.empty(0, np.float32) if cls is None else np.asarray(cls, np.float32).reshape(-1)
+
+    @property
+    def xywh(self) -> np.ndarray:
+        xywh = np.empty_like(self.xyxy)
+        xywh[:, 0] = (self.xyxy[:, 0] + self.xyxy[:, 2]) / 2
+        xywh[:, 1] = (self.xyxy[:, 1] + self.xyxy[:, 3]) / 2
+        xywh[:, 2] = self.xyxy[:, 2] - self.xyxy[:, 0]
+        xywh[:, 3] = self.xyxy[:, 3] - self.xyxy[:, 1]
+        return xywh
+
+    def __len__(self):
+        return len(self.conf)
+
+    def __getitem__(self, index):
+        return Detections(self.xyxy[index], self.conf[index], self.cls[index])
+
+    def __repr__(self):
+        return f"Detections(n={len(self)})"
@@ -0,0 +1,37 @@
+import numpy as np
+from services.inference_services.Detections import Detections
+from services.inference_services.InferenceBackend import create_backend
+from core.config import settings_inference, settings_metric_transport
+
+
+class LocalDetector:
+    """Chạy model ngay trong process hiện tại bằng backend suy luận được chọn (openvino, onnx, ncnn, mnn,
+    ultralytics)
+
+    Examples:
+        >>> detector = LocalDetector(backend="onnx")
+        >>> detections = detector.detect(frame)
+        >>> batch = detector.detect_batch([frame_1, frame_2])
+    """
+    def __init__(self, model_path=None, backend=settings_inference.DEFAULT_BACKEND,
+                 device=settings_metric_transport.DEVICE, conf=settings_inference.CONF, iou=settings_inference.IOU,
+                 batch=1, imgsz=settings_inference.IMGSZ):
+        """
+        Args:
+            model_path (str, optional): Đường dẫn đến model. Defaults to None (đường dẫn cấu hình của backend).
+            backend (str): Tên backend suy luận. Defaults to settings_inference.DEFAULT_BACKEND.
+            device (str): Dùng GPU hoặc CPU. Defaults to 'cpu'.
+            conf (float): Ngưỡng tin cậy về nhãn được dự đoán
+            iou (float): Ngưỡng IoU của NMS
+            batch (int): Số frame tối đa mỗi lần suy luận, model export với dynamic=True nên batch > 1 sẽ chạy
+            1 lần cho cả batch. Defaults to 1.
+            imgsz (tuple): Kích thước (height, width) đầu vào model. Defaults to settings_inference.IMGSZ.
+        """
+        self.backend = create_backend(backend, model_path, device=device, conf=conf, iou=iou, batch=batch,
+                                      imgsz=imgsz)
+
+    def detect_batch(self, frames: list) -> list:
+        return self.backend.detect_batch(frames)
+
+    def detect(self, frame: np.ndarray) -> Detections:
+        return self.backend.detect(frame)
@@ -0,0 +1,166 @@
+from abc import ABC, abstractmethod
+import importlib
+import cv2
+import numpy as np
+from services.inference_services.Detections import Detections
+from core.config import settings_inference, settings_metric_transport
+
+
+def letterbox(image: np.ndarray, new_shape=(640, 640), color=(114, 114, 114)):
+    """Resize giữ tỉ lệ rồi pad về new_shape (height, width), giống LetterBox của ultralytics (ảnh nằm giữa)
+
+    Returns:
+        tuple: (ảnh đã letterbox, tỉ lệ resize, (pad trái, pad trên))
+    """
+    height, width = image.shape[:2]
+    ratio = min(new_shape[0] / height, new_shape[1] / width)
+    new_width, new_height = round(width * ratio), round(height * ratio)
+    pad_w, pad_h = (new_shape[1] - new_width) / 2, (new_shape[0] - new_height) / 2
+    if (width, height) != (new_width, new_height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+    top, bottom = round(pad_h - 0.1), round(pad_h + 0.1)
+    left, right = round(pad_w - 0.1), round(pad_w + 0.1)
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=color)
+    return image, ratio, (left, top)
+
+
+def non_max_suppression(boxes: np.ndarray, scores: np.ndarray, classes: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """NMS theo từng lớp (box khác lớp không loại nhau)
+
+    Returns:
+        np.ndarray: chỉ số các box được giữ, sắp xếp theo độ tin cậy giảm dần
+    """
+    if len(boxes) == 0:
+        return np.empty(0, dtype=np.int64)
+    # Dịch box của mỗi lớp ra 1 vùng riêng để chạy NMS 1 lần cho tất cả các lớp
+    shifted = boxes + classes[:, None] * (boxes.max() + 1)
+    x1, y1, x2, y2 = shifted.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        inter = (np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+                 * np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None))
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def decode_predictions(output: np.ndarray, conf: float, iou: float, ratio: float, pad: tuple,
+                       image_shape: tuple, max_det: int = 300) -> Detections:
+    """Giải mã output thô của YOLO (4 + số lớp, số anchor) của 1 ảnh thành Detections theo toạ độ ảnh gốc
+
+    Args:
+        output (np.ndarray): (4 + nc, A), 4 hàng đầu là cx, cy, w, h theo ảnh letterbox, các hàng sau là điểm từng lớp
+        conf (float): Ngưỡng tin cậy
+        iou (float): Ngưỡng IoU của NMS
+        ratio (float): Tỉ lệ resize của letterbox
+        pad (tuple): (pad trái, pad trên) của letterbox
+        image_shape (tuple): (height, width) của ảnh gốc
+        max_det (int): Số detection tối đa. Defaults to 300.
+    """
+    predictions = np.asarray(output, dtype=np.float32).T
+    class_scores = predictions[:, 4:]
+    classes = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(classes)), classes]
+    mask = scores > conf
+    predictions, scores, classes = predictions[mask], scores[mask], classes[mask]
+
+    xyxy = np.empty((len(predictions), 4), dtype=np.float32)
+    xyxy[:, :2] = predictions[:, :2] - predictions[:, 2:4] / 2
+    xyxy[:, 2:] = predictions[:, :2] + predictions[:, 2:4] / 2
+    keep = non_max_suppression(xyxy, scores, classes, iou)[:max_det]
+    xyxy, scores, classes = xyxy[keep], scores[keep], classes[keep]
+
+    xyxy -= np.array([pad[0], pad[1], pad[0], pad[1]], dtype=np.float32)
+    xyxy /= ratio
+    xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, image_shape[1])
+    xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, image_shape[0])
+    return Detections(xyxy, scores, classes)
+
+
+class InferenceBackend(ABC):
+    """Interface chung của các runtime suy luận: detect_batch(frames) -> list[Detections].
+
+    Class con chỉ cần load model trong __init__ và cài đặt forward(blob) chạy model trên batch ảnh đã
+    letterbox (B, 3, H, W) float32 RGB [0, 1], trả về output thô (B, 4 + nc, A). Letterbox, giải mã output và NMS
+    dùng chung ở đây. Runtime chỉ chạy được batch cố định thì đặt max_batch, detect_batch sẽ tự chia nhỏ.
+    """
+    max_batch = None  # None: model nhận batch động
+
+    def __init__(self, model_path: str, device: str = settings_metric_transport.DEVICE,
+                 conf: float = settings_inference.CONF, iou: float = settings_inference.IOU,
+                 batch: int = 1, imgsz=settings_inference.IMGSZ):
+        """
+        Args:
+            model_path (str): Đường dẫn đến model (file hoặc thư mục tuỳ runtime)
+            device (str): Dùng GPU hoặc CPU. Defaults to 'cpu'.
+            conf (float): Ngưỡng tin cậy về nhãn được dự đoán
+            iou (float): Ngưỡng IoU của NMS
+            batch (int): Số frame tối đa mỗi lần suy luận. Defaults to 1.
+            imgsz (tuple): Kích thước (height, width) đầu vào của model
+        """
+        self.model_path = model_path
+        self.device = device
+        self.conf = conf
+        self.iou = iou
+        self.batch = batch
+        self.imgsz = tuple(imgsz)
+
+    @abstractmethod
+    def forward(self, blob: np.ndarray) -> np.ndarray:
+        """Chạy model trên batch ảnh đã letterbox (B, 3, H, W) float32 RGB [0, 1], trả về output thô (B, 4 + nc, A)"""
+
+    def detect_batch(self, frames: list) -> list:
+        images, metas = [], []
+        for frame in frames:
+            image, ratio, pad = letterbox(frame, self.imgsz)
+            images.append(image)
+            metas.append((ratio, pad, frame.shape[:2]))
+        # BGR (opencv) -> RGB, HWC -> CHW, [0, 255] -> [0, 1]
+        blob = np.ascontiguousarray(np.stack(images)[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+        step = self.max_batch or len(frames)
+        outputs = np.concatenate([self.forward(blob[i:i + step]) for i in range(0, len(frames), step)])
+        return [
+            decode_predictions(output, self.conf, self.iou, ratio, pad, shape)
+            for output, (ratio, pad, shape) in zip(outputs, metas)
+        ]
+
+    def detect(self, frame: np.ndarray) -> Detections:
+        return self.detect_batch([frame])[0]
+
+
+# Tên backend -> class (hoặc đường dẫn "module.Class", chỉ import khi được chọn để runtime nào không cài
+# thì không ảnh hưởng tới các backend khác)
+BACKENDS = {
+    "ultralytics": "services.inference_services.backends.UltralyticsBackend.UltralyticsBackend",
+    "openvino": "services.inference_services.backends.OpenVINOBackend.OpenVINOBackend",
+    "onnx": "services.inference_services.backends.OnnxBackend.OnnxBackend",
+    "ncnn": "services.inference_services.backends.NcnnBackend.NcnnBackend",
+    "mnn": "services.inference_services.backends.MnnBackend.MnnBackend",
+}
+
+
+def register_backend(name: str, backend_cls):
+    """Đăng ký thêm backend (class hoặc đường dẫn "module.Class")"""
+    BACKENDS[name] = backend_cls
+
+
+def create_backend(name: str, model_path: str = None, **kwargs) -> InferenceBackend:
+    """Khởi tạo backend theo tên
+
+    Args:
+        name (str): Tên backend trong BACKENDS
+        model_path (str, optional): Đường dẫn model. Defaults to None (settings_inference.MODEL_PATHS.get(name)).
+        **kwargs: device, conf, iou, batch, imgsz
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Backend suy luận không hợp lệ: {name}, chọn một trong {list(BACKENDS)}")
+    backend_cls = BACKENDS[name]
+    if isinstance(backend_cls, str):
+        module_name, class_name = backend_cls.rsplit(".", 1)
+        backend_cls = getattr(importlib.import_module(module_name), class_name)
+    return backend_cls(model_path or settings_inference.MODEL_PATHS.get(name), **kwargs)
@@ -0,0 +1,210 @@
+import os
+import queue
+import time
+import numpy as np
+from multiprocessing import Process, Queue, shared_memory
+from services.inference_services.Detections import Detections
+from services.inference_services.Detector import LocalDetector
+from core.config import settings_inference, settings_metric_transport
+
+# Request dừng server, đặt vào hàng đợi requests
+_STOP = None
+
+
+def collect_batch(requests, max_batch: int, max_wait: float):
+    """Gom request thành 1 batch động: chờ request đầu tiên, sau đó lấy thêm tới khi đủ max_batch hoặc hết
+    max_wait giây kể từ request đầu tiên
+
+    Args:
+        requests (Queue): Hàng đợi request (queue.Queue hoặc multiprocessing.Queue)
+        max_batch (int): Số request tối đa trong 1 batch
+        max_wait (float): Thời gian tối đa chờ gom thêm request (giây)
+
+    Returns:
+        list | None: Danh sách request, None nếu nhận được yêu cầu dừng
+    """
+    first = requests.get()
+    if first is _STOP:
+        return None
+    batch = [first]
+    deadline = time.monotonic() + max_wait
+    while len(batch) < max_batch:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            item = requests.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if item is _STOP:
+            # Xử lý nốt batch hiện tại, lần gọi sau sẽ dừng
+            requests.put(_STOP)
+            break
+        batch.append(item)
+    return batch
+
+
+class RemoteDetector:
+    """Client của InferenceServer dùng trong process con, cùng interface detect(frame) với LocalDetector.
+
+    Frame được copy vào vùng nhớ chia sẻ riêng của client (không pickle ảnh qua Queue), request chỉ mang
+    (client_id, seq, shape). Mỗi client chỉ có tối đa 1 request đang chờ nên server đọc buffer an toàn.
+    """
+    def __init__(self, client_id: int, shm_name: str, capacity: int, requests, responses,
+                 timeout: float = settings_inference.REQUEST_TIMEOUT):
+        self.client_id = client_id
+        self.shm_name = shm_name
+        self.capacity = capacity
+        self.requests = requests
+        self.responses = responses
+        self.timeout = timeout
+        self._seq = 0
+        self._shm = None
+        self._buffer = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_shm"] = None
+        state["_buffer"] = None
+        return state
+
+    def _attach(self):
+        self._shm = shared_memory.SharedMemory(name=self.shm_name)
+        self._buffer = np.ndarray((self.capacity,), dtype=np.uint8, buffer=self._shm.buf)
+
+    def detect(self, frame: np.ndarray) -> Detections:
+        if self._buffer is None:
+            self._attach()
+        frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        if frame.size > self.capacity:
+            raise ValueError(f"Frame {frame.shape} vượt quá dung lượng buffer suy luận ({self.capacity} bytes)")
+        self._buffer[:frame.size] = frame.reshape(-1)
+        self._seq += 1
+        self.requests.put((self.client_id, self._seq, frame.shape))
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    raise queue.Empty
+                seq, detections = self.responses.get(timeout=remaining)
+            except queue.Empty:
+                raise TimeoutError(f"InferenceServer không phản hồi sau {self.timeout} giây")
+            # Bỏ qua phản hồi muộn của request đã timeout trước đó
+            if seq == self._seq:
+                return detections
+
+    def close(self):
+        self._buffer = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+
+class InferenceServer:
+    """Process suy luận dùng chung cho tất cả tuyến đường: chỉ 1 bản model nằm trong bộ nhớ, frame từ các
+    process con được gom thành batch động (tối đa max_batch frame hoặc chờ tối đa max_wait giây) rồi chạy 1 lần,
+    kết quả Detections được trả về đúng process con để đưa vào tracker của nó.
+
+    Examples:
+        >>> server = InferenceServer()
+        >>> detectors = [server.create_client() for _ in path_videos]  # tạo client trước khi start
+        >>> server.start()
+        >>> # truyền detectors[i] cho process con, process con gọi detectors[i].detect(frame)
+        >>> server.stop()
+    """
+    def __init__(self, backend=settings_inference.DEFAULT_BACKEND, model_path=None, device=settings_metric_transport.DEVICE,
+                 conf=settings_inference.CONF, iou=settings_inference.IOU,
+                 max_batch=settings_inference.MAX_BATCH_SIZE, max_wait=settings_inference.MAX_WAIT,
+                 frame_capacity=None, imgsz=settings_inference.IMGSZ):
+        """
+        Args:
+            backend (str): Tên backend suy luận (openvino, onnx, ncnn, mnn, ultralytics)
+            model_path (str, optional): Đường dẫn đến model. Defaults to None (đường dẫn cấu hình của backend).
+            device (str): Dùng GPU hoặc CPU. Defaults to 'cpu'.
+            conf (float): Ngưỡng tin cậy về nhãn được dự đoán
+            iou (float): Ngưỡng IoU của NMS
+            max_batch (int): Số frame tối đa trong 1 batch
+            max_wait (float): Thời gian tối đa chờ gom batch (giây)
+            frame_capacity (int, optional): Số byte tối đa của 1 frame đầu vào. Defaults to None (FRAME_SIZE x 3).
+            imgsz (tuple): Kích thước (height, width) đầu vào model, mọi frame trong batch được letterbox về đây
+        """
+        width, height = settings_metric_transport.FRAME_SIZE
+        self.backend = backend
+        self.model_path = model_path
+        self.device = device
+        self.conf = conf
+        self.iou = iou
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.frame_capacity = frame_capacity or width * height * 3
+        self.imgsz = tuple(imgsz)
+        self.requests = Queue()
+        self.process = None
+        self._buffers = []
+        self._responses = []
+        self._owner_pid = os.getpid()
+
+    def create_client(self) -> RemoteDetector:
+        """Tạo client cho 1 process con, phải gọi trước start()"""
+        if self.process is not None:
+            raise RuntimeError("Phải tạo client trước khi start InferenceServer")
+        shm = shared_memory.SharedMemory(create=True, size=self.frame_capacity)
+        responses = Queue()
+        self._buffers.append(shm)
+        self._responses.append(responses)
+        return RemoteDetector(len(self._buffers) - 1, shm.name, self.frame_capacity, self.requests, responses)
+
+    def start(self):
+        self.process = Process(
+            target=self.serve,
+            args=(
+                self.backend, self.model_path, self.device, self.conf, self.iou, self.max_batch, self.max_wait,
+                self.imgsz, [shm.name for shm in self._buffers], self.frame_capacity, self.requests, self._responses
+            ),
+            name=f"inference-server-{self.backend}-{self.imgsz[0]}x{self.imgsz[1]}",
+            daemon=True,
+        )
+        self.process.start()
+
+    @staticmethod
+    def serve(backend, model_path, device, conf, iou, max_batch, max_wait, imgsz, shm_names, frame_capacity,
+              requests, responses):
+        """Vòng lặp của process suy luận, static method để không phải pickle self (giống run_analyze_process)"""
+        detector = LocalDetector(model_path, backend=backend, device=device, conf=conf, iou=iou, batch=max_batch,
+                                 imgsz=imgsz)
+        buffers = [shared_memory.SharedMemory(name=name) for name in shm_names]
+        views = [np.ndarray((frame_capacity,), dtype=np.uint8, buffer=shm.buf) for shm in buffers]
+        try:
+            while True:
+                batch = collect_batch(requests, max_batch, max_wait)
+                if batch is None:
+                    break
+                frames = [views[client_id][:int(np.prod(shape))].reshape(shape) for client_id, _, shape in batch]
+                try:
+                    results = detector.detect_batch(frames)
+                except Exception as e:
+                    print(f"Lỗi khi suy luận batch {len(batch)} frame: {e}")
+                    results = [Detections() for _ in batch]
+                for (client_id, seq, _), detections in zip(batch, results):
+                    responses[client_id].put((seq, detections))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            frames = views = None
+            for shm in buffers:
+                shm.close()
+
+    def stop(self):
+        if self.process is not None and self.process.is_alive():
+            self.requests.put(_STOP)
+            self.process.join(timeout=5)
+            if self.process.is_alive():
+                self.process.terminate()
+        # Chỉ process tạo ra shared memory mới được unlink nó
+        if os.getpid() == self._owner_pid:
+            for shm in self._buffers:
+                shm.close()
+                shm.unlink()
+            self._buffers.clear()
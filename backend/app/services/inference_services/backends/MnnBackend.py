@@ -0,0 +1,30 @@
+import numpy as np
+from services.inference_services.InferenceBackend import InferenceBackend
+
+
+class MnnBackend(InferenceBackend):
+    """Chạy model MNN bằng MNN python (Interpreter/Session), từng ảnh một"""
+    max_batch = 1
+
+    def __init__(self, model_path: str, **kwargs):
+        super().__init__(model_path, **kwargs)
+        import MNN
+        self.MNN = MNN
+        self.interpreter = MNN.Interpreter(model_path)
+        self.session = self.interpreter.createSession()
+        self.input = self.interpreter.getSessionInput(self.session)
+        self.interpreter.resizeTensor(self.input, (1, 3, *self.imgsz))
+        self.interpreter.resizeSession(self.session)
+
+    def forward(self, blob: np.ndarray) -> np.ndarray:
+        MNN = self.MNN
+        image = MNN.Tensor((1, 3, *self.imgsz), MNN.Halide_Type_Float, np.ascontiguousarray(blob[:1]),
+                           MNN.Tensor_DimensionType_Caffe)
+        self.input.copyFrom(image)
+        self.interpreter.runSession(self.session)
+        output = self.interpreter.getSessionOutput(self.session)
+        shape = output.getShape()
+        host = MNN.Tensor(shape, MNN.Halide_Type_Float, np.zeros(shape, dtype=np.float32),
+                          MNN.Tensor_DimensionType_Caffe)
+        output.copyToHostTensor(host)
+        return np.array(host.getData(), dtype=np.float32).reshape(shape)
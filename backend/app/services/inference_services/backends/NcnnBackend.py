@@ -0,0 +1,24 @@
+import os
+import numpy as np
+from services.inference_services.InferenceBackend import InferenceBackend
+
+
+class NcnnBackend(InferenceBackend):
+    """Chạy model NCNN (model.ncnn.param + model.ncnn.bin, tên input/output in0/out0 như model_ncnn.py).
+    NCNN chạy từng ảnh một"""
+    max_batch = 1
+
+    def __init__(self, model_path: str, **kwargs):
+        super().__init__(model_path, **kwargs)
+        import ncnn
+        self.ncnn = ncnn
+        self.net = ncnn.Net()
+        self.net.opt.use_vulkan_compute = self.device != "cpu"
+        self.net.load_param(os.path.join(model_path, "model.ncnn.param"))
+        self.net.load_model(os.path.join(model_path, "model.ncnn.bin"))
+
+    def forward(self, blob: np.ndarray) -> np.ndarray:
+        with self.net.create_extractor() as extractor:
+            extractor.input("in0", self.ncnn.Mat(blob[0]).clone())
+            _, output = extractor.extract("out0")
+        return np.array(output)[None]
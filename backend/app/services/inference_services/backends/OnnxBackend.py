@@ -0,0 +1,26 @@
+import numpy as np
+from services.inference_services.InferenceBackend import InferenceBackend
+
+
+class OnnxBackend(InferenceBackend):
+    """Chạy model ONNX bằng onnxruntime"""
+    def __init__(self, model_path: str, **kwargs):
+        super().__init__(model_path, **kwargs)
+        import onnxruntime as ort
+        providers = ["CPUExecutionProvider"]
+        if self.device != "cpu" and "CUDAExecutionProvider" in ort.get_available_providers():
+            providers.insert(0, "CUDAExecutionProvider")
+        self.session = ort.InferenceSession(model_path, providers=providers)
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Chiều batch là số cố định nếu model không export với dynamic=True
+        if isinstance(model_input.shape[0], int):
+            self.max_batch = model_input.shape[0]
+        # Model có kích thước ảnh cố định thì chỉ chạy được đúng kích thước đó
+        if all(isinstance(dim, int) for dim in model_input.shape[2:]) and tuple(model_input.shape[2:]) != self.imgsz:
+            print(f"Model {model_path} có kích thước đầu vào cố định {tuple(model_input.shape[2:])}, bỏ qua imgsz="
+                  f"{self.imgsz}, export lại với dynamic=True hoặc imgsz tương ứng để giảm kích thước")
+            self.imgsz = tuple(model_input.shape[2:])
+
+    def forward(self, blob: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: blob})[0]
@@ -0,0 +1,26 @@
+import os
+import numpy as np
+from services.inference_services.InferenceBackend import InferenceBackend
+
+
+class OpenVINOBackend(InferenceBackend):
+    """Chạy model OpenVINO (fp32 hoặc int8) trực tiếp bằng openvino runtime. Model export với dynamic=True
+    nên cả batch chạy trong 1 lần gọi và được reshape về đúng imgsz (chỉ giữ chiều batch động) trước khi compile
+    để OpenVINO tối ưu cho kích thước cố định"""
+    def __init__(self, model_path: str, **kwargs):
+        super().__init__(model_path, **kwargs)
+        import openvino as ov
+        if os.path.isdir(model_path):
+            model_path = next(os.path.join(model_path, name) for name in os.listdir(model_path) if name.endswith(".xml"))
+        core = ov.Core()
+        model = core.read_model(model_path)
+        if model.input(0).get_partial_shape().is_dynamic:
+            model.reshape([-1, 3, *self.imgsz])
+        # Batch > 1 dùng THROUGHPUT để OpenVINO chia các ảnh trong batch cho nhiều stream
+        hint = "THROUGHPUT" if self.batch > 1 else "LATENCY"
+        self.model = core.compile_model(model, self.device.upper(),
+                                        {"PERFORMANCE_HINT": hint})
+        self.output = self.model.output(0)
+
+    def forward(self, blob: np.ndarray) -> np.ndarray:
+        return self.model(blob)[self.output]
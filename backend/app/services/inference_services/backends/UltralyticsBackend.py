@@ -0,0 +1,37 @@
+import numpy as np
+from services.inference_services.Detections import Detections
+from services.inference_services.InferenceBackend import InferenceBackend
+
+
+class UltralyticsBackend(InferenceBackend):
+    """Chạy model qua YOLO của ultralytics (tự nhận định dạng .pt, OpenVINO, ONNX...), dùng tiền xử lý và
+    NMS của ultralytics thay vì phần dùng chung"""
+    def __init__(self, model_path: str, **kwargs):
+        super().__init__(model_path, **kwargs)
+        from ultralytics import YOLO
+        self.model = YOLO(model_path, task='detect')
+
+    def forward(self, blob: np.ndarray) -> np.ndarray:
+        """Output thô của AutoBackend ultralytics, chỉ dùng khi gọi trực tiếp (detect_batch dùng predict)"""
+        import torch
+        if self.model.predictor is None:
+            # predict 1 lần để ultralytics dựng AutoBackend trên đúng device
+            self.model.predict(np.zeros((*self.imgsz, 3), dtype=np.uint8), conf=self.conf, iou=self.iou,
+                               device=self.device, imgsz=self.imgsz, verbose=False)
+        model = self.model.predictor.model
+        tensor = torch.from_numpy(blob).to(model.device)
+        output = model(tensor.half() if model.fp16 else tensor)
+        output = output[0] if isinstance(output, (list, tuple)) else output
+        return output.float().cpu().numpy()
+
+    def detect_batch(self, frames: list) -> list:
+        results = self.model.predict(frames, conf=self.conf, iou=self.iou, device=self.device,
+                                     imgsz=self.imgsz, batch=self.batch, verbose=False)
+        return [
+            Detections(
+                result.boxes.xyxy.cpu().numpy(),
+                result.boxes.conf.cpu().numpy(),
+                result.boxes.cls.cpu().numpy(),
+            )
+            for result in results
+        ]
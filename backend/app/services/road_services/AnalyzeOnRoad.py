@@ -1,7 +1,12 @@
 import os
+import queue
+import time
+import cv2
 from overrides import override
 from services.road_services.AnalyzeOnRoadBase import AnalyzeOnRoadBase
-from core.config import settings_metric_transport
+from core.config import settings_metric_transport, settings_inference
+from services.road_services.SharedRoadSlot import STAGE_QUANTILES, TRAFFIC_WINDOWS
+from utils.transport_utils import convert_frame_to_byte
 # Đặt như này để tránh trường hợp lỗi do dùng chung thư viện AI 
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 
@@ -10,8 +15,9 @@ class AnalyzeOnRoad(AnalyzeOnRoadBase):
     mà chỉ là một chút cải tiến từ code base (class Base) để có thể vừa xử lý video đầu vào ở một process\
     khác vừa có thể truy xuất thông tin về kết quả mà không bị hiện tượng tranh chấp dữ liệu    
     """    
-    def __init__(self, path_video, meter_per_pixel, info_dict, frame_dict, region, model_path = settings_metric_transport.MODELS_PATH, time_step=30,
-                 is_draw=True, device= settings_metric_transport.DEVICE, iou=0.3, conf=0.2, show=True):
+    def __init__(self, path_video, meter_per_pixel, shared_slot, region, info_events=None, model_path = None, time_step=30,
+                 is_draw=True, device= settings_metric_transport.DEVICE, iou=0.3, conf=0.2, show=True, detector=None,
+                 detection_stride=1, backend=settings_inference.DEFAULT_BACKEND, imgsz=None, vehicle_events=None):
         """Class này kế thừa từ class Base (xử lý tuần tự). Class con này chưa phải là code để multiprocessing\
         mà chỉ là một chút cải tiến từ code base (class Base) để có thể vừa xử lý video đầu vào ở một process\
         khác vừa có thể truy xuất thông tin về kết quả mà không bị hiện tượng tranh chấp dữ liệu
@@ -19,12 +25,12 @@ class AnalyzeOnRoad(AnalyzeOnRoadBase):
         Args:
             path_video (str): Đường dẫn đến video
             meter_per_pixel (float): Tỉ lệ 1 mét ngoài đời với 1 pixel
-            info_dict (Manager().dict()): Một dict dùng để chia sẽ giữ liệu trung gian giữa các process với nhau,\
-            mặc định là sẽ được truyền tham chiếu và nó sẽ được thay đỏi nếu các process con thay đổi nó cho nên\
-            ta có thể truy cập dữ liệu kết quả xử lý ở bên ngoài dễ dàng nhưng phải đảm bảo truy cập an toàn
-            frame_dict (Manager().dict()): Tương tự info_dict nhưng dùng để chứa thông tin ảnh dạng bytecode đã được encode
-            do manager() không hỗ trợ kiểu này nên ta sẽ dùng dict trung gian để chưa mã bytecode đó ở value (key là "frame")
-            model_path (str): Đường dẫn đến model. Defaults to "best.pt".
+            shared_slot (SharedRoadSlot): Vùng nhớ chia sẻ giữa các process, process con ghi frame và thông tin\
+            phương tiện vào đây còn process chính (API) đọc trực tiếp mà không cần đi qua process manager
+            region (np.array): Vùng đa giác cần phân tích trên frame
+            info_events (multiprocessing.Queue, optional): Hàng đợi báo cho process chính biết tuyến đường vừa có
+            thông tin mới để đẩy ngay tới client, không phải chờ poll. Defaults to None.
+            model_path (str): Đường dẫn đến model. Defaults to None (đường dẫn cấu hình của backend).
             time_step (int): Khoảng thời gian giữa 2 lần cập nhật thông tin các phương tiện. Defaults to 30.
             is_draw (bool): Biến chỉ định có vẽ các thông tin xử lý được lên frame hay không. Defaults to True.
             device (str): Dùng GPU hoặc CPU. Defaults to 'cpu'.
@@ -32,63 +38,142 @@ class AnalyzeOnRoad(AnalyzeOnRoadBase):
             conf (float): Ngưỡng tin cậy về nhãn được dự đoán. Defaults to 0.2.
             show (bool): Hiển thị video xử lý qua opencv, đặt là False khi tích làm server tránh lãng phí tài nguyên.\
             Defaults to True.
+            detector (RemoteDetector, optional): Client của InferenceServer dùng chung, None thì tự load model.\
+            Defaults to None.
+            detection_stride (int): Số frame giữa 2 lần chạy detect, 1 = detect mọi frame. Defaults to 1.
+            backend (str): Backend suy luận khi tự load model (openvino, onnx, ncnn, mnn, ultralytics).
+            imgsz (int | tuple, optional): Kích thước đầu vào model khi tự load model. Defaults to None.
+            vehicle_events (multiprocessing.Queue, optional): Hàng đợi gửi bản ghi các phương tiện đã rời khung
+            hình (xem publish_departures) cho process chính. Defaults to None (không ghi lại).
             
         Examples:`
         Hướng dẫn chạy xử lý 1 video đơn
         >>> analyzer = AnalyzeOnRoad(
         >>>     path_video=path_video,
         >>>     meter_per_pixel=meter_per_pixel,
-        >>>     info_dict=info_dict,
-        >>>     frame_dict=frame_dict,
+        >>>     shared_slot=shared_slot,
         >>>     **kwargs
         >>> )
         >>> analyzer.process_on_single_video()
         """
         super().__init__(path_video, meter_per_pixel, model_path, time_step,
-                 is_draw, device, iou, conf, show, region)
-        self.info_dict = info_dict
-        self.frame_dict = frame_dict
+                 is_draw, device, iou, conf, show, region, detector, detection_stride,
+                 backend, imgsz)
+        self.shared_slot = shared_slot
+        self.info_events = info_events
+        self.vehicle_events = vehicle_events
+        self.tracker.speed_engine.store.record_departures = vehicle_events is not None
 
     @override
-    def update_for_frame(self):
-        """Cập nhật frame đang xử lý hiện tại gán vào Manage.dict() để chia sẽ dữ liệu các process với nhau dễ dàng. 
+    def update_for_frame(self, job=None):
+        """Encode JPEG frame đang xử lý hiện tại thành các variant (thumb, medium, full...), mỗi variant đúng 1 lần,
+        rồi ghi vào vùng nhớ chia sẻ kèm frame id và thời điểm capture. Process chính chỉ việc trả về bytes đã
+        encode sẵn, không phải encode lại cho từng client.
+
+        Args:
+            job (_RenderJob, optional): Frame cần publish khi chạy pipeline. Defaults to None (frame hiện tại).
         """
+        source = job if job is not None else self
         try: 
-           self.frame_dict["frame"] = self.frame_output
+           payloads = {}
+           with self.timer.stage("encode"):
+               for name, variant in settings_metric_transport.FRAME_VARIANTS.items():
+                   img = source.frame_output
+                   if (img.shape[1], img.shape[0]) != tuple(variant["size"]):
+                       img = cv2.resize(img, variant["size"], interpolation=cv2.INTER_AREA)
+                   frame_bytes = convert_frame_to_byte(img, quality=variant["quality"])
+                   if frame_bytes is None:
+                       self.publish_dropped += 1
+                       return
+                   payloads[name] = frame_bytes
+           with self.timer.stage("publish"):
+               self.shared_slot.write_frame(payloads, timestamp=source.capture_time)
         except Exception as e:
+            self.publish_dropped += 1
             print(f"Lỗi khi cập nhật frame mới nhất của {self.name}: {e}")
 
     @override
     def update_for_vehicle(self):
-        """Hàm cập nhật thông tin về processing đang xử lý hiện tại và gán vào Manage.dict() để chia sẽ với nhau."""
+        """Hàm cập nhật thông tin về processing đang xử lý hiện tại và ghi vào vùng nhớ chia sẻ."""
         try:
-            self.info_dict["count_car"] = self.count_car_display
-            self.info_dict["count_motor"] = self.count_motor_display
-            self.info_dict["speed_car"] = self.speed_car_display
-            self.info_dict["speed_motor"] = self.speed_motor_display
+            self.shared_slot.write_metrics(
+                count_car=self.count_car_display,
+                count_motor=self.count_motor_display,
+                speed_car=self.speed_car_display,
+                speed_motor=self.speed_motor_display,
+            )
+            if self.info_events is not None:
+                self.info_events.put_nowait(self.name)
         except Exception as e:
             print(f"Lỗi khi update thông tin phương tiện của {self.name}: {e}")
 
+    def publish_departures(self):
+        """Gửi bản ghi các phương tiện đã rời khung hình (track bị xoá khỏi TrackStore) cho process chính, thời
+        điểm theo PTS được đổi ra epoch giây. Hàng đợi đầy thì bỏ, không chặn process con"""
+        departures = self.tracker.speed_engine.store.drain_departures()
+        if len(departures["track_id"]) == 0:
+            return
+        offset = time.time() - self.pts
+        departures["first_time"] = departures["first_time"] + offset
+        departures["last_time"] = departures["last_time"] + offset
+        try:
+            self.vehicle_events.put_nowait((self.name, departures))
+        except queue.Full:
+            pass
+
+    @override
+    def update_for_stats(self):
+        """Ghi số frame, fps và thời gian từng công đoạn vào vùng nhớ chia sẻ để API xuất ra /metrics, kèm giá trị
+        các cửa sổ trượt của số xe và tốc độ"""
+        try:
+            if self.vehicle_events is not None:
+                self.publish_departures()
+            self.shared_slot.write_windows(self.aggregator.summary_array(self.pts, TRAFFIC_WINDOWS))
+            self.shared_slot.write_stats(
+                stages={
+                    name: (stats.count, stats.total, stats.quantiles(STAGE_QUANTILES))
+                    for name, stats in list(self.timer.stages.items())
+                },
+                frames_processed=self.frames_processed,
+                frames_dropped=self.frames_dropped + self.publish_dropped,
+                frames_skipped=self.clock.skipped if self.clock is not None else 0,
+                source_connected=int(getattr(self.source, "connected", self.source is not None)),
+                source_reconnects=getattr(self.source, "reconnects", 0),
+                detections=self.scheduler.detections,
+                tracks_stored=len(self.tracker.speed_engine.store),
+                tracks_evicted=self.tracker.speed_engine.store.evicted,
+                decode_queue_depth=self.stage_queues["decode"].depth if self.stage_queues else 0,
+                render_queue_depth=self.stage_queues["render"].depth if self.stage_queues else 0,
+                decode_queue_dropped=self.stage_queues["decode"].dropped if self.stage_queues else 0,
+                render_queue_dropped=self.stage_queues["render"].dropped if self.stage_queues else 0,
+                motion_checks=self.motion_gate.checks if self.motion_gate is not None else 0,
+                motion_skipped=self.motion_gate.skipped if self.motion_gate is not None else 0,
+                processing_fps=self.processing_fps,
+                inference_fps=self.inference_fps,
+            )
+        except Exception as e:
+            print(f"Lỗi khi cập nhật thống kê của {self.name}: {e}")
+
 #************************************************************************ Script for testing *******************************************************
 if __name__ == "__main__":
-    from multiprocessing import Manager
-    manager = Manager()
+    from services.road_services.SharedRoadSlot import SharedRoadSlot
   
     path_video = "./video_test/Đường Láng.mp4"
     meter_per_pixel = 0.04
-    info_dict = manager.dict({"count_car": 0,
-                             "count_motor": 0,
-                             "speed_car": 0,
-                             "speed_motor": 0})
-    frame_dict = manager.dict({"frame": None})
+    shared_slot = SharedRoadSlot.create(
+        frame_capacities=SharedRoadSlot.capacities_for(settings_metric_transport.FRAME_VARIANTS))
     
     analyzer = AnalyzeOnRoad(
         path_video=path_video,
         meter_per_pixel=meter_per_pixel,
-        info_dict=info_dict,
-        frame_dict=frame_dict,
+        shared_slot=shared_slot,
+        region=settings_metric_transport.REGIONS[0],
         show=True
     )
     
-    analyzer.process_on_single_video()
+    try:
+        analyzer.process_on_single_video()
+    finally:
+        shared_slot.close()
+        shared_slot.unlink()
     
\ No newline at end of file
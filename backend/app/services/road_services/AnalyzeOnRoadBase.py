@@ -3,13 +3,41 @@ import cvzone
 import cv2
 import os
 import numpy as np
+import threading
+import time
 from datetime import datetime
-from ultralytics import solutions
 from utils.transport_utils import *
-from core.config import settings_metric_transport
+from services.road_services.VehicleTracker import VehicleTracker
+from services.road_services.DetectionScheduler import DetectionScheduler
+from services.road_services.MotionGate import MotionGate
+from services.road_services.RegionIndex import RegionIndex, as_named_regions
+from services.road_services.StageQueue import StageQueue
+from services.road_services.SourceClock import SourceClock
+from services.road_services.FrameSource import open_source, source_name
+from services.road_services.TrafficAggregator import TrafficAggregator
+from utils.stage_timer import StageTimer
+from core.config import settings_metric_transport, settings_inference, settings_monitoring
 # Thêm cái này để tránh xung đột
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 
+
+class _RenderJob:
+    """Ảnh chụp kết quả phân tích 1 frame, đủ để vẽ và publish ở thread khác mà không chạm vào trạng thái của
+    tracker (tracker đã chuyển sang frame sau)"""
+    __slots__ = ("frame_output", "frame_predict", "capture_time", "ids", "classes", "centers", "in_region", "speeds")
+
+    def __init__(self, analyzer):
+        self.frame_output = analyzer.frame_output
+        self.frame_predict = analyzer.frame_predict
+        self.capture_time = analyzer.capture_time
+        self.ids = analyzer.ids
+        self.classes = analyzer.classes
+        self.centers = analyzer.centers
+        self.in_region = analyzer.in_region
+        # Tracker tạo mảng tốc độ mới mỗi frame nên không cần copy
+        self.speeds = analyzer.speeds
+
+
 class AnalyzeOnRoadBase:
     """Class gói gọn script xử lý tuần tự nhưng đảm bảo tính đóng gói OOP
         Attributes:
@@ -17,7 +45,26 @@ class AnalyzeOnRoadBase:
             speed_car_display (int): trung bình tốc độ tức thời của oto
             count_moto_display (int): số lượng xe xe máy trung bình
             speed_moto_display (int): trung bình tốc độ tức thời của xe máy
-            speed_tool (solutions.SpeedEstimator()): đối tượng SpeedEstimator của YOLO
+            detector (LocalDetector | RemoteDetector): đối tượng detect phương tiện trên frame
+            tracker (VehicleTracker): ByteTrack + ước lượng tốc độ từ kết quả của detector
+            scheduler (DetectionScheduler): chọn frame chạy detect, các frame còn lại chỉ đẩy track bằng Kalman
+            motion_gate (MotionGate | None): bỏ qua detect khi region không có chuyển động
+            timer (StageTimer): thời gian từng công đoạn (decode, resize, motion, inference, tracking, drawing, encode,\
+            publish, frame) dùng cho benchmark và metrics
+            frames_processed (int): số frame đã xử lý
+            frames_dropped (int): số frame lỗi khi xử lý (chỉ thread suy luận ghi)
+            publish_dropped (int): số frame lỗi khi vẽ, encode hoặc publish (chỉ thread vẽ ghi khi chạy pipeline),\
+            tách riêng với frames_dropped để mỗi bộ đếm chỉ có 1 thread ghi
+            stage_queues (dict): "decode" / "render" -> StageQueue giữa các thread khi chạy pipeline, rỗng khi\
+            chạy tuần tự
+            processing_fps (float): số frame xử lý mỗi giây, tính lại sau mỗi STATS_INTERVAL
+            inference_fps (float): số frame chạy detect mỗi giây, tính lại sau mỗi STATS_INTERVAL
+            regions (dict): tên vùng -> đa giác cần phân tích, chỉ phương tiện có tâm nằm trong vùng mới được đếm,\
+            tính tốc độ và vẽ
+            region_index (RegionIndex): mask các vùng trên vùng crop, dùng chung cho đếm, tốc độ và vẽ
+            region_counts (dict): tên vùng -> {"car", "motor"} số phương tiện trong vùng ở frame hiện tại
+            crop_box (tuple): (x0, y0, x1, y1) vùng crop đưa vào model, bounding box của các vùng
+            imgsz (tuple): (height, width) đầu vào model ứng với vùng crop
             frame_output (np.array): ảnh đã qua xử lý được vẽ hoặc không vẽ (tuỳ vào biến is_draw)\
             các thông tin được chuẩn đoán
         Examples:
@@ -33,15 +80,18 @@ class AnalyzeOnRoadBase:
             >>> analyzer.process_on_single_video()
     """
     def __init__(self, path_video = "./video_test/Đường Láng.mp4", meter_per_pixel = 0.06,
-                 model_path= settings_metric_transport.MODELS_PATH, time_step=30,
+                 model_path= None, time_step=30,
                  is_draw=True, device= settings_metric_transport.DEVICE, iou=0.3, conf=0.2, show=False,
-                 region = np.array([[50, 400], [50, 265], [370, 130], [600, 130], [600, 400]])):
+                 region = np.array([[50, 400], [50, 265], [370, 130], [600, 130], [600, 400]]), detector=None,
+                 detection_stride=1, backend=settings_inference.DEFAULT_BACKEND, imgsz=None, name=None):
         """Hàm xử lý tuần tự như một Script đơn giản áp dụng YOLO và cải tiến hơn là ở việc gói gọn trong 1 class
 
         Args:
-            path_video (str): Đường dẫn đến video
-            meter_per_pixel (float): Tỉ lệ 1 mét ngoài đời với 1 pixel
-            model_path (str): Đường dẫn đến model. Defaults to "best.pt".
+            path_video (str): Đường dẫn nguồn frame: file video, thư mục ảnh, rtsp:// / http:// (camera),\
+            stream+file:// (file phát như camera), synthetic:// (video giả lập), xem FrameSource.open_source
+            meter_per_pixel (float | dict): Tỉ lệ 1 mét ngoài đời với 1 pixel, hoặc 4 điểm homography\
+            {"image": [...], "world": [...]} (xem GroundProjection.from_config)
+            model_path (str): Đường dẫn đến model. Defaults to None (đường dẫn cấu hình của backend).
             time_step (int): Khoảng thời gian giữa 2 lần cập nhật thông tin các phương tiện. Defaults to 30.
             is_draw (bool): Biến chỉ định có vẽ các thông tin xử lý được lên frame hay không. Defaults to True.
             device (str): Dùng GPU hoặc CPU. Defaults to 'cpu'.
@@ -50,47 +100,69 @@ class AnalyzeOnRoadBase:
             show (bool): Hiển thị video xử lý qua opencv, đặt là False khi tích hợp làm server tránh lãng phí tài nguyên.\
             Defaults to True.
             max_buffer_size (int): Kích thước tối đa của buffer cho deque. Defaults to 900.
+            detector (optional): Đối tượng có hàm detect(frame) -> Detections, ví dụ RemoteDetector của\
+            InferenceServer dùng chung. Defaults to None (tự load model_path trong process này).
+            detection_stride (int): Số frame giữa 2 lần chạy detect, 1 = detect mọi frame. Defaults to 1.
+            region (np.array | dict): Vùng đa giác cần phân tích, hoặc dict tên vùng -> đa giác khi 1 camera có\
+            nhiều vùng (ví dụ mỗi chiều đường 1 vùng).
+            backend (str): Backend suy luận khi tự load model (openvino, onnx, ncnn, mnn, ultralytics).
+            imgsz (int | tuple, optional): Kích thước đầu vào model khi tự load model, số nguyên = cạnh dài theo\
+            tỉ lệ vùng crop, tuple = (height, width). Defaults to None (settings_inference.IMGSZ).
+            name (str, optional): Tên tuyến đường. Defaults to None (lấy từ path_video, xem source_name).
         """
-        self.speed_tool = solutions.SpeedEstimator(
-            model=model_path,
-            tracker = 'bytetrack.yaml',
-            verbose=False,
-            show=False,
-            device=device,
-            iou=iou,
-            conf=conf,
-            meter_per_pixel=meter_per_pixel,
-            max_hist=20
-        )
-
-        self.region = region
-        self.region_pts = region.reshape((-1, 1, 2))
+        # Chỉ đưa vào model vùng bao quanh các vùng đa giác thay vì cả frame
+        self.regions = as_named_regions(region)
+        self.crop_box = region_crop_box(self.regions, settings_metric_transport.FRAME_SIZE,
+                                        settings_metric_transport.REGION_CROP_MARGIN)
+        self.region_index = RegionIndex(self.regions, self.crop_box)
+        self.region_counts = {name: {"car": 0, "motor": 0} for name in self.regions}
+        self.imgsz = inference_size_for(self.crop_box, settings_inference.IMGSZ if imgsz is None else imgsz)
+        if detector is None:
+            from services.inference_services.Detector import LocalDetector
+            detector = LocalDetector(model_path, backend=backend, device=device, conf=conf, iou=iou, imgsz=self.imgsz)
+        self.detector = detector
+        self.tracker = VehicleTracker(meter_per_pixel, origin=self.crop_box[:2])
+        self.scheduler = DetectionScheduler(detection_stride)
+        self.motion_gate = None
+        if settings_inference.USE_MOTION_GATE:
+            self.motion_gate = MotionGate(list(self.regions.values()), self.crop_box)
+        self.timer = StageTimer()
+
+        # Thống kê vận hành, được ghi ra ngoài qua update_for_stats sau mỗi STATS_INTERVAL giây
+        self.frames_processed = 0
+        self.frames_dropped = 0
+        self.publish_dropped = 0
+        self.processing_fps = 0.0
+        self.inference_fps = 0.0
+        self._stats_time = time.monotonic()
+        self._stats_frames = 0
+        self._stats_detections = 0
+        self.stage_queues = {}
+
+        self.region_pts = [polygon.reshape((-1, 1, 2)).astype(np.int32) for polygon in self.regions.values()]
 
         self.show = show
         self.path_video = path_video
-        self.name = path_video.split('/')[-1][:-4]
+        self.name = name or source_name(path_video)
+        self.source = None
 
         self.count_car_display = 0
-        self.list_count_car = []
         self.speed_car_display = 0
-        self.list_speed_car = []
-
         self.count_motor_display = 0
-        self.list_count_motor = []
         self.speed_motor_display = 0
-        self.list_speed_motor = []
+        # Cửa sổ time_step dùng cho thông tin hiển thị, các cửa sổ TRAFFIC_WINDOWS được ghi ra ngoài
+        self.aggregator = TrafficAggregator(windows=sorted({time_step, *settings_metric_transport.TRAFFIC_WINDOWS}))
 
-        self.time_pre = datetime.now()
+        self.time_pre = 0.0  # PTS của lần cập nhật thông tin phương tiện gần nhất
         self.frame_output = None
         self.time_step = time_step
         self.frame_predict = None
         self.is_draw = is_draw
         self.delta_time = 0
         self.time_pre_for_fps = datetime.now()
-
-        # ROI
-        self.roi_y_start = 130
-        self.roi_x_start = 50
+        self.capture_time = None  # Thời điểm đọc frame hiện tại từ nguồn video (time.time())
+        self.pts = 0.0            # Presentation timestamp (giây) của frame hiện tại theo SourceClock
+        self.clock = None
 
         # Draw
         self.font = cv2.FONT_HERSHEY_SIMPLEX
@@ -102,159 +174,172 @@ class AnalyzeOnRoadBase:
 
         # Tracking
         self.ids = None
-        self.speeds = {}
+        self.speeds = np.empty(0)
         self.boxes = None
         self.classes = None
+        self.centers = np.empty((0, 2), dtype=np.int32)  # Tâm box theo toạ độ vùng crop
+        self.in_region = np.empty(0, dtype=bool)         # Track có tâm nằm trong vùng bất kỳ
 
     @abstractmethod
-    def update_for_frame(self):
+    def update_for_frame(self, job=None):
         pass
 
     @abstractmethod
     def update_for_vehicle(self):
         pass
 
+    @abstractmethod
+    def update_for_stats(self):
+        pass
+
+    def update_stats(self):
+        """Tính lại fps và gọi update_for_stats khi đã qua STATS_INTERVAL giây kể từ lần trước"""
+        now = time.monotonic()
+        elapsed = now - self._stats_time
+        if elapsed < settings_monitoring.STATS_INTERVAL:
+            return
+        self.processing_fps = (self.frames_processed - self._stats_frames) / elapsed
+        self.inference_fps = (self.scheduler.detections - self._stats_detections) / elapsed
+        self._stats_time = now
+        self._stats_frames = self.frames_processed
+        self._stats_detections = self.scheduler.detections
+        self.update_for_stats()
+
     def update_data(self):
         """Hàm này sẽ được gọi để cập nhật dữ liệu cho frame và thông tin phương tiện sau một khoảng thời gian
             đã thiết lập là time_step"""
 
         # Gọi hàm này để cập nhật dữ liệu cho frame (luôn được cập nhật đảm bảo tính realtime)
         self.update_for_frame()
+        self.update_vehicle_data()
 
-        # Tính toán thời gian đã trôi qua kể từ lần cập nhật trước
-        time_now = datetime.now()
-        self.delta_time = (time_now - self.time_pre).total_seconds()
+    def update_vehicle_data(self):
+        """Cập nhật thông tin phương tiện (trung bình trong time_step) khi đủ thời gian"""
+        # Tính toán thời gian (theo PTS của video) đã trôi qua kể từ lần cập nhật trước
+        self.delta_time = self.pts - self.time_pre
 
         # Khi đủ thời gian đã thiết lập, cập nhật thông tin phương tiện
         if self.delta_time >= self.time_step:
-            self.time_pre = time_now
+            self.time_pre = self.pts
 
-            # Tính toán trung bình các giá trị - deque tự động giới hạn size
-            self.count_car_display = avg_none_zero(self.list_count_car)
-            self.speed_car_display = avg_none_zero(self.list_speed_car)
-            self.count_motor_display = avg_none_zero(self.list_count_motor)
-            self.speed_motor_display = avg_none_zero(self.list_speed_motor)
+            # Trung bình trong cửa sổ time_step giây vừa qua
+            window = self.aggregator.summary(self.time_step, self.pts)
+            self.count_car_display = int(window["car"]["count"])
+            self.speed_car_display = int(window["car"]["speed_mean"])
+            self.count_motor_display = int(window["motor"]["count"])
+            self.speed_motor_display = int(window["motor"]["speed_mean"])
 
             # Cập nhật thông tin phương tiện vào info_dict
             self.update_for_vehicle()
 
-            # Reset danh sách để chuẩn bị cho lần cập nhật tiếp theo
-            self.list_count_car.clear()
-            self.list_count_motor.clear()
-            self.list_speed_car.clear()
-            self.list_speed_motor.clear()
-
     def process_single_frame(self, frame_input):
-        """Hàm này xử lý từng frame một
+        """Hàm này xử lý từng frame một (phân tích, vẽ, publish tuần tự)
         Args:
             frame_input (np.array): Ảnh được đọc từ opencv
         """
+        if not self.analyze_frame(frame_input):
+            return
+        # Vẽ đè lên hình các thông tin
+        if self.is_draw:
+            with self.timer.stage("drawing"):
+                self.draw_info_to_frame_output()
+        # Cập nhật data
+        self.update_data()
+
+    def analyze_frame(self, frame_input) -> bool:
+        """Crop, detect (hoặc chỉ đẩy track) và tổng hợp kết quả của 1 frame, chưa vẽ và publish
+
+        Args:
+            frame_input (np.array): Ảnh được đọc từ opencv
+
+        Returns:
+            bool: False nếu có lỗi
+        """
         try:
             # Tránh copy toàn bộ frame, chỉ tạo view
             self.frame_output = frame_input
 
             # Sử dụng view thay vì copy - ascontiguousarray để đảm bảo memory layout
-            self.frame_predict = np.ascontiguousarray(
-                self.frame_output[self.roi_y_start:, self.roi_x_start:]
-            )
-
-            # Cần dùng bản copy để tránh công cụ ghi đè label lên ảnh đầu vào
-            self.speed_tool.process(self.frame_predict.copy())
-
-            self.post_processing()
-
-            # Vẽ đè lên hình các thông tin
-            if self.is_draw:
-                self.draw_info_to_frame_output()
-            # p = Thread(target= lambda : self.post_processing())
-            # p.start()
-
-
-            # Cập nhật data
-            self.update_data()
+            x0, y0, x1, y1 = self.crop_box
+            self.frame_predict = np.ascontiguousarray(self.frame_output[y0:y1, x0:x1])
+
+            # Detector không ghi đè lên ảnh đầu vào nên không cần copy
+            should_detect = self.scheduler.should_detect()
+            if should_detect and self.motion_gate is not None:
+                with self.timer.stage("motion"):
+                    should_detect = self.motion_gate.check(self.frame_predict)
+            if should_detect:
+                with self.timer.stage("inference"):
+                    detections = self.detector.detect(self.frame_predict)
+                with self.timer.stage("tracking"):
+                    self.tracker.update(detections, self.frame_predict, timestamp=self.pts)
+                    self.scheduler.record_detection(detections, self.tracker.scores)
+                    self.post_processing()
+            else:
+                with self.timer.stage("tracking"):
+                    self.tracker.predict(self.frame_predict, timestamp=self.pts)
+                    self.scheduler.record_prediction()
+                    self.post_processing()
+            return True
 
         except Exception as e:
+            self.frames_dropped += 1
             print(f"Lỗi khi xử lý với file {self.name}: {e}")
+            return False
 
     def post_processing(self):
-        if self.speed_tool.track_data is not None:
-            # Batch convert to numpy một lần thay vì nhiều lần
-            track_data = self.speed_tool.track_data
-            self.speeds = self.speed_tool.spd
-            self.ids = track_data.id.cpu().numpy().astype(np.int32)
-            self.classes = track_data.cls.cpu().numpy().astype(np.int32)
-            self.boxes = track_data.xyxy.cpu().numpy().astype(np.int32)
-
-            car_mask = (self.classes == 0)
-            motor_mask = (self.classes == 1)
+        # Frame không có track nào vẫn cập nhật để không vẽ lại track cũ, frame 0 xe không tính vào số xe trung bình
+        self.speeds = self.tracker.speeds
+        self.ids = self.tracker.ids
+        self.classes = self.tracker.classes
+        self.boxes = self.tracker.boxes
 
-            count_car = np.sum(car_mask)
-            count_motor = np.sum(motor_mask)
+        # Tâm box (toạ độ vùng crop) và các vùng chứa tâm, tính 1 lần dùng chung cho đếm, tốc độ và vẽ
+        self.centers = ((self.boxes[:, :2] + self.boxes[:, 2:4]) // 2).astype(np.int32)
+        region_bits = self.region_index.lookup(self.centers)
+        self.in_region = region_bits != 0
 
-            self.list_count_car.append(int(count_car))
-            self.list_count_motor.append(int(count_motor))
+        car_mask = (self.classes == 0) & self.in_region
+        motor_mask = (self.classes == 1) & self.in_region
+        for i, name in enumerate(self.region_index.names):
+            in_name = (region_bits >> np.uint32(i)) & 1 == 1
+            self.region_counts[name] = {"car": int(np.sum(car_mask & in_name)), "motor": int(np.sum(motor_mask & in_name))}
 
-            car_ids = self.ids[car_mask]
-            motor_ids = self.ids[motor_mask]
+        # Track chưa đủ dữ liệu có tốc độ NaN
+        has_speed = ~np.isnan(self.speeds)
+        self.aggregator.add(self.pts, int(np.sum(car_mask)), int(np.sum(motor_mask)),
+                            self.speeds[car_mask & has_speed], self.speeds[motor_mask & has_speed])
 
-            car_speeds = [self.speeds[tid] for tid in car_ids if tid in self.speeds]
-            motor_speeds = [self.speeds[tid] for tid in motor_ids if tid in self.speeds]
 
-            if car_speeds:
-                self.list_speed_car.extend(car_speeds)
-            if motor_speeds:
-                self.list_speed_motor.extend(motor_speeds)
+    def draw_info_to_frame_output(self, job: _RenderJob = None):
+        """Hàm này để vẽ các thông tin lên ảnh - optimized version
 
-
-    def draw_info_to_frame_output(self):
-        """Hàm này để vẽ các thông tin lên ảnh - optimized version"""
+        Args:
+            job (_RenderJob, optional): Kết quả phân tích cần vẽ khi chạy pipeline. Defaults to None (frame hiện tại).
+        """
+        job = job if job is not None else _RenderJob(self)
         try:
-            if self.ids is not None and len(self.ids) > 0:
-                # Vectorized center calculation
-                x1 = self.boxes[:, 0]
-                y1 = self.boxes[:, 1]
-                x2 = self.boxes[:, 2]
-                y2 = self.boxes[:, 3]
-
-                cx = ((x1 + x2) // 2).astype(np.int32)
-                cy = ((y1 + y2) // 2).astype(np.int32)
-
-                # Batch ROI
-                cx_adj = cx + self.roi_x_start
-                cy_adj = cy + self.roi_y_start
-
-                # Tìm các điểm nằm trong vùng ROI
-                valid_indices = []
-                for idx in range(len(cx_adj)):
-                    result = cv2.pointPolygonTest(
-                        self.region_pts,
-                        (int(cx_adj[idx]), int(cy_adj[idx])),
-                        False
-                    )
-                    if result >= 0:
-                        valid_indices.append(idx)
-
-                valid_indices = np.array(valid_indices)
-
-                for idx in valid_indices:
-                    track_id = self.ids[idx]
-                    class_id = self.classes[idx]
-                    speed_id = self.speeds.get(track_id, 0)
+            if job.ids is not None and len(job.ids) > 0:
+                # Chỉ vẽ các track nằm trong vùng (đã tính ở post_processing)
+                for idx in np.flatnonzero(job.in_region):
+                    class_id = job.classes[idx]
+                    speed = job.speeds[idx]
+                    speed_id = 0 if np.isnan(speed) else int(speed)
 
                     color = self.color_motor if class_id == 1 else self.color_car
                     label = f"{speed_id} km/h"
 
-                    cx_local = cx[idx]
-                    cy_local = cy[idx]
+                    cx_local, cy_local = (int(v) for v in job.centers[idx])
 
-                    cv2.putText(self.frame_predict, label,
+                    cv2.putText(job.frame_predict, label,
                                (cx_local - 50, cy_local - 15),
                                self.font, self.font_scale, color, self.font_thickness)
-                    cv2.circle(self.frame_predict, (cx_local, cy_local), 5, color, -1)
+                    cv2.circle(job.frame_predict, (cx_local, cy_local), 5, color, -1)
 
             # Gắn lại vùng được cắt để predict lại vào frame ban đầu
-            self.frame_output[130:, 50:] = self.frame_predict
-            cv2.polylines(self.frame_output, [self.region_pts],
+            x0, y0, x1, y1 = self.crop_box
+            job.frame_output[y0:y1, x0:x1] = job.frame_predict
+            cv2.polylines(job.frame_output, self.region_pts,
                          isClosed=True, color=self.color_region, thickness=4)
 
             info = [
@@ -266,7 +351,7 @@ class AnalyzeOnRoadBase:
 
             for i, t in enumerate(info):
                 cvzone.putTextRect(
-                    self.frame_output, t,
+                    job.frame_output, t,
                     (10, 25 + i * 35),
                     scale=1.5, thickness=2,
                     colorT=colors[i],
@@ -278,61 +363,179 @@ class AnalyzeOnRoadBase:
         except Exception as e:
             print(f"Lỗi khi vẽ: {e}")
 
-    def process_on_single_video(self):
-        """Hàm này sẽ được gọi để xử lý video bằng việc đọc từng frame và xử lý từng frame một"""
-        cam = cv2.VideoCapture(self.path_video)
+    def _decode(self, source, target_size):
+        """Đọc và resize 1 frame. Nguồn file theo nhịp của self.clock, nguồn live lấy frame mới nhất của camera
+
+        Returns:
+            tuple | None: (frame, thời điểm capture, PTS), None nếu chưa có frame hoặc frame bị bỏ qua vì trễ
+        """
+        if source.live:
+            with self.timer.stage("decode"):
+                check, cap = source.read()
+            if not check:
+                return None
+            capture_time = source.timestamp
+            pts = self.clock.tick(capture_time)
+        else:
+            pts = self.clock.tick()
+            if not self.clock.wait(pts):
+                # Trễ so với nhịp của video: chỉ grab (không giải mã ra ảnh) để đuổi kịp
+                with self.timer.stage("decode"):
+                    source.grab()
+                return None
+
+            with self.timer.stage("decode"):
+                check, cap = source.read()
+            capture_time = time.time()
+            if not check:
+                return None
+
+        with self.timer.stage("resize"):
+            cap = cv2.resize(cap, target_size)
+        return cap, capture_time, pts
+
+    def _draw_fps(self, frame):
+        # FPS calculation - optimized
+        time_now = datetime.now()
+        delta_time = (time_now - self.time_pre_for_fps).total_seconds()
+        fps = round(1 / delta_time) if delta_time > 0 else 0
+        self.time_pre_for_fps = time_now
+
+        cvzone.putTextRect(frame, f"FPS: {fps}",
+                         (516, 20),
+                         scale=1.1, thickness=2,
+                         colorT=(0, 255, 100),
+                         colorR=(50, 50, 50),
+                         border=2,
+                         colorB=(255, 255, 255))
+
+    def process_on_single_video(self, max_frames=None, pipelined=settings_metric_transport.PIPELINED_WORKER,
+                                realtime=settings_metric_transport.REALTIME_SOURCE):
+        """Hàm này sẽ được gọi để xử lý video bằng việc đọc từng frame và xử lý từng frame một
 
-        if not cam.isOpened():
-            print(f'Không thể mở video: {self.path_video}')
+        Args:
+            max_frames (int, optional): Dừng sau số frame này (dùng cho benchmark). Defaults to None (chạy mãi,
+            hết video thì quay lại từ đầu).
+            pipelined (bool, optional): Chạy decode, suy luận và vẽ + encode + publish trên 3 thread nối nhau bằng
+            StageQueue thay vì tuần tự. Luôn chạy tuần tự khi show=True (cv2.imshow phải ở thread chính).
+            realtime (bool, optional): Phát đúng fps gốc của video (trễ thì bỏ frame), False = đọc nhanh nhất có thể.
+        """
+        source = open_source(self.path_video, name=self.name)
+        if not source.open():
+            print(f'Không thể mở nguồn: {self.path_video}')
             return
+        self.source = source
 
-        target_size = (600, 400)
+        # Gọi lại (ví dụ benchmark chạy warmup rồi đo) thì PTS tiếp tục tăng từ lần trước. Nguồn live tự giữ nhịp
+        if self.clock is None:
+            self.clock = SourceClock(source.fps)
+        self.clock.realtime = realtime and not source.live
+        self.clock.reset()
 
         try:
-            while True:
-                check, cap = cam.read()
-
-                if not check:
-                    print(f'Kết thúc video: {self.path_video}')
-                    # Restart video để loop
-                    cam.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    continue
-
-                cap = cv2.resize(cap, target_size)
-
-                # FPS calculation - optimized
-                time_now = datetime.now()
-                delta_time = (time_now - self.time_pre_for_fps).total_seconds()
-                fps = round(1 / delta_time) if delta_time > 0 else 0
-                self.time_pre_for_fps = time_now
-
-                cvzone.putTextRect(cap, f"FPS: {fps}",
-                                 (516, 20),
-                                 scale=1.1, thickness=2,
-                                 colorT=(0, 255, 100),
-                                 colorR=(50, 50, 50),
-                                 border=2,
-                                 colorB=(255, 255, 255))
-
-                # Xử lý từng frame
-                self.process_single_frame(cap)
-
-                # Hiển thị frame nếu show là True
-                if self.show:
-                    cv2.imshow(f'{self.name}', self.frame_output)
-                    if cv2.waitKey(1) & 0xFF == ord('q'):
-                        break
-
+            if pipelined and not self.show:
+                self._run_pipelined(source, max_frames)
+            else:
+                self._run_sequential(source, max_frames)
         except KeyboardInterrupt:
             print(f"Đã dừng xử lý {self.name}")
         except Exception as e:
             print(f"Lỗi khi xử lý {self.name}: {e}")
         finally:
             # Giải phóng tài nguyên
-            cam.release()
+            source.release()
             if self.show:
                 cv2.destroyAllWindows()
 
+    def _run_sequential(self, source, max_frames):
+        target_size = settings_metric_transport.FRAME_SIZE
+        processed = 0
+        while max_frames is None or processed < max_frames:
+            frame_started = time.perf_counter()
+            decoded = self._decode(source, target_size)
+            if decoded is None:
+                continue
+            cap, self.capture_time, self.pts = decoded
+            self._draw_fps(cap)
+
+            # Xử lý từng frame
+            self.process_single_frame(cap)
+            processed += 1
+            self.frames_processed += 1
+            self.timer.record("frame", time.perf_counter() - frame_started)
+            self.update_stats()
+
+            # Hiển thị frame nếu show là True
+            if self.show:
+                cv2.imshow(f'{self.name}', self.frame_output)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+
+    def _run_pipelined(self, source, max_frames):
+        """3 công đoạn chạy song song: thread decode -> thread hiện tại (suy luận, tracking) -> thread vẽ, encode,
+        publish. Decode và encode JPEG nhả GIL nên chạy chồng lên thời gian suy luận, throughput tiến tới giới hạn
+        của công đoạn chậm nhất thay vì tổng các công đoạn. Hàng đợi giữa các công đoạn bỏ frame cũ khi đầy.
+        "frame" trong timer là thời gian của công đoạn suy luận cho mỗi frame.
+        """
+        target_size = settings_metric_transport.FRAME_SIZE
+        decoded = StageQueue(settings_metric_transport.PIPELINE_QUEUE_SIZE)
+        rendered = StageQueue(settings_metric_transport.PIPELINE_QUEUE_SIZE)
+        self.stage_queues = {"decode": decoded, "render": rendered}
+        stop = threading.Event()
+
+        def decode_loop():
+            try:
+                while not stop.is_set():
+                    item = self._decode(source, target_size)
+                    if item is not None:
+                        # Chạy offline (không giữ nhịp) thì không được bỏ frame, chờ công đoạn suy luận
+                        decoded.put(item, block=not self.clock.realtime)
+            except Exception as e:
+                print(f"Lỗi khi đọc video {self.name}: {e}")
+            finally:
+                decoded.close()
+
+        def render_loop():
+            while True:
+                job = rendered.get()
+                if job is None:
+                    break
+                try:
+                    if self.is_draw:
+                        with self.timer.stage("drawing"):
+                            self.draw_info_to_frame_output(job)
+                    self.update_for_frame(job)
+                except Exception as e:
+                    self.publish_dropped += 1
+                    print(f"Lỗi khi vẽ/publish frame của {self.name}: {e}")
+
+        decoder = threading.Thread(target=decode_loop, name=f"decode-{self.name}", daemon=True)
+        renderer = threading.Thread(target=render_loop, name=f"render-{self.name}", daemon=True)
+        decoder.start()
+        renderer.start()
+        processed = 0
+        try:
+            while max_frames is None or processed < max_frames:
+                item = decoded.get()
+                if item is None:
+                    break
+                frame_started = time.perf_counter()
+                cap, self.capture_time, self.pts = item
+                self._draw_fps(cap)
+                if self.analyze_frame(cap):
+                    rendered.put(_RenderJob(self))
+                self.update_vehicle_data()
+                processed += 1
+                self.frames_processed += 1
+                self.timer.record("frame", time.perf_counter() - frame_started)
+                self.update_stats()
+        finally:
+            stop.set()
+            decoded.close()
+            rendered.close()
+            renderer.join(timeout=5)
+            decoder.join(timeout=5)
+
 #************************************************************************ Script for testing *******************************************************
 if __name__ == "__main__":
     # Example usage
@@ -1,8 +1,12 @@
-from multiprocessing import Process, Manager, freeze_support
+from multiprocessing import Process, Queue, freeze_support
 import os
+import threading
 from services.road_services.AnalyzeOnRoad import AnalyzeOnRoad
-from core.config import settings_metric_transport
-from utils.transport_utils import convert_frame_to_byte, log
+from services.road_services.SharedRoadSlot import SharedRoadSlot
+from services.road_services.FrameSource import source_name
+from services.inference_services.InferenceServer import InferenceServer
+from core.config import settings_metric_transport, settings_inference, settings_history
+from utils.transport_utils import log, region_crop_box, inference_size_for, shared_inference_size
 import signal
 import sys
 import atexit
@@ -18,14 +22,20 @@ Khi import module, tất cả code ở module level sẽ được thực thi l
 class AnalyzeOnRoadForMultiprocessing():
     """
     Attributes:
-        manager (Manager()): Đối tượng để tạo các Lock() và các kiểu dữ liệu chia sẽ chung khác
-        của các process với nhau
-        shared_data (Manager().dict()): dict quản lý các Lock và các kiểu dữ liệu chia sẽ chung khác
-        của các process với nhau chặt chẽ hơn
+        shared_data (dict): dict tên tuyến đường -> SharedRoadSlot, vùng nhớ chia sẻ chứa frame và thông tin
+        phương tiện mới nhất của từng tuyến đường. Process con ghi trực tiếp, process chính đọc trực tiếp nên
+        không còn process manager nằm trên đường đi của mỗi frame
         processes (list): các process con đang chạy 
+        info_events (Queue): process con gửi tên tuyến đường vào đây mỗi khi publish thông tin phương tiện mới
+        inference_servers (dict): tên backend -> InferenceServer dùng chung cho mọi tuyến đường cùng backend, frame
+        của mọi tuyến đường được letterbox về 1 kích thước chung (shared_inference_size) để gom chung batch, chỉ có
+        khi bật USE_INFERENCE_SERVER
     """
     def __init__(self, regions = settings_metric_transport.REGIONS, path_videos = settings_metric_transport.PATH_VIDEOS,
-        meter_per_pixels = settings_metric_transport.METER_PER_PIXELS, show_log = False, show = False, is_join_processes = False):
+        meter_per_pixels = settings_metric_transport.METER_PER_PIXELS,
+        detection_strides = settings_metric_transport.DETECTION_STRIDES,
+        inference_backends = settings_metric_transport.INFERENCE_BACKENDS,
+        inference_sizes = settings_metric_transport.INFERENCE_SIZES, show_log = False, show = False, is_join_processes = False):
         """Khi tích hợp API vào thiết kế do cơ chế envent loop vòng lặp bất tận nên không cần join
         các process lại để tránh bị kill. Do đó phải đặt is_join_processes = False nếu không nó sẽ chặn
         envent loop của api khiến server nghẽn
@@ -40,6 +50,9 @@ class AnalyzeOnRoadForMultiprocessing():
             Defaults to [ "./video_test/Văn Quán.mp4", "./video_test/Văn Phú.mp4", "./video_test/Nguyễn Trãi.mp4", "./video_test/Ngã Tư Sở.mp4", "./video_test/Đường Láng.mp4", ].
             meter_per_pixels (list, optional): list các tỉ số met/pixel. 
             Defaults to [0.03, 0.09, 0.4, 0.11, 0.06].
+            detection_strides (list, optional): số frame giữa 2 lần chạy detect của từng tuyến đường.
+            inference_backends (list, optional): backend suy luận của từng tuyến đường.
+            inference_sizes (list, optional): kích thước đầu vào model của từng tuyến đường (xem INFERENCE_SIZES).
             show_log (bool, optional): hiển thị log hoặc không. Defaults to False.
             show (bool, optional): hiển thị video bằng cv2 hoặc không. Defaults to False.
             is_join_processes (bool, optional): join các process con lại (nên tắt đi khi tích hợp api). 
@@ -47,9 +60,18 @@ class AnalyzeOnRoadForMultiprocessing():
         """
         self.path_videos = path_videos
         self.meter_per_pixels = meter_per_pixels
+        self.detection_strides = detection_strides
+        self.inference_backends = inference_backends
+        self.inference_sizes = inference_sizes
         self.regions = regions
-        self.manager = Manager()
-        self.shared_data = self.manager.dict()  # Dùng để lưu trữ thông tin chung giữa các process
+        self.shared_data = {}  # Tên tuyến đường -> SharedRoadSlot
+        self._owner_pid = os.getpid()  # Chỉ process tạo ra shared memory mới được unlink nó
+        self.info_events = Queue()
+        self._info_listener = None
+        self.vehicle_events = Queue(maxsize=settings_history.VEHICLE_EVENT_QUEUE_SIZE) \
+            if settings_history.VEHICLE_EVENTS_ENABLED else None
+        self._vehicle_event_listener = None
+        self.inference_servers = {}
         self.show_log = show_log
         self.show = show
         self.processes = []
@@ -81,11 +103,29 @@ class AnalyzeOnRoadForMultiprocessing():
                         print(f"Force kill process {p.pid}...")
                         p.kill()
             print("Tất cả processes đã được dừng.")
+        if getattr(self, 'inference_servers', None) and os.getpid() == self._owner_pid:
+            for server in self.inference_servers.values():
+                server.stop()
+            self.inference_servers.clear()
+        # Dừng thread đọc info_events và vehicle_events
+        if getattr(self, '_info_listener', None) is not None and os.getpid() == self._owner_pid:
+            self.info_events.put(None)
+            self._info_listener = None
+        if getattr(self, '_vehicle_event_listener', None) is not None and os.getpid() == self._owner_pid:
+            self.vehicle_events.put(None)
+            self._vehicle_event_listener = None
+        # Giải phóng shared memory sau khi các process con đã dừng hẳn
+        if hasattr(self, 'shared_data') and os.getpid() == self._owner_pid:
+            for slot in self.shared_data.values():
+                slot.close()
+                slot.unlink()
+            self.shared_data.clear()
 
     # hàm bình thường bỏ vào để tổ chức code Có thể gọi thông qua class hoặc instance, nhưng không thể truy cập 
     # trực tiếp vào thuộc tính của class hay instance, trừ khi được truyền vào.
     @staticmethod 
-    def run_analyze_process(region, path_video, meter_per_pixel, info_dict, frame_dict, show):
+    def run_analyze_process(region, path_video, meter_per_pixel, shared_slot, info_events, detector, detection_stride, backend,
+                            imgsz, show, vehicle_events=None):
         """Hàm chạy trong process riêng, làm hàm kích hoạt cho Multiprocessing. Đặt hàm này là static method vì
         để tránh việc sử dụng multiprocessing bị lỗi do nó sẽ picke các biến liên quan đến hàm để chuyển dữ liệu
         sang process con, đặc biệt là self chứa các tool của YOLO và các biến khác không thể picke được do đó 
@@ -98,21 +138,29 @@ class AnalyzeOnRoadForMultiprocessing():
         Args:
             path_video (str): Đường dẫn đến video
             meter_per_pixel (float): Tỉ lệ 1 mét ngoài đời với 1 pixel
-            info_dict (Manager().dict()): Một dict dùng để chia sẽ giữ liệu trung gian giữa các process với nhau,
-            mặc định là sẽ được truyền tham chiếu và nó sẽ được thay đỏi nếu các process con thay đổi nó cho nên
-            ta có thể truy cập dữ liệu kết quả xử lý ở bên ngoài dễ dàng nhưng phải đảm bảo truy cập an toàn
-            frame_dict (Manager().dict()): Tương tự info_dict nhưng dùng để chứa thông tin ảnh byte code đã được encode
-            do dữ liệu dạng bytecode mà manager không có kiểu này nên ta nó vào một dict trung gian
+            shared_slot (SharedRoadSlot): Vùng nhớ chia sẻ của tuyến đường, khi spawn chỉ tên vùng nhớ được
+            pickle và process con sẽ tự attach lại
+            info_events (Queue): Hàng đợi báo có thông tin phương tiện mới cho process chính
+            detector (RemoteDetector | None): Client của InferenceServer, None thì process con tự load model
+            detection_stride (int): Số frame giữa 2 lần chạy detect
+            backend (str): Backend suy luận khi process con tự load model
+            imgsz (tuple): Kích thước (height, width) đầu vào model khi process con tự load model
             show (bool): Hiển thị video hay không
+            vehicle_events (Queue, optional): Hàng đợi gửi bản ghi các phương tiện đã rời khung hình cho process chính
         """
         try:
             analyzer = AnalyzeOnRoad(
                 path_video=path_video,
                 meter_per_pixel=meter_per_pixel,
-                info_dict=info_dict,
-                frame_dict=frame_dict,
+                shared_slot=shared_slot,
+                info_events=info_events,
+                detector=detector,
+                detection_stride=detection_stride,
+                backend=backend,
+                imgsz=imgsz,
                 show= show, 
-                region= region
+                region= region,
+                vehicle_events=vehicle_events,
             )
             analyzer.process_on_single_video()
         except Exception as e:
@@ -122,39 +170,51 @@ class AnalyzeOnRoadForMultiprocessing():
         """Hàm kích hoạt chạy multi processing"""
         freeze_support()
         
+        # Kích thước đầu vào model của từng tuyến đường theo vùng crop
+        imgszs = []
+        for region, size in zip(self.regions, self.inference_sizes):
+            crop_box = region_crop_box(region, settings_metric_transport.FRAME_SIZE,
+                                       settings_metric_transport.REGION_CROP_MARGIN)
+            imgszs.append(inference_size_for(crop_box, settings_inference.IMGSZ if size is None else size))
+
+        # 1 process suy luận chung cho mọi tuyến đường cùng backend thay vì mỗi process con 1 bản model. Cả batch
+        # phải cùng kích thước nên server letterbox mọi frame về kích thước lớn nhất của các tuyến đường đó
+        if settings_inference.USE_INFERENCE_SERVER:
+            for backend in dict.fromkeys(self.inference_backends):
+                if backend not in self.inference_servers:
+                    imgsz = shared_inference_size(
+                        [imgsz for name, imgsz in zip(self.inference_backends, imgszs) if name == backend])
+                    self.inference_servers[backend] = InferenceServer(backend=backend, imgsz=imgsz)
+
         # Lặp qua để xử lý từng video với từng đường dẫn và tham số meter_per_pixel một 
-        for path_video, meter_per_pixel, region in zip(self.path_videos, self.meter_per_pixels, self.regions):
-            name = path_video.split('/')[-1][:-4]
+        for path_video, meter_per_pixel, region, detection_stride, backend, imgsz in zip(
+                self.path_videos, self.meter_per_pixels, self.regions, self.detection_strides, self.inference_backends,
+                imgszs):
+            name = source_name(path_video)
             self.names.append(name)
             
-            # Tạo các manager objects
-            info_dict = self.manager.dict({
-                "count_car": 0,
-                "count_motor": 0,
-                "speed_car": 0,
-                "speed_motor": 0,
-            })
-            frame_dict = self.manager.dict({"frame": ""})
-
-            # Lưu các khoá và các biến quản lý dữ liệu vào dict shared data để dễ quản lý. Việc láy data cũng 
-            # đơn giản hơn do các thông tin như khoá và dữ liệu được phân bố vào dict để quản lý giúp chặt chẽ hơn
-            self.shared_data[name] = {
-                'info': info_dict,
-                'frame': frame_dict,
-            }
+            # Mỗi tuyến đường có 1 vùng nhớ chia sẻ riêng, process con là writer duy nhất
+            shared_slot = SharedRoadSlot.create(
+                frame_capacities=SharedRoadSlot.capacities_for(settings_metric_transport.FRAME_VARIANTS))
+            self.shared_data[name] = shared_slot
+            detector = None
+            if settings_inference.USE_INFERENCE_SERVER:
+                detector = self.inference_servers[backend].create_client()
             
             # Tạo process với target là static method
             p = Process(
                 target=self.run_analyze_process, 
                 args=(
-                    region, path_video, meter_per_pixel, info_dict, frame_dict, 
-                    self.show
+                    region, path_video, meter_per_pixel, shared_slot, self.info_events, detector,
+                    detection_stride, backend, imgsz, self.show, self.vehicle_events
                 ), 
                 # kwargs={'show': True}
             )
             self.processes.append(p)
       
         # Start all self.processes
+        for server in self.inference_servers.values():
+            server.start()
         for p in self.processes:
             p.start()
         
@@ -177,17 +237,124 @@ class AnalyzeOnRoadForMultiprocessing():
                         p.kill()
         print("All processes stopped.")
     
-    def get_frame_road(self, road_name : str):
-        data = b""
-        if road_name not in self.names:
-            return data
-        data = convert_frame_to_byte(self.shared_data[road_name]['frame'].get('frame', b""))
-        return data
+    def get_frame_id(self, road_name : str) -> int:
+        """Frame id mới nhất của tuyến đường, 0 nếu chưa có frame. Rất nhẹ, dùng để kiểm tra có frame mới hay không"""
+        if road_name not in self.shared_data:
+            return 0
+        return self.shared_data[road_name].read_frame_id()
+
+    def get_frame_ladder(self, road_name : str):
+        """Lấy tất cả variant của frame mới nhất đã được process con encode sẵn
+
+        Returns:
+            tuple | None: (frame_id, timestamp, {variant: jpeg_bytes}), None nếu tuyến đường chưa có frame nào
+        """
+        if road_name not in self.shared_data:
+            return None
+        return self.shared_data[road_name].read_frame()
+
+    def get_frame_packet(self, road_name : str, variant : str = settings_metric_transport.DEFAULT_FRAME_VARIANT):
+        """Lấy 1 variant của frame JPEG mới nhất đã được process con encode sẵn
+
+        Returns:
+            tuple | None: (frame_id, timestamp, jpeg_bytes), None nếu tuyến đường chưa có frame nào
+        """
+        if road_name not in self.shared_data:
+            return None
+        packet = self.shared_data[road_name].read_frame(variants=(variant,))
+        if packet is None:
+            return None
+        frame_id, timestamp, frames = packet
+        return frame_id, timestamp, frames[variant]
+
+    def get_frame_road(self, road_name : str, variant : str = settings_metric_transport.DEFAULT_FRAME_VARIANT):
+        """JPEG của frame mới nhất, None nếu tuyến đường không tồn tại hoặc chưa có frame nào (giống get_frame_packet)"""
+        packet = self.get_frame_packet(road_name, variant)
+        if packet is None:
+            return None
+        return packet[2]
     
     def get_info_road(self, road_name : str):
-        if road_name not in self.names:
+        if road_name not in self.shared_data:
             return {}
-        return dict(self.shared_data[road_name]['info'])
+        return self.shared_data[road_name].read_metrics()
+
+    @staticmethod
+    def _start_listener(events, callback, name):
+        """Thread nền đọc events cho tới khi nhận None, message là tuple thì gọi callback(*message), còn lại gọi
+        callback(message)"""
+        def listen():
+            while True:
+                try:
+                    message = events.get()
+                except (EOFError, OSError):
+                    break
+                if message is None:
+                    break
+                try:
+                    if isinstance(message, tuple):
+                        callback(*message)
+                    else:
+                        callback(message)
+                except Exception as e:
+                    print(f"Lỗi khi xử lý {name}: {e}")
+
+        listener = threading.Thread(target=listen, name=name, daemon=True)
+        listener.start()
+        return listener
+
+    def start_info_listener(self, callback):
+        """Chạy thread nền đọc info_events và gọi callback(road_name) mỗi khi 1 tuyến đường có thông tin mới.
+
+        Args:
+            callback (callable): Hàm nhận tên tuyến đường, được gọi trên thread nền nên nếu cần chạm vào
+            event loop thì phải dùng loop.call_soon_threadsafe
+        """
+        if self._info_listener is None:
+            self._info_listener = self._start_listener(self.info_events, callback, "info-events-listener")
+
+    def start_vehicle_event_listener(self, callback):
+        """Chạy thread nền đọc vehicle_events và gọi callback(road_name, departures) với bản ghi các phương tiện
+        đã rời khung hình (xem AnalyzeOnRoad.publish_departures). Không làm gì nếu VEHICLE_EVENTS_ENABLED = False
+
+        Args:
+            callback (callable): Hàm nhận tên tuyến đường và dict các mảng, được gọi trên thread nền
+        """
+        if self.vehicle_events is not None and self._vehicle_event_listener is None:
+            self._vehicle_event_listener = self._start_listener(self.vehicle_events, callback,
+                                                                "vehicle-events-listener")
+
+    def get_info_version(self, road_name : str) -> int:
+        """Version thông tin phương tiện, thay đổi mỗi khi process con cập nhật"""
+        if road_name not in self.shared_data:
+            return 0
+        return self.shared_data[road_name].read_metrics_version()
+
+    def get_info_packet(self, road_name : str):
+        """Trả về (version, info) của tuyến đường, None nếu không tồn tại"""
+        if road_name not in self.shared_data:
+            return None
+        slot = self.shared_data[road_name]
+        return slot.read_metrics_version(), slot.read_metrics()
+
+    def get_traffic_windows(self, road_name : str):
+        """Số xe trung bình, tốc độ trung bình, p50, p85 của tuyến đường theo từng cửa sổ trượt (xem
+        SharedRoadSlot.read_windows). None nếu không tồn tại"""
+        if road_name not in self.shared_data:
+            return None
+        return self.shared_data[road_name].read_windows()
+
+    def get_road_stats(self, road_name : str):
+        """Thống kê vận hành của process con xử lý tuyến đường (xem SharedRoadSlot.read_stats) kèm frame id,
+        thời điểm capture của frame mới nhất và process con còn sống hay không. None nếu không tồn tại"""
+        if road_name not in self.shared_data:
+            return None
+        slot = self.shared_data[road_name]
+        stats = slot.read_stats()
+        stats["frame_id"], stats["frame_timestamp"] = slot.read_frame_info()
+        index = self.names.index(road_name)
+        stats["alive"] = index < len(self.processes) and self.processes[index].is_alive()
+        return stats
 
 #***********************************************************Script for testing************************************************************************
 if __name__ == '__main__':
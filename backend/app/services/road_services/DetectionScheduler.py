@@ -0,0 +1,62 @@
+import numpy as np
+from core.config import settings_inference
+
+
+class DetectionScheduler:
+    """Quyết định frame nào chạy model detect, frame nào chỉ đẩy track bằng Kalman (VehicleTracker.predict).
+
+    Bình thường cứ detection_stride frame mới detect 1 lần. Khi chất lượng track giảm (độ tin cậy trung bình
+    của track thấp, hoặc nhiều detection chưa gắn được vào track nào - thường là xe mới vào khung hình) thì
+    quay về detect mọi frame cho tới khi track ổn định trở lại.
+
+    Examples:
+        >>> scheduler = DetectionScheduler(detection_stride=3)
+        >>> if scheduler.should_detect():
+        >>>     detections = detector.detect(frame)
+        >>>     tracker.update(detections)
+        >>>     scheduler.record_detection(detections, tracker.scores)
+        >>> else:
+        >>>     tracker.predict()
+        >>>     scheduler.record_prediction()
+    """
+    def __init__(self, detection_stride: int = 1, min_track_score: float = settings_inference.MIN_TRACK_SCORE,
+                 max_unmatched_ratio: float = settings_inference.MAX_UNMATCHED_RATIO,
+                 high_score: float = settings_inference.TRACKER_ARGS["track_high_thresh"]):
+        """
+        Args:
+            detection_stride (int): Số frame giữa 2 lần detect, 1 = detect mọi frame. Defaults to 1.
+            min_track_score (float): Độ tin cậy trung bình tối thiểu của các track để được bỏ qua detect
+            max_unmatched_ratio (float): Tỉ lệ tối đa detection (độ tin cậy cao) chưa có track tương ứng
+            high_score (float): Ngưỡng detection độ tin cậy cao (giống track_high_thresh của ByteTrack)
+        """
+        self.detection_stride = max(1, int(detection_stride))
+        self.min_track_score = min_track_score
+        self.max_unmatched_ratio = max_unmatched_ratio
+        self.high_score = high_score
+        self.frames_since_detection = self.detection_stride  # Frame đầu tiên luôn detect
+        self.degraded = False
+        self.detections = 0
+        self.predictions = 0
+
+    def should_detect(self) -> bool:
+        return self.degraded or self.frames_since_detection >= self.detection_stride
+
+    def record_detection(self, detections, track_scores: np.ndarray):
+        """Ghi nhận 1 frame đã detect và đánh giá chất lượng track sau khi tracker.update()
+
+        Args:
+            detections (Detections): Kết quả detect của frame
+            track_scores (np.ndarray): Độ tin cậy của các track đang hoạt động (VehicleTracker.scores)
+        """
+        self.detections += 1
+        self.frames_since_detection = 1
+        if self.detection_stride == 1:
+            return
+        confident = int(np.sum(detections.conf >= self.high_score))
+        unmatched_ratio = max(0, confident - len(track_scores)) / confident if confident else 0.0
+        low_score = len(track_scores) > 0 and float(np.mean(track_scores)) < self.min_track_score
+        self.degraded = low_score or unmatched_ratio > self.max_unmatched_ratio
+
+    def record_prediction(self):
+        self.predictions += 1
+        self.frames_since_detection += 1
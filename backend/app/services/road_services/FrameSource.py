@@ -0,0 +1,333 @@
+from abc import ABC, abstractmethod
+import glob
+import os
+import threading
+import time
+from urllib.parse import urlparse
+import cv2
+from core.config import settings_metric_transport
+
+
+class FrameSource(ABC):
+    """Interface chung của các nguồn frame cho process con: file video, thư mục ảnh, camera RTSP/HTTP, bộ sinh
+    frame trong bộ nhớ. Worker chỉ gọi open / read / grab / release nên đổi từ video demo sang camera thật chỉ là
+    đổi đường dẫn trong PATH_VIDEOS.
+
+    Nguồn file (live = False) được giữ nhịp bởi SourceClock theo fps. Nguồn live (live = True) tự giữ nhịp theo
+    camera, read() trả về frame mới nhất và timestamp là thời điểm nhận frame đó.
+
+    Examples:
+        >>> source = open_source("rtsp://192.168.1.10/stream1")
+        >>> if source.open():
+        >>>     check, frame = source.read()
+        >>>     source.release()
+    """
+    live = False
+
+    def __init__(self, name: str = None, fps: float = 0.0):
+        self.name = name
+        self.fps = fps
+        self.timestamp = None  # time.time() khi nhận frame gần nhất (chỉ nguồn live)
+
+    def open(self) -> bool:
+        return True
+
+    @abstractmethod
+    def read(self):
+        """Đọc frame tiếp theo
+
+        Returns:
+            tuple: (True, frame) hoặc (False, None) nếu tạm thời chưa có frame
+        """
+
+    def grab(self) -> bool:
+        """Bỏ qua frame tiếp theo, rẻ hơn read() vì không cần giải mã ra ảnh"""
+        return self.read()[0]
+
+    def release(self):
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class VideoFileSource(FrameSource):
+    """File video, hết video thì quay lại từ đầu (loop=True)"""
+    def __init__(self, path: str, loop: bool = True, name: str = None):
+        super().__init__(name or source_name(path))
+        self.path = path
+        self.loop = loop
+        self.restarts = 0
+        self._cam = None
+
+    def open(self) -> bool:
+        self._cam = cv2.VideoCapture(self.path)
+        if not self._cam.isOpened():
+            return False
+        self.fps = self._cam.get(cv2.CAP_PROP_FPS)
+        return True
+
+    def _rewind(self) -> bool:
+        if not self.loop:
+            return False
+        print(f'Kết thúc video: {self.path}')
+        self._cam.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self.restarts += 1
+        return True
+
+    def read(self):
+        check, frame = self._cam.read()
+        if not check and self._rewind():
+            check, frame = self._cam.read()
+        return (True, frame) if check else (False, None)
+
+    def grab(self) -> bool:
+        check = self._cam.grab()
+        if not check and self._rewind():
+            check = self._cam.grab()
+        return check
+
+    def release(self):
+        if self._cam is not None:
+            self._cam.release()
+            self._cam = None
+
+
+class ImageDirectorySource(FrameSource):
+    """Thư mục ảnh (sắp xếp theo tên) phát như 1 video có fps cố định"""
+    EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+    def __init__(self, path: str, fps: float = settings_metric_transport.IMAGE_SOURCE_FPS, loop: bool = True,
+                 name: str = None):
+        super().__init__(name or source_name(path), fps)
+        self.path = path
+        self.loop = loop
+        self.files = []
+        self.index = 0
+
+    def open(self) -> bool:
+        self.files = sorted(path for path in glob.glob(os.path.join(self.path, "*"))
+                            if path.lower().endswith(self.EXTENSIONS))
+        self.index = 0
+        return len(self.files) > 0
+
+    def _next(self):
+        if self.index >= len(self.files):
+            if not self.loop or not self.files:
+                return None
+            self.index = 0
+        path = self.files[self.index]
+        self.index += 1
+        return path
+
+    def read(self):
+        path = self._next()
+        frame = cv2.imread(path) if path is not None else None
+        return (True, frame) if frame is not None else (False, None)
+
+    def grab(self) -> bool:
+        return self._next() is not None
+
+
+class GeneratorSource(FrameSource):
+    """Frame sinh trong bộ nhớ bởi hàm render(index) -> ảnh, dùng cho test và benchmark không cần file video"""
+    def __init__(self, render, fps: float = 30.0, n_frames: int = None, name: str = "synthetic"):
+        """
+        Args:
+            render (callable): Hàm nhận số thứ tự frame, trả về ảnh BGR
+            fps (float): fps giả lập. Defaults to 30.
+            n_frames (int, optional): Số frame trước khi quay lại từ đầu. Defaults to None (vô hạn).
+        """
+        super().__init__(name, fps)
+        self.render = render
+        self.n_frames = n_frames
+        self.index = 0
+
+    def _next(self) -> int:
+        index = self.index
+        self.index = (self.index + 1) % self.n_frames if self.n_frames else self.index + 1
+        return index
+
+    def read(self):
+        return True, self.render(self._next())
+
+    def grab(self) -> bool:
+        self._next()
+        return True
+
+
+class StreamSource(FrameSource):
+    """Camera RTSP/HTTP. Thread nền đọc liên tục và chỉ giữ frame mới nhất (grab-latest) nên buffer của decoder
+    luôn được rút cạn, worker không bao giờ xử lý frame cũ. Mất kết nối thì thread nền tự kết nối lại với thời gian
+    chờ tăng gấp đôi sau mỗi lần thất bại (tối đa max_backoff), worker không bị chặn mà chỉ nhận (False, None).
+
+    Đường dẫn là file (pace=True) thì thread nền đọc đúng fps của file, dùng làm camera giả lập khi chạy local.
+
+    Attributes:
+        connected (bool): Đang có kết nối tới camera
+        reconnects (int): Số lần đã kết nối lại
+        dropped (int): Số frame nhận được nhưng bị frame mới hơn đè lên trước khi worker kịp đọc
+    """
+    live = True
+
+    def __init__(self, url: str, name: str = None, pace: bool = None,
+                 read_timeout: float = settings_metric_transport.STREAM_READ_TIMEOUT,
+                 min_backoff: float = settings_metric_transport.STREAM_RECONNECT_MIN,
+                 max_backoff: float = settings_metric_transport.STREAM_RECONNECT_MAX):
+        """
+        Args:
+            url (str): Đường dẫn camera (rtsp://, http://...) hoặc file video làm camera giả lập
+            pace (bool, optional): Đọc đúng fps của nguồn. Defaults to None (True nếu url là file).
+            read_timeout (float): Thời gian read() chờ frame mới tối đa (giây)
+            min_backoff (float): Thời gian chờ trước lần kết nối lại đầu tiên (giây)
+            max_backoff (float): Thời gian chờ tối đa giữa 2 lần kết nối lại (giây)
+        """
+        super().__init__(name or source_name(url))
+        self.url = url
+        self.pace = os.path.isfile(url) if pace is None else pace
+        self.read_timeout = read_timeout
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.connected = False
+        self.reconnects = 0
+        self.dropped = 0
+        self._frame = None
+        self._frame_time = None
+        self._frame_seq = 0
+        self._read_seq = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def open(self) -> bool:
+        """Chạy thread nền, không chờ kết nối thành công"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._reader, name=f"stream-{self.name}", daemon=True)
+            self._thread.start()
+        return True
+
+    def _connect(self):
+        cam = cv2.VideoCapture(self.url)
+        if not cam.isOpened():
+            cam.release()
+            return None
+        # Giữ buffer của decoder nhỏ nhất có thể (backend nào hỗ trợ)
+        cam.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        fps = cam.get(cv2.CAP_PROP_FPS)
+        if fps and fps > 0:
+            self.fps = fps
+        return cam
+
+    def _reader(self):
+        backoff = self.min_backoff
+        connected_once = False
+        while not self._stop.is_set():
+            cam = self._connect()
+            if cam is None:
+                print(f"Không kết nối được {self.url}, thử lại sau {backoff:.1f}s")
+                self._stop.wait(backoff)
+                backoff = next_backoff(backoff, self.max_backoff)
+                continue
+            if connected_once:
+                self.reconnects += 1
+            connected_once = True
+            self.connected = True
+            backoff = self.min_backoff
+            interval = 1 / self.fps if self.pace and self.fps > 0 else 0
+            due = time.monotonic()
+            try:
+                while not self._stop.is_set():
+                    check, frame = cam.read()
+                    if not check:
+                        print(f"Mất kết nối {self.url}")
+                        break
+                    with self._cond:
+                        if self._frame_seq > self._read_seq:
+                            self.dropped += 1
+                        self._frame = frame
+                        self._frame_seq += 1
+                        self._frame_time = time.time()
+                        self._cond.notify_all()
+                    if interval:
+                        due += interval
+                        self._stop.wait(max(due - time.monotonic(), 0))
+            finally:
+                self.connected = False
+                cam.release()
+
+    def read(self):
+        """Frame mới nhất chưa được đọc, chờ tối đa read_timeout giây
+
+        Returns:
+            tuple: (True, frame) hoặc (False, None) nếu chưa có frame mới (đang kết nối lại...)
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._frame_seq > self._read_seq or self._stop.is_set(),
+                                       timeout=self.read_timeout):
+                return False, None
+            if self._frame_seq <= self._read_seq:
+                return False, None
+            self._read_seq = self._frame_seq
+            self.timestamp = self._frame_time
+            return True, self._frame
+
+    def release(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+def next_backoff(backoff: float, max_backoff: float) -> float:
+    """Thời gian chờ của lần kết nối lại tiếp theo: gấp đôi, tối đa max_backoff"""
+    return min(backoff * 2, max_backoff)
+
+
+def source_name(uri: str) -> str:
+    """Tên tuyến đường lấy từ đường dẫn nguồn: tên file bỏ phần mở rộng, tên thư mục, hoặc host + path của URL
+
+    Examples:
+        >>> source_name("./video_test/Văn Quán.mp4")
+        'Văn Quán'
+        >>> source_name("rtsp://10.0.0.5:554/cam/1")
+        '10.0.0.5_cam_1'
+    """
+    parsed = urlparse(uri)
+    if parsed.scheme and "://" in uri:
+        parts = [parsed.hostname or parsed.scheme] + [part for part in parsed.path.split("/") if part]
+        return "_".join(parts)
+    return os.path.splitext(os.path.basename(os.path.normpath(uri)))[0]
+
+
+def open_source(uri: str, name: str = None) -> FrameSource:
+    """Tạo nguồn frame theo đường dẫn
+
+    Args:
+        uri (str):
+            - rtsp://, rtmp://, http://, https://: camera (StreamSource)
+            - stream+file://<đường dẫn file>: file video phát như camera live, dùng để thử StreamSource ở local
+            - synthetic://<seed>: video giao thông giả lập sinh trong bộ nhớ
+            - thư mục: các ảnh trong thư mục
+            - còn lại: file video, hết thì quay lại từ đầu
+        name (str, optional): Tên tuyến đường. Defaults to None (source_name(uri)).
+    """
+    scheme = urlparse(uri).scheme.lower() if "://" in uri else ""
+    if scheme in ("rtsp", "rtsps", "rtmp", "http", "https"):
+        return StreamSource(uri, name=name)
+    if scheme == "stream+file":
+        path = uri[len("stream+file://"):]
+        return StreamSource(path, name=name or source_name(path), pace=True)
+    if scheme == "synthetic":
+        from benchmarks.synthetic_clip import render_synthetic_frame
+        seed = int(uri[len("synthetic://"):] or 0)
+        return GeneratorSource(lambda index: render_synthetic_frame(index, seed=seed), name=name or f"synthetic_{seed}")
+    if os.path.isdir(uri):
+        return ImageDirectorySource(uri, name=name)
+    return VideoFileSource(uri, name=name)
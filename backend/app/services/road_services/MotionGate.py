@@ -0,0 +1,75 @@
+import cv2
+import numpy as np
+from core.config import settings_inference
+
+
+class MotionGate:
+    """Bộ lọc chuyển động rẻ đặt trước model detect: so sánh ảnh xám thu nhỏ của vùng crop với ảnh ở lần detect
+    gần nhất (chỉ tính các pixel nằm trong region). Không có gì thay đổi thì bỏ qua detect, track chỉ được đẩy
+    bằng Kalman. Sau max_skip lần bỏ qua liên tiếp luôn detect lại để track không bị cũ và ảnh tham chiếu được
+    làm mới (đổi ánh sáng, đèn đường...).
+
+    Examples:
+        >>> gate = MotionGate([region], crop_box)
+        >>> if scheduler.should_detect() and gate.check(frame_crop):
+        >>>     detections = detector.detect(frame_crop)
+        >>> gate.skip_rate
+    """
+    def __init__(self, regions: list, crop_box: tuple, scale: float = settings_inference.MOTION_SCALE,
+                 pixel_threshold: int = settings_inference.MOTION_PIXEL_THRESHOLD,
+                 min_changed_ratio: float = settings_inference.MOTION_MIN_CHANGED_RATIO,
+                 max_skip: int = settings_inference.MOTION_MAX_SKIP):
+        """
+        Args:
+            regions (list): Các vùng đa giác theo toạ độ frame
+            crop_box (tuple): (x0, y0, x1, y1) vùng crop đưa vào model
+            scale (float): Tỉ lệ thu nhỏ ảnh trước khi so sánh
+            pixel_threshold (int): Chênh lệch mức xám tối thiểu để coi 1 pixel là thay đổi
+            min_changed_ratio (float): Tỉ lệ pixel thay đổi (trong region) tối thiểu để coi là có chuyển động
+            max_skip (int): Số lần bỏ qua detect liên tiếp tối đa
+        """
+        self.regions = [np.asarray(region) - np.array(crop_box[:2]) for region in regions]
+        self.scale = scale
+        self.pixel_threshold = pixel_threshold
+        self.min_changed_ratio = min_changed_ratio
+        self.max_skip = max_skip
+        self.mask = None
+        self.reference = None
+        self.consecutive_skips = 0
+        self.checks = 0
+        self.skipped = 0
+
+    @property
+    def skip_rate(self) -> float:
+        return self.skipped / self.checks if self.checks else 0.0
+
+    def _prepare(self, frame: np.ndarray) -> np.ndarray:
+        small = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+        if self.mask is None or self.mask.shape != gray.shape:
+            self.mask = np.zeros(gray.shape, dtype=np.uint8)
+            cv2.fillPoly(self.mask, [np.round(region * self.scale).astype(np.int32) for region in self.regions], 255)
+        return gray
+
+    def check(self, frame: np.ndarray) -> bool:
+        """Có nên chạy detect trên frame này không (có chuyển động, chưa có ảnh tham chiếu hoặc đã bỏ qua quá
+        max_skip lần). Khi trả về True ảnh của frame trở thành ảnh tham chiếu cho các lần sau
+
+        Args:
+            frame (np.ndarray): Ảnh vùng crop (BGR) sắp đưa vào model
+        """
+        self.checks += 1
+        gray = self._prepare(frame)
+        if self.reference is not None and self.consecutive_skips < self.max_skip:
+            changed = cv2.countNonZero(cv2.bitwise_and(
+                cv2.threshold(cv2.absdiff(gray, self.reference), self.pixel_threshold, 255, cv2.THRESH_BINARY)[1],
+                self.mask,
+            ))
+            if changed < self.min_changed_ratio * max(cv2.countNonZero(self.mask), 1):
+                self.consecutive_skips += 1
+                self.skipped += 1
+                return False
+        self.reference = gray
+        self.consecutive_skips = 0
+        return True
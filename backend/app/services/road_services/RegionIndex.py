@@ -0,0 +1,61 @@
+import cv2
+import numpy as np
+
+
+def as_named_regions(region) -> dict:
+    """Chuẩn hoá cấu hình vùng của 1 tuyến đường về dict tên vùng -> đa giác
+
+    Args:
+        region (np.ndarray | dict): 1 đa giác (tên mặc định "region") hoặc dict tên vùng -> đa giác
+    """
+    if isinstance(region, dict):
+        return {name: np.asarray(polygon) for name, polygon in region.items()}
+    return {"region": np.asarray(region)}
+
+
+class RegionIndex:
+    """Các vùng đa giác của 1 camera được rasterize 1 lần thành mask trên vùng crop, mỗi pixel là bitmask các
+    vùng chứa nó (bit i = vùng thứ i). Kiểm tra tâm của cả loạt box chỉ là 1 lần fancy indexing thay vì gọi
+    cv2.pointPolygonTest cho từng box.
+
+    Examples:
+        >>> index = RegionIndex({"lane_in": polygon_1, "lane_out": polygon_2}, crop_box=(40, 120, 550, 400))
+        >>> inside = index.contains(centers)                   # thuộc vùng bất kỳ
+        >>> inside_in = index.contains(centers, "lane_in")     # thuộc vùng lane_in
+    """
+    MAX_REGIONS = 32
+
+    def __init__(self, regions: dict, crop_box: tuple):
+        """
+        Args:
+            regions (dict): Tên vùng -> đa giác theo toạ độ frame
+            crop_box (tuple): (x0, y0, x1, y1) vùng crop, toạ độ các điểm cần kiểm tra tính theo vùng crop này
+        """
+        if len(regions) > self.MAX_REGIONS:
+            raise ValueError(f"Tối đa {self.MAX_REGIONS} vùng cho 1 camera, nhận được {len(regions)}")
+        x0, y0, x1, y1 = crop_box
+        self.names = tuple(regions)
+        self.origin = np.array([x0, y0])
+        self.mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint32)
+        layer = np.empty(self.mask.shape, dtype=np.uint8)
+        for i, polygon in enumerate(regions.values()):
+            layer[:] = 0
+            cv2.fillPoly(layer, [(np.asarray(polygon) - self.origin).astype(np.int32)], 1)
+            self.mask |= layer.astype(np.uint32) << np.uint32(i)
+
+    def lookup(self, points: np.ndarray) -> np.ndarray:
+        """Bitmask các vùng chứa từng điểm (x, y) theo toạ độ vùng crop, 0 = không thuộc vùng nào"""
+        points = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+        x, y = points[:, 0], points[:, 1]
+        height, width = self.mask.shape
+        valid = (x >= 0) & (x < width) & (y >= 0) & (y < height)
+        bits = np.zeros(len(points), dtype=np.uint32)
+        bits[valid] = self.mask[y[valid], x[valid]]
+        return bits
+
+    def contains(self, points: np.ndarray, name: str = None) -> np.ndarray:
+        """Mảng bool: điểm có thuộc vùng name (None = vùng bất kỳ) hay không"""
+        bits = self.lookup(points)
+        if name is None:
+            return bits != 0
+        return (bits >> np.uint32(self.names.index(name))) & 1 == 1
@@ -0,0 +1,403 @@
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from core.config import settings_metric_transport
+from services.road_services.TrafficAggregator import VEHICLE_CLASSES, WINDOW_FIELDS
+
+# Layout cố định của vùng nhớ chia sẻ cho 1 tuyến đường:
+#   [header frame][metrics][stats][variant 0: buffer 0, buffer 1][variant 1: buffer 0, buffer 1]...
+# Mỗi variant (thumb, medium, full...) là 1 ảnh JPEG đã được encode sẵn ở process con, độ dài thực tế lưu ở header.
+# Mỗi phần được căn lề 64 byte để các trường uint64 luôn nằm gọn trong 1 cache line.
+_ALIGN = 64
+
+
+# Thời gian tối đa reader chờ seq chẵn (giây). Process con chết giữa 2 lần seq += 1 làm seq lẻ mãi mãi, khi đó
+# reader trả về giá trị đọc được gần nhất thay vì treo (các hàm đọc chạy thẳng trên event loop của API)
+SEQLOCK_TIMEOUT = 0.05
+
+
+def _frame_header_dtype(n_variants: int) -> np.dtype:
+    return np.dtype([
+        ("seq", np.uint64),         # Bộ đếm seqlock: lẻ = writer đang ghi, chẵn = ổn định
+        ("active", np.uint64),      # Chỉ số buffer đang được publish (0 hoặc 1)
+        ("frame_id", np.uint64),    # Số thứ tự frame, tăng đơn điệu, 0 = chưa có frame
+        ("timestamp", np.float64),  # Thời điểm capture frame (time.time())
+        ("length", np.uint64, (n_variants, 2)),  # Số byte JPEG hợp lệ của từng variant trong từng buffer
+    ])
+
+# Các cửa sổ trượt (giây) của TrafficAggregator được ghi ra ngoài
+TRAFFIC_WINDOWS = tuple(settings_metric_transport.TRAFFIC_WINDOWS)
+
+METRICS_DTYPE = np.dtype([
+    ("seq", np.uint64),
+    ("version", np.uint64),     # Tăng 1 mỗi lần process con publish thông tin mới, 0 = chưa có thông tin
+    ("count_car", np.int64),
+    ("count_motor", np.int64),
+    ("speed_car", np.int64),
+    ("speed_motor", np.int64),
+    ("timestamp", np.float64),
+    # Các cửa sổ trượt, ghi lại mỗi STATS_INTERVAL giây (không đổi version)
+    ("windows_timestamp", np.float64),
+    ("windows", np.float64, (len(TRAFFIC_WINDOWS), len(VEHICLE_CLASSES), len(WINDOW_FIELDS))),
+])
+
+METRIC_KEYS = ("count_car", "count_motor", "speed_car", "speed_motor")
+
+# Các công đoạn của pipeline được ghi thống kê thời gian (xem AnalyzeOnRoadBase.timer) và các quantile của chúng
+PIPELINE_STAGES = ("decode", "resize", "motion", "inference", "tracking", "drawing", "encode", "publish", "frame")
+STAGE_QUANTILES = (0.5, 0.9, 0.99)
+
+STATS_DTYPE = np.dtype([
+    ("seq", np.uint64),
+    ("updated_at", np.float64),         # Lần cuối process con ghi thống kê, dùng để phát hiện worker bị treo
+    ("frames_processed", np.uint64),
+    ("frames_dropped", np.uint64),      # Frame đọc được nhưng lỗi khi xử lý/publish
+    ("frames_skipped", np.uint64),      # Frame bị bỏ qua (không giải mã) vì trễ so với nhịp của video
+    ("source_connected", np.uint64),    # Nguồn live: đang có kết nối (1/0) và số lần đã kết nối lại
+    ("source_reconnects", np.uint64),
+    ("detections", np.uint64),          # Số frame đã chạy detect
+    ("tracks_stored", np.uint64),       # Số track đang giữ trong TrackStore và số track đã bị xoá vì hết hạn
+    ("tracks_evicted", np.uint64),
+    ("motion_checks", np.uint64),       # Số lần MotionGate được hỏi và số lần bỏ qua detect vì không có chuyển động
+    ("motion_skipped", np.uint64),
+    ("decode_queue_depth", np.uint64),  # Hàng đợi giữa các thread của pipeline: số frame đang chờ và số frame bị
+    ("render_queue_depth", np.uint64),  # bỏ vì công đoạn sau không kịp xử lý
+    ("decode_queue_dropped", np.uint64),
+    ("render_queue_dropped", np.uint64),
+    ("processing_fps", np.float64),
+    ("inference_fps", np.float64),
+    ("stage_count", np.uint64, (len(PIPELINE_STAGES),)),
+    ("stage_sum", np.float64, (len(PIPELINE_STAGES),)),   # Tổng thời gian (giây)
+    ("stage_quantiles", np.float64, (len(PIPELINE_STAGES), len(STAGE_QUANTILES))),
+])
+
+STATS_KEYS = ("frames_processed", "frames_dropped", "frames_skipped", "source_connected", "source_reconnects",
+              "detections", "tracks_stored", "tracks_evicted", "motion_checks", "motion_skipped",
+              "decode_queue_depth", "render_queue_depth", "decode_queue_dropped", "render_queue_dropped",
+              "processing_fps", "inference_fps")
+
+
+def _aligned(size: int) -> int:
+    return (size + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+class SharedRoadSlot:
+    """Vùng nhớ chia sẻ (multiprocessing.shared_memory) chứa frame JPEG mới nhất và thông tin phương tiện của
+    một tuyến đường. Thay thế cho Manager().dict(): dữ liệu không còn bị pickle và gửi qua socket tới
+    process manager ở mỗi frame nữa, process con ghi thẳng vào RAM chung còn process API đọc trực tiếp.
+
+    Frame được ghi theo kiểu double-buffer: writer luôn ghi vào buffer không được publish rồi mới đổi
+    chỉ số `active`. Header và metrics được bảo vệ bằng seqlock nên reader không bao giờ phải chờ writer
+    và writer không bao giờ bị reader chặn. Mỗi slot chỉ có duy nhất 1 writer (process xử lý video).
+
+    Examples:
+        >>> slot = SharedRoadSlot.create(frame_capacities={"thumb": 200 * 134 * 3, "full": 600 * 400 * 3})
+        >>> slot.write_frame({"thumb": thumb_bytes, "full": full_bytes}, timestamp=capture_time)
+        >>> frame_id, timestamp, frames = slot.read_frame()
+        >>> frame_id, timestamp, frames = slot.read_frame(variants=("thumb",))
+        >>> slot.close(); slot.unlink()
+    """
+    def __init__(self, shm: shared_memory.SharedMemory, frame_capacities: dict):
+        """Không gọi trực tiếp, dùng SharedRoadSlot.create() hoặc SharedRoadSlot.attach()
+
+        Args:
+            shm (shared_memory.SharedMemory): Vùng nhớ chia sẻ đã được tạo hoặc attach
+            frame_capacities (dict): Tên variant -> số byte tối đa của 1 frame đã encode
+        """
+        self.shm = shm
+        self.frame_capacities = {name: int(capacity) for name, capacity in frame_capacities.items()}
+        self.variants = tuple(self.frame_capacities)
+        self._map_views()
+        # Giá trị đọc được gần nhất của từng phần, trả về khi writer kẹt ở seq lẻ
+        self._last = {"frame": None, "frame_info": (0, 0.0), "metrics": None, "windows": None, "stats": None}
+        self._stuck_seq = {}
+
+    @staticmethod
+    def capacities_for(frame_variants: dict) -> dict:
+        """Dung lượng an toàn cho từng variant, lấy bằng kích thước ảnh BGR chưa nén
+
+        Args:
+            frame_variants (dict): Cấu hình dạng settings_metric_transport.FRAME_VARIANTS
+        """
+        return {name: variant["size"][0] * variant["size"][1] * 3 for name, variant in frame_variants.items()}
+
+    @staticmethod
+    def compute_size(frame_capacities: dict) -> int:
+        header_dtype = _frame_header_dtype(len(frame_capacities))
+        return (_aligned(header_dtype.itemsize) + _aligned(METRICS_DTYPE.itemsize) + _aligned(STATS_DTYPE.itemsize)
+                + sum(2 * _aligned(int(capacity)) for capacity in frame_capacities.values()))
+
+    @classmethod
+    def create(cls, frame_capacities: dict, name: str = None) -> "SharedRoadSlot":
+        """Tạo mới vùng nhớ chia sẻ (gọi ở process chính)"""
+        shm = shared_memory.SharedMemory(name=name, create=True, size=cls.compute_size(frame_capacities))
+        shm.buf[:] = bytes(shm.size)
+        return cls(shm, frame_capacities)
+
+    @classmethod
+    def attach(cls, name: str, frame_capacities: dict) -> "SharedRoadSlot":
+        """Gắn vào vùng nhớ chia sẻ đã có sẵn (gọi ở process con)"""
+        return cls(shared_memory.SharedMemory(name=name), frame_capacities)
+
+    def _map_views(self):
+        buf = self.shm.buf
+        header_dtype = _frame_header_dtype(len(self.variants))
+        offset = 0
+        self._header = np.ndarray((), dtype=header_dtype, buffer=buf, offset=offset)
+        offset += _aligned(header_dtype.itemsize)
+        self._metrics = np.ndarray((), dtype=METRICS_DTYPE, buffer=buf, offset=offset)
+        offset += _aligned(METRICS_DTYPE.itemsize)
+        self._stats = np.ndarray((), dtype=STATS_DTYPE, buffer=buf, offset=offset)
+        offset += _aligned(STATS_DTYPE.itemsize)
+        self._frames = {}
+        for name, capacity in self.frame_capacities.items():
+            buffers = []
+            for _ in range(2):
+                buffers.append(np.ndarray((capacity,), dtype=np.uint8, buffer=buf, offset=offset))
+                offset += _aligned(capacity)
+            self._frames[name] = buffers
+
+    # Khi truyền sang process con (spawn trên Windows) chỉ pickle tên vùng nhớ rồi attach lại,
+    # tránh pickle các numpy view (sẽ copy toàn bộ dữ liệu)
+    def __getstate__(self):
+        return {"name": self.shm.name, "frame_capacities": self.frame_capacities}
+
+    def __setstate__(self, state):
+        self.__init__(shared_memory.SharedMemory(name=state["name"]), state["frame_capacities"])
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    # ------------------------------------------------------------- Writer -------------------------------------------------------------
+    def write_frame(self, payloads: dict, timestamp: float = None):
+        """Ghi tất cả variant của frame đã encode vào buffer phụ rồi publish cùng lúc
+
+        Args:
+            payloads (dict): Tên variant -> ảnh JPEG đã encode (bytes hoặc np.ndarray uint8 1 chiều),
+            phải có đủ mọi variant của slot
+            timestamp (float, optional): Thời điểm capture frame. Defaults to time.time().
+        """
+        datas = []
+        for name in self.variants:
+            data = np.frombuffer(payloads[name], dtype=np.uint8)
+            if data.size > self.frame_capacities[name]:
+                raise ValueError(f"Frame {name} {data.size} bytes vượt quá dung lượng slot "
+                                 f"{self.frame_capacities[name]} bytes")
+            datas.append(data)
+
+        header = self._header
+        back = 1 - int(header["active"])
+        for name, data in zip(self.variants, datas):
+            self._frames[name][back][:data.size] = data
+
+        header["seq"] += 1
+        for i, data in enumerate(datas):
+            header["length"][i, back] = data.size
+        header["active"] = back
+        header["frame_id"] += 1
+        header["timestamp"] = time.time() if timestamp is None else timestamp
+        header["seq"] += 1
+
+    def write_metrics(self, **values):
+        """Ghi thông tin phương tiện (count_car, count_motor, speed_car, speed_motor)"""
+        metrics = self._metrics
+        metrics["seq"] += 1
+        for key in METRIC_KEYS:
+            if key in values:
+                metrics[key] = values[key]
+        metrics["version"] += 1
+        metrics["timestamp"] = time.time()
+        metrics["seq"] += 1
+
+    def write_windows(self, values: np.ndarray):
+        """Ghi giá trị các cửa sổ trượt, values có shape (len(TRAFFIC_WINDOWS), số nhãn, len(WINDOW_FIELDS)) theo
+        thứ tự TRAFFIC_WINDOWS (xem TrafficAggregator.summary_array)"""
+        metrics = self._metrics
+        metrics["seq"] += 1
+        metrics["windows"] = values
+        metrics["windows_timestamp"] = time.time()
+        metrics["seq"] += 1
+
+    def write_stats(self, stages: dict = None, **values):
+        """Ghi thống kê vận hành của process con
+
+        Args:
+            stages (dict, optional): Tên công đoạn (trong PIPELINE_STAGES) -> (count, tổng giây, [quantile theo
+            STAGE_QUANTILES]), công đoạn khác bị bỏ qua. Defaults to None.
+            **values: Các trường trong STATS_KEYS
+        """
+        stats = self._stats
+        stats["seq"] += 1
+        for key in STATS_KEYS:
+            if key in values:
+                stats[key] = values[key]
+        for name, (count, total, quantiles) in (stages or {}).items():
+            if name in PIPELINE_STAGES:
+                i = PIPELINE_STAGES.index(name)
+                stats["stage_count"][i] = count
+                stats["stage_sum"][i] = total
+                stats["stage_quantiles"][i] = quantiles
+        stats["updated_at"] = time.time()
+        stats["seq"] += 1
+
+    # ------------------------------------------------------------- Reader -------------------------------------------------------------
+    def _stable_seq(self, struct: np.ndarray, part: str):
+        """seq chẵn hiện tại của struct, None nếu seq lẻ quá SEQLOCK_TIMEOUT giây (writer chết giữa lúc ghi). Lần
+        sau gặp lại đúng seq lẻ đã kẹt đó thì trả về None ngay, không chờ lại"""
+        deadline = None
+        while True:
+            seq = int(struct["seq"])
+            if not seq & 1:
+                self._stuck_seq.pop(part, None)
+                return seq
+            if self._stuck_seq.get(part) == seq:
+                return None
+            now = time.monotonic()
+            if deadline is None:
+                deadline = now + SEQLOCK_TIMEOUT
+            elif now >= deadline:
+                self._stuck_seq[part] = seq
+                return None
+            time.sleep(0)
+
+    def _snapshot(self, struct: np.ndarray, part: str) -> np.ndarray:
+        """Bản copy nhất quán của struct, writer kẹt thì trả về bản copy gần nhất (chưa có thì bản copy hiện tại)"""
+        while True:
+            seq = self._stable_seq(struct, part)
+            if seq is None:
+                return self._last[part] if self._last[part] is not None else struct.copy()
+            snapshot = struct.copy()
+            if int(struct["seq"]) == seq:
+                self._last[part] = snapshot
+                return snapshot
+
+    def read_frame(self, variants: tuple = None):
+        """Đọc frame mới nhất
+
+        Args:
+            variants (tuple, optional): Các variant cần đọc. Defaults to None (đọc tất cả).
+
+        Returns:
+            tuple | None: (frame_id, timestamp, {variant: jpeg_bytes}), None nếu chưa có frame nào. Writer kẹt thì
+            trả về frame đọc được gần nhất
+        """
+        names = variants or self.variants
+        indices = [self.variants.index(name) for name in names]
+        header = self._header
+        while True:
+            seq = self._stable_seq(header, "frame")
+            if seq is None:
+                last = self._last["frame"]
+                if last is None:
+                    return None
+                return last[0], last[1], {name: last[2][name] for name in names if name in last[2]}
+            active = int(header["active"])
+            frame_id = int(header["frame_id"])
+            timestamp = float(header["timestamp"])
+            lengths = header["length"][:, active].copy()
+            if int(header["seq"]) != seq:
+                continue
+            if frame_id == 0:
+                return None
+            frames = {
+                self.variants[i]: self._frames[self.variants[i]][active][:int(lengths[i])].tobytes()
+                for i in indices
+            }
+            # Publish thứ 1 chỉ ghi vào buffer còn lại. Publish thứ 2 ghi đè buffer đang đọc ngay sau khi publish thứ 1
+            # xong (seq = seq + 2) và trước khi tăng seq lần nữa, nên seq đã tăng >= 2 là có thể bị ghi đè dở dang
+            if int(header["seq"]) - seq < 2:
+                last = self._last["frame"]
+                cached = {**last[2], **frames} if last is not None and last[0] == frame_id else dict(frames)
+                self._last["frame"] = (frame_id, timestamp, cached)
+                self._last["frame_info"] = (frame_id, timestamp)
+                return frame_id, timestamp, frames
+
+    def read_frame_id(self) -> int:
+        return int(self._header["frame_id"])
+
+    def read_frame_info(self):
+        """Frame id và thời điểm capture của frame mới nhất (không copy ảnh)
+
+        Returns:
+            tuple: (frame_id, timestamp), (0, 0.0) nếu chưa có frame nào
+        """
+        header = self._header
+        while True:
+            seq = self._stable_seq(header, "frame")
+            if seq is None:
+                return self._last["frame_info"]
+            frame_id, timestamp = int(header["frame_id"]), float(header["timestamp"])
+            if int(header["seq"]) == seq:
+                self._last["frame_info"] = (frame_id, timestamp)
+                return frame_id, timestamp
+
+    def read_metrics_version(self) -> int:
+        """Version của metrics, tăng 1 mỗi lần process con ghi thông tin mới"""
+        return int(self._metrics["version"])
+
+    def read_metrics(self) -> dict:
+        """Đọc thông tin phương tiện mới nhất
+
+        Returns:
+            dict: {"count_car", "count_motor", "speed_car", "speed_motor", "version", "updated_at"}
+        """
+        snapshot = self._snapshot(self._metrics, "metrics")
+        info = {key: int(snapshot[key]) for key in METRIC_KEYS}
+        info["version"] = int(snapshot["version"])
+        info["updated_at"] = float(snapshot["timestamp"])
+        return info
+
+    def read_windows(self) -> dict:
+        """Đọc giá trị các cửa sổ trượt mới nhất
+
+        Returns:
+            dict: {"updated_at", "windows": {số giây: {nhãn: {"count", "speed_mean", "speed_p50", "speed_p85",
+            "speed_samples", "frames"}}}}
+        """
+        snapshot = self._snapshot(self._metrics, "windows")
+        return {
+            "updated_at": float(snapshot["windows_timestamp"]),
+            "windows": {
+                seconds: {
+                    name: dict(zip(WINDOW_FIELDS, snapshot["windows"][w, c].tolist()))
+                    for c, name in enumerate(VEHICLE_CLASSES)
+                }
+                for w, seconds in enumerate(TRAFFIC_WINDOWS)
+            },
+        }
+
+    def read_stats(self) -> dict:
+        """Đọc thống kê vận hành mới nhất của process con
+
+        Returns:
+            dict: Các trường trong STATS_KEYS, "updated_at", "stages": {tên công đoạn: {"count", "sum", "quantiles": {quantile: giây}}}}
+        """
+        snapshot = self._snapshot(self._stats, "stats")
+        info = {key: snapshot[key].item() for key in STATS_KEYS}
+        info["updated_at"] = float(snapshot["updated_at"])
+        info["stages"] = {
+            name: {
+                "count": int(snapshot["stage_count"][i]),
+                "sum": float(snapshot["stage_sum"][i]),
+                "quantiles": dict(zip(STAGE_QUANTILES, snapshot["stage_quantiles"][i].tolist())),
+            }
+            for i, name in enumerate(PIPELINE_STAGES)
+        }
+        return info
+
+    # ----------------------------------------------------------- Lifecycle -----------------------------------------------------------
+    def close(self):
+        # Giải phóng các view trước, nếu không shm.close() sẽ báo lỗi buffer vẫn đang được tham chiếu
+        self._header = self._metrics = self._stats = None
+        self._frames = {}
+        try:
+            self.shm.close()
+        except Exception as e:
+            print(f"Lỗi khi đóng shared memory {self.shm.name}: {e}")
+
+    def unlink(self):
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,87 @@
+import time
+
+
+class SourceClock:
+    """Đồng hồ của nguồn video: gán cho mỗi frame 1 presentation timestamp (PTS, giây tính từ frame đầu) theo fps
+    gốc của nguồn và (khi realtime) giữ nhịp phát đúng fps gốc. Frame đến hạn sớm thì chờ, trễ quá max_lag thì
+    báo bỏ qua để độ trễ luôn bị chặn thay vì dồn dần. Tốc độ và cửa sổ thống kê tính theo PTS nên không phụ
+    thuộc tải của máy.
+
+    Chế độ realtime=False (as fast as possible) không chờ, không bỏ frame, dùng cho chạy offline, benchmark và
+    nguồn live (camera tự giữ nhịp, PTS lấy từ thời điểm nhận frame).
+
+    Examples:
+        >>> clock = SourceClock(fps=cam.get(cv2.CAP_PROP_FPS))
+        >>> while True:
+        >>>     pts = clock.tick()
+        >>>     if not clock.wait(pts):
+        >>>         cam.grab()      # Trễ: bỏ qua frame này, không cần giải mã ra ảnh
+        >>>         continue
+        >>>     check, frame = cam.read()
+    """
+    def __init__(self, fps: float, realtime: bool = True, max_lag: float = None):
+        """
+        Args:
+            fps (float): fps gốc của nguồn, <= 0 (không đọc được) thì dùng 30
+            realtime (bool): Giữ nhịp đúng fps gốc. Defaults to True.
+            max_lag (float, optional): Trễ tối đa (giây) so với nhịp trước khi bỏ frame. Defaults to None (2 frame).
+        """
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.realtime = realtime
+        self.max_lag = 2 / self.fps if max_lag is None else max_lag
+        self.frame_index = -1
+        self._pts = 0.0
+        self._origin = None  # Timestamp của frame live đầu tiên
+        self.skipped = 0
+        self._consecutive_skips = 0
+        self._anchor = None  # (thời điểm monotonic, PTS) khi bắt đầu giữ nhịp
+
+    @property
+    def pts(self) -> float:
+        """PTS của frame hiện tại"""
+        return self._pts
+
+    def tick(self, timestamp: float = None) -> float:
+        """Sang frame tiếp theo của nguồn (kể cả frame sẽ bị bỏ qua), trả về PTS của frame đó. PTS tăng liên tục
+        cả khi video được phát lại từ đầu
+
+        Args:
+            timestamp (float, optional): Thời điểm nhận frame của nguồn live. Defaults to None (theo fps).
+        """
+        self.frame_index += 1
+        if timestamp is None:
+            self._pts = self.frame_index / self.fps
+        else:
+            if self._origin is None:
+                self._origin = timestamp
+            self._pts = timestamp - self._origin
+        return self._pts
+
+    def wait(self, pts: float) -> bool:
+        """Chờ tới hạn phát của frame có PTS pts
+
+        Returns:
+            bool: False nếu frame đã trễ quá max_lag và nên bỏ qua
+        """
+        if not self.realtime:
+            return True
+        now = time.monotonic()
+        if self._anchor is None:
+            self._anchor = (now, pts)
+        due = self._anchor[0] + pts - self._anchor[1]
+        if now < due:
+            time.sleep(due - now)
+            return True
+        if now - due > self.max_lag:
+            # Bỏ qua cả giây liền mà vẫn không đuổi kịp (đọc frame chậm hơn fps gốc) thì giữ nhịp lại từ đây
+            if self._consecutive_skips < self.fps:
+                self._consecutive_skips += 1
+                self.skipped += 1
+                return False
+            self._anchor = (now, pts)
+        self._consecutive_skips = 0
+        return True
+
+    def reset(self):
+        """Giữ nhịp lại từ frame tiếp theo (ví dụ sau khi nguồn bị gián đoạn), PTS vẫn tiếp tục tăng"""
+        self._anchor = None
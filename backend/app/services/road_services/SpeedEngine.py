@@ -0,0 +1,133 @@
+import cv2
+import numpy as np
+from core.config import settings_inference
+from services.road_services.TrackStore import TrackStore
+
+
+class GroundProjection:
+    """Quy đổi toạ độ pixel (theo vùng crop) ra toạ độ mét trên mặt đường: 1 tỉ lệ meter_per_pixel cho cả ảnh,
+    hoặc homography từ 4 điểm trên ảnh tới 4 điểm đo ngoài thực tế để đúng cả với góc camera nhìn xiên (xe ở xa
+    đi 1 pixel được quãng đường dài hơn xe ở gần).
+
+    Examples:
+        >>> projection = GroundProjection.from_config(0.05)
+        >>> projection = GroundProjection.from_config({
+        >>>     "image": [[180, 400], [480, 400], [390, 140], [300, 140]],   # Toạ độ frame (FRAME_SIZE)
+        >>>     "world": [[0, 0], [7, 0], [7, 40], [0, 40]],                 # Mét, ví dụ 2 làn x 40 m vạch kẻ
+        >>> }, origin=crop_box[:2])
+        >>> meters = projection.project(points)
+    """
+    def __init__(self, meter_per_pixel: float = None, homography: np.ndarray = None, origin=(0, 0)):
+        """
+        Args:
+            meter_per_pixel (float, optional): Tỉ lệ 1 mét ngoài đời với 1 pixel, dùng khi không có homography
+            homography (np.ndarray, optional): Ma trận 3x3 từ toạ độ frame ra toạ độ mét
+            origin (tuple): Góc trên trái của vùng crop, các điểm đưa vào project tính theo vùng crop này
+        """
+        if meter_per_pixel is None and homography is None:
+            raise ValueError("Cần meter_per_pixel hoặc homography")
+        self.meter_per_pixel = meter_per_pixel
+        self.homography = None
+        if homography is not None:
+            # Gộp phép dịch từ vùng crop về frame vào homography
+            shift = np.array([[1, 0, origin[0]], [0, 1, origin[1]], [0, 0, 1]], dtype=np.float64)
+            self.homography = np.asarray(homography, dtype=np.float64) @ shift
+
+    @classmethod
+    def from_config(cls, calibration, origin=(0, 0)) -> "GroundProjection":
+        """
+        Args:
+            calibration (float | dict): meter_per_pixel, hoặc {"image": 4 điểm (x, y) trên frame,
+            "world": 4 điểm (x, y) tương ứng theo mét}
+            origin (tuple): Góc trên trái của vùng crop
+        """
+        if isinstance(calibration, dict):
+            homography = cv2.getPerspectiveTransform(np.asarray(calibration["image"], dtype=np.float32),
+                                                     np.asarray(calibration["world"], dtype=np.float32))
+            return cls(homography=homography, origin=origin)
+        return cls(meter_per_pixel=float(calibration), origin=origin)
+
+    def project(self, points: np.ndarray) -> np.ndarray:
+        """(N, 2) pixel -> (N, 2) mét"""
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if self.homography is None:
+            return points * self.meter_per_pixel
+        projected = points @ self.homography[:, :2].T + self.homography[:, 2]
+        return projected[:, :2] / projected[:, 2:3]
+
+
+class SpeedEngine:
+    """Tính tốc độ của tất cả track trong 1 lần tính vector hoá. Lịch sử vị trí (mét) và thời điểm (PTS) của mỗi
+    track nằm trong TrackStore (mảng NumPy cấp phát sẵn, capacity track x history mẫu, dạng vòng). Tốc độ thô là
+    quãng đường giữa mẫu cũ nhất và mới nhất chia cho khoảng thời gian giữa chúng, sau đó được làm mượt bằng trung
+    bình trượt hàm mũ (EMA) với cửa sổ smoothing mẫu.
+
+    Examples:
+        >>> engine = SpeedEngine(GroundProjection.from_config(0.05))
+        >>> speeds = engine.update(ids, bottom_centers, timestamp=pts)   # km/h, NaN nếu chưa đủ dữ liệu
+    """
+    def __init__(self, projection: GroundProjection, capacity: int = settings_inference.SPEED_CAPACITY,
+                 history: int = settings_inference.SPEED_MAX_HIST, smoothing: int = settings_inference.SPEED_SMOOTHING,
+                 min_span: float = settings_inference.SPEED_MIN_SPAN, max_speed: float = settings_inference.MAX_SPEED,
+                 ttl: int = settings_inference.TRACK_TTL, record_departures: bool = False):
+        """
+        Args:
+            projection (GroundProjection): Quy đổi pixel ra mét
+            capacity (int): Số track tối đa được theo dõi cùng lúc
+            history (int): Số mẫu vị trí gần nhất giữ lại cho mỗi track
+            smoothing (int): Cửa sổ (số lần cập nhật) của EMA, 1 = không làm mượt
+            min_span (float): Khoảng thời gian (giây) tối thiểu giữa mẫu cũ nhất và mới nhất để tính tốc độ
+            max_speed (float): Tốc độ tối đa (km/h)
+            ttl (int): Số frame không xuất hiện trước khi track bị xoá khỏi store
+            record_departures (bool): Giữ bản ghi các track bị xoá (xem TrackStore.drain_departures)
+        """
+        self.projection = projection
+        self.store = TrackStore(capacity, history, ttl, record_departures)
+        self.alpha = 2 / (max(smoothing, 1) + 1)
+        self.min_span = min_span
+        self.max_speed = max_speed
+        self.frame = 0
+
+    def update(self, ids, points: np.ndarray, timestamp: float, classes=None) -> np.ndarray:
+        """Thêm vị trí của các track ở frame hiện tại và tính lại tốc độ. Gọi mỗi frame (kể cả frame không có
+        track nào) để track hết hạn được xoá đúng lúc
+
+        Args:
+            ids (np.ndarray): id các track
+            points (np.ndarray): (N, 2) điểm chạm mặt đường của từng track (pixel, theo vùng crop)
+            timestamp (float): PTS (giây) của frame
+            classes (np.ndarray, optional): Nhãn tương ứng
+
+        Returns:
+            np.ndarray: (N,) tốc độ km/h tương ứng, NaN nếu track chưa đủ dữ liệu hoặc không được theo dõi (frame có
+            nhiều track hơn capacity của store)
+        """
+        self.frame += 1
+        store = self.store
+        slots = store.assign(ids, self.frame, classes)
+        speeds = np.full(len(slots), np.nan)
+        tracked = slots >= 0
+        if not np.any(tracked):
+            return speeds
+        slots, points = slots[tracked], np.asarray(points)[tracked]
+        head = store.head[slots]
+        store.first_time[slots[store.count[slots] == 0]] = timestamp
+        store.last_time[slots] = timestamp
+        store.positions[slots, head] = self.projection.project(points)
+        store.times[slots, head] = timestamp
+        store.head[slots] = (head + 1) % store.history
+        store.count[slots] = np.minimum(store.count[slots] + 1, store.history)
+
+        newest = head
+        oldest = (store.head[slots] - store.count[slots]) % store.history
+        displacement = np.linalg.norm(store.positions[slots, newest] - store.positions[slots, oldest], axis=1)
+        span = store.times[slots, newest] - store.times[slots, oldest]
+        ready = span >= max(self.min_span, 1e-6)
+        if np.any(ready):
+            raw = np.minimum(displacement[ready] / span[ready] * 3.6, self.max_speed)
+            ready_slots = slots[ready]
+            previous = store.speeds[ready_slots]
+            store.speeds[ready_slots] = np.where(np.isnan(previous), raw,
+                                                 self.alpha * raw + (1 - self.alpha) * previous)
+        speeds[tracked] = store.speeds[slots]
+        return speeds
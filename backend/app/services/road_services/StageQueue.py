@@ -0,0 +1,71 @@
+import threading
+from collections import deque
+
+
+class StageQueue:
+    """Hàng đợi có giới hạn nối 2 công đoạn (thread) của pipeline xử lý video. Đầy thì bỏ phần tử cũ nhất nên
+    công đoạn sau luôn nhận frame mới nhất (latest-frame-wins) và công đoạn trước không bao giờ bị chặn.
+
+    Examples:
+        >>> frames = StageQueue(maxsize=2)
+        >>> frames.put(frame)            # thread decode
+        >>> frame = frames.get()         # thread suy luận, None khi hàng đợi đã đóng và hết phần tử
+        >>> frames.depth, frames.dropped
+        >>> frames.close()
+    """
+    def __init__(self, maxsize: int = 2):
+        """
+        Args:
+            maxsize (int): Số phần tử tối đa. Defaults to 2.
+        """
+        self.maxsize = max(1, int(maxsize))
+        self.dropped = 0
+        self._items = deque()
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def depth(self) -> int:
+        return len(self._items)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def put(self, item, block: bool = False):
+        """Thêm phần tử, đầy thì bỏ phần tử cũ nhất
+
+        Args:
+            block (bool): Đầy thì chờ tới khi có chỗ thay vì bỏ phần tử cũ nhất (không được mất frame, ví dụ chạy
+            offline). Defaults to False.
+        """
+        with self._cond:
+            if block:
+                self._cond.wait_for(lambda: len(self._items) < self.maxsize or self._closed)
+            if self._closed:
+                return
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: float = None):
+        """Lấy phần tử cũ nhất còn trong hàng đợi
+
+        Returns:
+            Phần tử, None nếu hết timeout hoặc hàng đợi đã đóng và không còn phần tử nào
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self._closed, timeout=timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        """Đóng hàng đợi: put bị bỏ qua, get trả nốt các phần tử còn lại rồi trả về None"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
@@ -0,0 +1,149 @@
+from collections import deque
+import numpy as np
+from core.config import settings_inference
+
+
+class TrackStore:
+    """Trạng thái của các track lưu dạng struct-of-arrays với số slot cố định thay cho các dict theo id track (id
+    của ByteTrack tăng mãi trên luồng video chạy 24/7 nên dict chỉ lớn dần). Mỗi slot giữ id, frame cuối cùng
+    nhìn thấy, nhãn, tốc độ và lịch sử vị trí ngắn (dạng vòng). Track không xuất hiện quá ttl frame bị xoá nên bộ
+    nhớ không đổi theo thời gian chạy.
+
+    Chỉ mục id -> slot là 2 mảng sắp xếp theo id nên tra cả loạt id chỉ là 1 lần np.searchsorted.
+
+    Khi record_departures=True, mỗi track bị xoá để lại 1 bản ghi (id, nhãn, thời điểm xuất hiện đầu tiên và cuối
+    cùng, tốc độ cuối cùng) chờ drain_departures() lấy ra, dùng làm sự kiện từng phương tiện.
+
+    Examples:
+        >>> store = TrackStore(capacity=256, history=20, ttl=90)
+        >>> slots = store.assign(ids, frame=frame_count)   # Tạo slot cho id mới, xoá track hết hạn
+        >>> store.speeds[slots], store.classes[slots]
+        >>> store.lookup([7, 8])                           # -1 nếu id không có trong store
+    """
+    __slots__ = ("capacity", "history", "ttl", "ids", "last_seen", "classes", "speeds", "positions", "times", "head",
+                 "count", "first_time", "last_time", "evicted", "dropped", "record_departures", "_departures", "_index_ids",
+                 "_index_slots", "_free")
+
+    def __init__(self, capacity: int = settings_inference.SPEED_CAPACITY,
+                 history: int = settings_inference.SPEED_MAX_HIST, ttl: int = settings_inference.TRACK_TTL,
+                 record_departures: bool = False):
+        """
+        Args:
+            capacity (int): Số track tối đa, hết chỗ thì track lâu nhất không xuất hiện bị xoá trước hạn. Frame có
+            nhiều track hơn capacity thì các id mới còn lại không được theo dõi (slot -1, đếm vào dropped)
+            history (int): Số vị trí gần nhất giữ lại cho mỗi track
+            ttl (int): Số frame không xuất hiện trước khi track bị xoá
+            record_departures (bool): Giữ bản ghi của các track bị xoá cho drain_departures. Defaults to False.
+        """
+        self.capacity = capacity
+        self.history = history
+        self.ttl = ttl
+        self.ids = np.full(capacity, -1, dtype=np.int64)
+        self.last_seen = np.zeros(capacity, dtype=np.int64)
+        self.classes = np.full(capacity, -1, dtype=np.int8)
+        self.speeds = np.full(capacity, np.nan)
+        self.positions = np.zeros((capacity, history, 2), dtype=np.float64)
+        self.times = np.zeros((capacity, history), dtype=np.float64)
+        self.head = np.zeros(capacity, dtype=np.int64)      # Vị trí ghi mẫu tiếp theo trong vòng
+        self.count = np.zeros(capacity, dtype=np.int64)     # Số mẫu đang có
+        self.first_time = np.zeros(capacity, dtype=np.float64)  # Thời điểm (PTS) của mẫu đầu tiên và mới nhất
+        self.last_time = np.zeros(capacity, dtype=np.float64)
+        self.evicted = 0
+        self.dropped = 0    # Số lần id mới không được cấp slot vì frame có nhiều track hơn capacity
+        self.record_departures = record_departures
+        # Mỗi phần tử là bản ghi của 1 lần xoá, giới hạn số lần xoá chờ lấy ra nếu không ai drain
+        self._departures = deque(maxlen=capacity)
+        self._index_ids = np.empty(0, dtype=np.int64)       # id đang có, tăng dần
+        self._index_slots = np.empty(0, dtype=np.int64)     # slot tương ứng
+        self._free = np.arange(capacity - 1, -1, -1, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._index_ids)
+
+    def lookup(self, ids) -> np.ndarray:
+        """Slot của từng id, -1 nếu id không có trong store"""
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self._index_ids) == 0:
+            return np.full(len(ids), -1, dtype=np.int64)
+        pos = np.minimum(np.searchsorted(self._index_ids, ids), len(self._index_ids) - 1)
+        return np.where(self._index_ids[pos] == ids, self._index_slots[pos], -1)
+
+    def assign(self, ids, frame: int, classes=None) -> np.ndarray:
+        """Slot của từng id ở frame hiện tại, id mới được cấp slot trống (đã xoá trạng thái cũ), -1 nếu không
+        còn slot nào (mọi slot đều là track của frame hiện tại). Xoá các track hết hạn trước khi cấp
+
+        Args:
+            ids (np.ndarray): id các track ở frame hiện tại (không trùng nhau)
+            frame (int): Số thứ tự frame hiện tại
+            classes (np.ndarray, optional): Nhãn tương ứng
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        self.evict(frame)
+        slots = self.lookup(ids)
+        new = slots < 0
+        if np.any(new):
+            new = np.flatnonzero(new)
+            new_slots = self._allocate(len(new), frame, ids)
+            self.dropped += len(new) - len(new_slots)
+            new = new[:len(new_slots)]
+            slots[new] = new_slots
+            self.ids[new_slots] = ids[new]
+            self.speeds[new_slots] = np.nan
+            self.head[new_slots] = 0
+            self.count[new_slots] = 0
+            order = np.argsort(np.concatenate((self._index_ids, ids[new])), kind="stable")
+            self._index_ids = np.concatenate((self._index_ids, ids[new]))[order]
+            self._index_slots = np.concatenate((self._index_slots, new_slots))[order]
+        tracked = slots >= 0
+        self.last_seen[slots[tracked]] = frame
+        if classes is not None:
+            self.classes[slots[tracked]] = np.asarray(classes)[tracked]
+        return slots
+
+    def _allocate(self, n: int, frame: int, current_ids: np.ndarray) -> np.ndarray:
+        """Tối đa n slot trống, ít hơn n nếu cả slot trống lẫn slot xoá trước hạn được đều không đủ"""
+        if n > len(self._free):
+            # Hết chỗ: xoá trước hạn các track lâu nhất không xuất hiện (không thuộc frame hiện tại)
+            candidates = self._index_slots[~np.isin(self._index_ids, current_ids)]
+            oldest = candidates[np.argsort(self.last_seen[candidates], kind="stable")[:n - len(self._free)]]
+            self._remove(np.isin(self._index_slots, oldest))
+            n = min(n, len(self._free))
+            if n == 0:
+                return np.empty(0, dtype=np.int64)
+        slots, self._free = self._free[-n:][::-1], self._free[:-n]
+        return slots
+
+    def evict(self, frame: int) -> int:
+        """Xoá các track không xuất hiện quá ttl frame, trả về số track bị xoá"""
+        expired = frame - self.last_seen[self._index_slots] > self.ttl
+        if not np.any(expired):
+            return 0
+        return self._remove(expired)
+
+    def _remove(self, mask: np.ndarray) -> int:
+        removed = self._index_slots[mask]
+        if self.record_departures:
+            self._departures.append((self.ids[removed], self.classes[removed], self.first_time[removed],
+                                     self.last_time[removed], self.speeds[removed]))
+        self.ids[removed] = -1
+        self.classes[removed] = -1
+        self.speeds[removed] = np.nan
+        self._free = np.concatenate((removed[::-1], self._free))
+        self._index_ids = self._index_ids[~mask]
+        self._index_slots = self._index_slots[~mask]
+        self.evicted += len(removed)
+        return len(removed)
+
+    def drain_departures(self) -> dict:
+        """Lấy ra (và xoá) bản ghi các track đã bị xoá từ lần gọi trước
+
+        Returns:
+            dict: {"track_id", "class_id", "first_time", "last_time", "speed"} mỗi giá trị là 1 mảng, speed là NaN
+            nếu track chưa từng có tốc độ
+        """
+        keys = ("track_id", "class_id", "first_time", "last_time", "speed")
+        if not self._departures:
+            return {key: np.empty(0) for key in keys}
+        records = list(self._departures)
+        self._departures.clear()
+        return {key: np.concatenate(column) for key, column in zip(keys, zip(*records))}
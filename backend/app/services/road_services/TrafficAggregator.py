@@ -0,0 +1,131 @@
+import numpy as np
+from core.config import settings_metric_transport, settings_inference
+
+# Thứ tự nhãn (trùng id lớp của model) và các giá trị tổng hợp của mỗi cửa sổ
+VEHICLE_CLASSES = ("car", "motor")
+WINDOW_FIELDS = ("count", "speed_mean", "speed_p50", "speed_p85", "speed_samples", "frames")
+
+
+def histogram_quantile(histogram: np.ndarray, q: float) -> float:
+    """Quantile q của các giá trị nguyên được đếm trong histogram (bin i = giá trị i), 0 nếu histogram rỗng"""
+    total = histogram.sum()
+    if total == 0:
+        return 0.0
+    return float(np.searchsorted(np.cumsum(histogram), q * total, side="left"))
+
+
+class SlidingWindow:
+    """Cửa sổ trượt seconds giây chia thành buckets ngăn (dạng vòng theo thời gian). Mỗi ngăn giữ tổng số frame,
+    tổng số xe, số frame có xe và histogram tốc độ (1 km/h mỗi bin) của từng nhãn nên bộ nhớ không đổi dù có bao
+    nhiêu mẫu. Ngăn cũ hơn cửa sổ được làm trống khi thời gian quay vòng tới nó.
+    """
+    __slots__ = ("seconds", "buckets", "width", "bucket_ids", "frames", "count_sum", "count_frames", "speed_hist")
+
+    def __init__(self, seconds: float, buckets: int, speed_bins: int):
+        self.seconds = seconds
+        self.buckets = buckets
+        self.width = seconds / buckets
+        self.bucket_ids = np.full(buckets, -1, dtype=np.int64)   # Số thứ tự ngăn tuyệt đối đang nằm ở mỗi vị trí
+        self.frames = np.zeros(buckets, dtype=np.int64)
+        self.count_sum = np.zeros((buckets, len(VEHICLE_CLASSES)), dtype=np.int64)
+        self.count_frames = np.zeros((buckets, len(VEHICLE_CLASSES)), dtype=np.int64)
+        self.speed_hist = np.zeros((buckets, len(VEHICLE_CLASSES), speed_bins), dtype=np.int64)
+
+    def _bucket(self, timestamp: float) -> int:
+        return int(timestamp // self.width)
+
+    def add(self, timestamp: float, counts: np.ndarray, speed_hist: np.ndarray):
+        bucket = self._bucket(timestamp)
+        i = bucket % self.buckets
+        if self.bucket_ids[i] != bucket:
+            self.bucket_ids[i] = bucket
+            self.frames[i] = 0
+            self.count_sum[i] = 0
+            self.count_frames[i] = 0
+            self.speed_hist[i] = 0
+        self.frames[i] += 1
+        self.count_sum[i] += counts
+        self.count_frames[i] += counts > 0
+        self.speed_hist[i] += speed_hist
+
+    def summary(self, timestamp: float) -> np.ndarray:
+        """(số nhãn, len(WINDOW_FIELDS)) giá trị tổng hợp của cửa sổ kết thúc tại timestamp"""
+        bucket = self._bucket(timestamp)
+        valid = (self.bucket_ids > bucket - self.buckets) & (self.bucket_ids <= bucket)
+        frames = self.frames[valid].sum()
+        count_sum = self.count_sum[valid].sum(axis=0)
+        count_frames = self.count_frames[valid].sum(axis=0)
+        histogram = self.speed_hist[valid].sum(axis=0)
+        values = np.zeros((len(VEHICLE_CLASSES), len(WINDOW_FIELDS)))
+        speeds = np.arange(histogram.shape[1])
+        for c in range(len(VEHICLE_CLASSES)):
+            samples = histogram[c].sum()
+            values[c] = (
+                # Giống avg_none_zero: frame không có xe nào không tính vào số xe trung bình
+                count_sum[c] / count_frames[c] if count_frames[c] else 0.0,
+                (histogram[c] * speeds).sum() / samples if samples else 0.0,
+                histogram_quantile(histogram[c], 0.5),
+                histogram_quantile(histogram[c], 0.85),
+                samples,
+                frames,
+            )
+        return values
+
+
+class TrafficAggregator:
+    """Tổng hợp số xe và tốc độ theo nhiều cửa sổ trượt chạy song song (ví dụ 10 giây, 1 phút, 5 phút) với bộ
+    nhớ không đổi, thay cho việc giữ list mọi giá trị trong time_step rồi mới tính trung bình. Mỗi frame chỉ cộng
+    vào 1 ngăn của mỗi cửa sổ, truy vấn được bất kỳ lúc nào: số xe trung bình, tốc độ trung bình, p50 và p85.
+
+    Tốc độ 0 km/h (xe đứng yên hoặc chưa đủ dữ liệu) không được tính, giống avg_none_zero trước đây.
+
+    Examples:
+        >>> aggregator = TrafficAggregator(windows=(10, 60, 300))
+        >>> aggregator.add(pts, count_car, count_motor, car_speeds, motor_speeds)   # Mỗi frame
+        >>> aggregator.summary(60, pts)["car"]["speed_p85"]
+    """
+    def __init__(self, windows=settings_metric_transport.TRAFFIC_WINDOWS,
+                 buckets: int = settings_metric_transport.TRAFFIC_WINDOW_BUCKETS,
+                 max_speed: int = settings_inference.MAX_SPEED):
+        """
+        Args:
+            windows (list): Độ dài các cửa sổ (giây)
+            buckets (int): Số ngăn của mỗi cửa sổ, càng nhiều thì mép cửa sổ càng chính xác
+            max_speed (int): Tốc độ tối đa (km/h), quyết định số bin của histogram tốc độ
+        """
+        self.speed_bins = int(max_speed) + 1
+        self.windows = {seconds: SlidingWindow(seconds, buckets, self.speed_bins) for seconds in windows}
+
+    def add(self, timestamp: float, count_car: int, count_motor: int, car_speeds: np.ndarray, motor_speeds: np.ndarray):
+        """Thêm kết quả của 1 frame
+
+        Args:
+            timestamp (float): PTS (giây) của frame
+            count_car (int): Số oto trong vùng
+            count_motor (int): Số xe máy trong vùng
+            car_speeds (np.ndarray): Tốc độ (km/h) các oto trong vùng đã có tốc độ
+            motor_speeds (np.ndarray): Tốc độ (km/h) các xe máy trong vùng đã có tốc độ
+        """
+        counts = np.array([count_car, count_motor], dtype=np.int64)
+        histogram = np.zeros((len(VEHICLE_CLASSES), self.speed_bins), dtype=np.int64)
+        for c, speeds in enumerate((car_speeds, motor_speeds)):
+            if len(speeds):
+                histogram[c] = np.bincount(np.clip(np.asarray(speeds, dtype=np.int64), 0, self.speed_bins - 1),
+                                           minlength=self.speed_bins)
+        histogram[:, 0] = 0
+        for window in self.windows.values():
+            window.add(timestamp, counts, histogram)
+
+    def summary_array(self, timestamp: float, windows=None) -> np.ndarray:
+        """(số cửa sổ, số nhãn, len(WINDOW_FIELDS)), dùng để ghi vào SharedRoadSlot
+
+        Args:
+            windows (list, optional): Các cửa sổ cần lấy. Defaults to None (tất cả, theo thứ tự khởi tạo).
+        """
+        windows = self.windows if windows is None else windows
+        return np.stack([self.windows[seconds].summary(timestamp) for seconds in windows])
+
+    def summary(self, seconds: float, timestamp: float) -> dict:
+        """{nhãn: {giá trị: ...}} của cửa sổ seconds giây kết thúc tại timestamp"""
+        values = self.windows[seconds].summary(timestamp)
+        return {name: dict(zip(WINDOW_FIELDS, values[c].tolist())) for c, name in enumerate(VEHICLE_CLASSES)}
@@ -0,0 +1,144 @@
+from types import SimpleNamespace
+import cv2
+import numpy as np
+from core.config import settings_inference
+from services.road_services.SpeedEngine import GroundProjection, SpeedEngine
+
+
+def _create_byte_tracker(fps: float):
+    """BYTETracker của ultralytics kèm hàm predict() cho các frame không chạy detect"""
+    from ultralytics.trackers.byte_tracker import BYTETracker, STrack
+
+    class PropagatingBYTETracker(BYTETracker):
+        def predict(self, shifts: dict = None) -> np.ndarray:
+            """Đẩy các track đang hoạt động đi 1 bước bằng Kalman filter, không cần detection
+
+            Args:
+                shifts (dict, optional): id track -> (dx, dy) đo bằng optical flow, dùng làm measurement để\
+                hiệu chỉnh Kalman. Defaults to None.
+
+            Returns:
+                np.ndarray: mảng [x1, y1, x2, y2, id, score, cls, idx] giống update()
+            """
+            self.frame_id += 1
+            active = [track for track in self.tracked_stracks if track.is_activated]
+            previous = {track.track_id: track.tlwh.copy() for track in active} if shifts else {}
+            STrack.multi_predict(active)
+            for track in active:
+                shift = shifts.get(track.track_id) if shifts else None
+                if shift is not None:
+                    tlwh = previous[track.track_id]
+                    tlwh[:2] += shift
+                    track.mean, track.covariance = track.kalman_filter.update(
+                        track.mean, track.covariance, track.convert_coords(tlwh))
+            return np.asarray([track.result for track in active], dtype=np.float32)
+
+    return PropagatingBYTETracker(SimpleNamespace(**settings_inference.TRACKER_ARGS), frame_rate=int(fps))
+
+
+class VehicleTracker:
+    """ByteTrack + ước lượng tốc độ, thay cho solutions.SpeedEstimator để tách phần detect (model) ra khỏi
+    process con: tracker nhận Detections từ bất kỳ detector nào (LocalDetector, RemoteDetector...).
+
+    Tốc độ do SpeedEngine tính cho tất cả track cùng lúc từ điểm giữa cạnh dưới bounding box (điểm chạm mặt
+    đường) quy đổi ra mét (meter_per_pixel hoặc homography) theo PTS của frame (không có PTS thì số frame / fps).
+    Frame không chạy detect gọi predict() để đẩy track bằng Kalman filter (tuỳ chọn hiệu chỉnh bằng optical flow),
+    đếm xe và tính tốc độ vẫn chạy bình thường.
+
+    Attributes:
+        ids (np.ndarray): id các track đang hoạt động ở frame hiện tại
+        classes (np.ndarray): nhãn tương ứng
+        boxes (np.ndarray): (N, 4) bounding box xyxy tương ứng
+        scores (np.ndarray): độ tin cậy của detection gần nhất gắn với từng track
+        speeds (np.ndarray): tốc độ (km/h) tương ứng, NaN nếu track chưa đủ dữ liệu
+    """
+    def __init__(self, meter_per_pixel, fps: float = settings_inference.VIDEO_FPS,
+                 max_hist: int = settings_inference.SPEED_MAX_HIST, max_speed: int = settings_inference.MAX_SPEED,
+                 use_optical_flow: bool = settings_inference.USE_OPTICAL_FLOW, tracker=None, origin=(0, 0)):
+        """
+        Args:
+            meter_per_pixel (float | dict): Tỉ lệ 1 mét ngoài đời với 1 pixel, hoặc 4 điểm homography\
+            {"image": [...], "world": [...]} (xem GroundProjection.from_config)
+            fps (float): fps của video để quy đổi số frame ra giây
+            max_hist (int): Số mẫu vị trí gần nhất dùng để tính tốc độ
+            max_speed (int): Tốc độ tối đa (km/h)
+            use_optical_flow (bool): Hiệu chỉnh vị trí track ở frame không detect bằng sparse optical flow
+            tracker (optional): Đối tượng có hàm update(detections) và predict(shifts) trả về mảng
+            [x1, y1, x2, y2, id, score, cls, idx]. Defaults to None (BYTETracker của ultralytics).
+            origin (tuple): Góc trên trái của vùng crop mà toạ độ các box tính theo. Defaults to (0, 0).
+        """
+        if tracker is None:
+            tracker = _create_byte_tracker(fps)
+        self.tracker = tracker
+        self.use_optical_flow = use_optical_flow
+        self._prev_gray = None
+        self.fps = fps
+        self.speed_engine = SpeedEngine(GroundProjection.from_config(meter_per_pixel, origin), history=max_hist,
+                                        max_speed=max_speed)
+
+        self.frame_count = 0
+        self.timestamp = 0.0  # PTS (giây) của frame hiện tại
+
+        self._set_empty()
+
+    def _set_empty(self):
+        self.ids = np.empty(0, np.int32)
+        self.classes = np.empty(0, np.int32)
+        self.boxes = np.empty((0, 4), np.int32)
+        self.scores = np.empty(0, np.float32)
+        self.speeds = np.empty(0, np.float64)
+
+    def _advance(self, timestamp: float = None):
+        self.frame_count += 1
+        self.timestamp = self.frame_count / self.fps if timestamp is None else timestamp
+
+    def update(self, detections, frame: np.ndarray = None, timestamp: float = None):
+        """Cập nhật tracker với kết quả detect của frame mới
+
+        Args:
+            detections (Detections): Kết quả detect của frame
+            frame (np.ndarray, optional): Frame tương ứng, chỉ cần khi dùng optical flow. Defaults to None.
+            timestamp (float, optional): PTS (giây) của frame. Defaults to None (frame_count / fps).
+        """
+        self._advance(timestamp)
+        if self.use_optical_flow and frame is not None:
+            self._prev_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        self._set_tracks(self.tracker.update(detections))
+
+    def predict(self, frame: np.ndarray = None, timestamp: float = None):
+        """Frame không chạy detect: đẩy các track bằng Kalman filter của ByteTrack
+
+        Args:
+            frame (np.ndarray, optional): Frame hiện tại, chỉ cần khi dùng optical flow. Defaults to None.
+            timestamp (float, optional): PTS (giây) của frame. Defaults to None (frame_count / fps).
+        """
+        self._advance(timestamp)
+        shifts = self._optical_flow(frame) if self.use_optical_flow and frame is not None else None
+        self._set_tracks(self.tracker.predict(shifts))
+
+    def _optical_flow(self, frame: np.ndarray):
+        """Đo độ dịch chuyển tâm các track từ frame trước tới frame hiện tại bằng Lucas-Kanade"""
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        prev_gray, self._prev_gray = self._prev_gray, gray
+        if prev_gray is None or prev_gray.shape != gray.shape or len(self.ids) == 0:
+            return None
+        points = ((self.boxes[:, :2] + self.boxes[:, 2:4]) / 2).astype(np.float32).reshape(-1, 1, 2)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None, winSize=(15, 15), maxLevel=2)
+        ok = status.reshape(-1) == 1
+        deltas = (moved - points).reshape(-1, 2)
+        return {int(track_id): deltas[i] for i, track_id in enumerate(self.ids) if ok[i]}
+
+    def _set_tracks(self, tracks):
+        if len(tracks) == 0:
+            self._set_empty()
+            # Vẫn gọi để các track hết hạn được xoá khỏi TrackStore
+            self.speed_engine.update(self.ids, np.empty((0, 2)), self.timestamp)
+            return
+        tracks = np.asarray(tracks, dtype=np.float32)
+        self.boxes = tracks[:, :4].astype(np.int32)
+        self.ids = tracks[:, 4].astype(np.int32)
+        self.scores = tracks[:, 5]
+        self.classes = tracks[:, 6].astype(np.int32)
+        # Điểm giữa cạnh dưới box: điểm chạm mặt đường, đúng với homography của mặt đường hơn tâm box
+        ground = np.column_stack(((tracks[:, 0] + tracks[:, 2]) / 2, tracks[:, 3]))
+        self.speeds = self.speed_engine.update(self.ids, ground, self.timestamp, self.classes)
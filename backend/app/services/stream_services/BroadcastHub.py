@@ -0,0 +1,184 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class Subscription:
+    """Hàng đợi nhận dữ liệu của 1 client. Hàng đợi có giới hạn, khi đầy thì bỏ phần tử cũ nhất để client
+    luôn nhận được dữ liệu mới nhất và bộ nhớ không tăng dù client chậm.
+    """
+    def __init__(self, road_name: str, queue_size: int = 2):
+        self.road_name = road_name
+        self.queue = asyncio.Queue(maxsize=queue_size)
+
+    @property
+    def pending(self) -> int:
+        return self.queue.qsize()
+
+    def push(self, payload):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(payload)
+
+    async def get(self):
+        return await self.queue.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self.queue.get()
+
+
+class _RoadChannel:
+    def __init__(self):
+        self.subscribers = set()
+        self.task = None
+        self.version = None
+        self.payload = None
+        self.wakeup = asyncio.Event()
+
+
+class BroadcastHub:
+    """Fan-out dữ liệu của từng tuyến đường tới tất cả client đang xem.
+
+    Mỗi tuyến đường có đúng 1 producer task (chạy trên event loop) theo dõi version của dữ liệu (frame id,
+    version của metrics...). Khi có version mới, producer đọc dữ liệu 1 lần rồi đẩy vào hàng đợi của mọi
+    subscriber. Producer kiểm tra version sau mỗi poll_interval hoặc ngay khi notify() được gọi. Producer
+    chỉ tồn tại khi tuyến đường còn người xem, subscriber cuối cùng rời đi thì task dừng và channel được
+    giải phóng.
+
+    Examples:
+        >>> hub = BroadcastHub(get_version=analyzer.get_frame_id, read=analyzer.get_frame_packet)
+        >>> async with hub.subscribe("Văn Quán") as subscription:
+        >>>     async for frame_bytes in subscription:
+        >>>         await websocket.send_bytes(frame_bytes)
+    """
+    def __init__(self, get_version, read, poll_interval: float = 0.01, queue_size: int = 2):
+        """
+        Args:
+            get_version (callable): get_version(road_name) -> version hiện tại, phải rất nhẹ vì được gọi liên tục
+            read (callable): read(road_name) -> (version, payload) hoặc None nếu chưa có dữ liệu
+            poll_interval (float): Chu kỳ kiểm tra version mới (giây). Defaults to 0.01.
+            queue_size (int): Kích thước hàng đợi của mỗi subscriber. Defaults to 2.
+        """
+        self.get_version = get_version
+        self.read = read
+        self.poll_interval = poll_interval
+        self.queue_size = queue_size
+        self._channels = {}
+
+    def subscriber_count(self, road_name: str = None) -> int:
+        if road_name is not None:
+            channel = self._channels.get(road_name)
+            return len(channel.subscribers) if channel else 0
+        return sum(len(channel.subscribers) for channel in self._channels.values())
+
+    def queue_depth(self, road_name: str) -> int:
+        """Tổng số phần tử đang chờ gửi trong hàng đợi của các subscriber của tuyến đường"""
+        channel = self._channels.get(road_name)
+        if channel is None:
+            return 0
+        return sum(getattr(subscription, "pending", 0) for subscription in channel.subscribers)
+
+    def subscribers(self, road_name: str) -> list:
+        channel = self._channels.get(road_name)
+        return list(channel.subscribers) if channel else []
+
+    def add_subscriber(self, road_name: str, subscription=None):
+        """Đăng ký subscriber mới cho tuyến đường
+
+        Args:
+            road_name (str): Tên tuyến đường
+            subscription (optional): Đối tượng bất kỳ có thuộc tính road_name và hàm push(payload),
+            ví dụ FrameClient. Defaults to None (tạo Subscription với hàng đợi có giới hạn).
+        """
+        channel = self._channels.get(road_name)
+        if channel is None:
+            channel = self._channels[road_name] = _RoadChannel()
+        if subscription is None:
+            subscription = Subscription(road_name, self.queue_size)
+        # Client mới vào nhận ngay dữ liệu gần nhất thay vì phải chờ tới lần cập nhật sau
+        if channel.payload is not None:
+            subscription.push(channel.payload)
+        channel.subscribers.add(subscription)
+        if channel.task is None or channel.task.done():
+            channel.task = asyncio.create_task(self._produce(road_name, channel))
+        return subscription
+
+    def remove_subscriber(self, subscription: Subscription):
+        channel = self._channels.get(subscription.road_name)
+        if channel is None:
+            return
+        channel.subscribers.discard(subscription)
+        if not channel.subscribers:
+            if channel.task is not None:
+                channel.task.cancel()
+            del self._channels[subscription.road_name]
+
+    def notify(self, road_name: str):
+        """Đánh thức producer của tuyến đường để kiểm tra dữ liệu mới ngay, không chờ hết poll_interval.
+        Phải gọi trên thread của event loop (từ thread khác dùng loop.call_soon_threadsafe)."""
+        channel = self._channels.get(road_name)
+        if channel is not None:
+            channel.wakeup.set()
+
+    @asynccontextmanager
+    async def subscribe(self, road_name: str, subscription=None):
+        subscription = self.add_subscriber(road_name, subscription)
+        try:
+            yield subscription
+        finally:
+            self.remove_subscriber(subscription)
+
+    async def wait_for_newer(self, road_name: str, after: int, timeout: float):
+        """Long-poll: chờ tới khi tuyến đường có dữ liệu với version > after
+
+        Args:
+            road_name (str): Tên tuyến đường
+            after (int): Version client đã có
+            timeout (float): Thời gian chờ tối đa (giây)
+
+        Returns:
+            tuple | None: (version, payload) mới hơn after, None nếu hết thời gian chờ
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        async with self.subscribe(road_name) as subscription:
+            channel = self._channels[road_name]
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return None
+                try:
+                    await asyncio.wait_for(subscription.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    return None
+                # channel.version luôn đi cùng payload vừa được đẩy
+                if channel.version is not None and channel.version > after:
+                    return channel.version, channel.payload
+
+    async def _produce(self, road_name: str, channel: _RoadChannel):
+        try:
+            while channel.subscribers:
+                try:
+                    if self.get_version(road_name) != channel.version:
+                        packet = self.read(road_name)
+                        if packet is not None:
+                            channel.version, channel.payload = packet
+                            for subscription in channel.subscribers:
+                                subscription.push(channel.payload)
+                except Exception as e:
+                    print(f"Lỗi producer broadcast của {road_name}: {e}")
+                try:
+                    await asyncio.wait_for(channel.wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                channel.wakeup.clear()
+        except asyncio.CancelledError:
+            pass
+
+    async def close(self):
+        for channel in list(self._channels.values()):
+            if channel.task is not None:
+                channel.task.cancel()
+        self._channels.clear()
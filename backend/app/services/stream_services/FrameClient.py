@@ -0,0 +1,123 @@
+import asyncio
+import time
+from core.config import settings_streaming
+
+
+class ClientStats:
+    """Thống kê gửi frame của 1 kết nối"""
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.sent = 0
+        self.dropped = 0
+        self.bytes_sent = 0
+        self.send_latency = 0.0  # EWMA thời gian send_bytes (giây)
+
+    @property
+    def effective_fps(self) -> float:
+        elapsed = time.monotonic() - self.started_at
+        return self.sent / elapsed if elapsed > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "bytes_sent": self.bytes_sent,
+            "effective_fps": round(self.effective_fps, 2),
+            "send_latency_ms": round(self.send_latency * 1000, 2),
+        }
+
+
+class FrameClient:
+    """Subscriber của frame_hub cho 1 kết nối WebSocket.
+
+    Thay vì hàng đợi, client chỉ giữ đúng 1 frame mới nhất (latest-frame-wins): frame đến khi frame trước
+    chưa kịp gửi sẽ ghi đè và được tính là dropped, nên client chậm không làm tăng bộ nhớ server và không
+    làm chậm client khác. Tốc độ gửi và variant (kích thước/chất lượng JPEG do process con encode sẵn) được
+    điều chỉnh theo thời gian send đo được: mạng chậm thì hạ bậc (fps thấp hơn, ảnh nhẹ hơn), mạng ổn định
+    trở lại thì nâng bậc nhưng không vượt quá variant client yêu cầu.
+
+    Examples:
+        >>> client = FrameClient(road_name, variant="medium")
+        >>> async with state.frame_hub.subscribe(road_name, client):
+        >>>     while True:
+        >>>         frame_id, timestamp, frames = await client.next_packet()
+        >>>         data = frames[client.variant]
+        >>>         ...
+        >>>         client.record_send(len(data), latency)
+    """
+    def __init__(self, road_name: str, variant: str = None, tiers: list = settings_streaming.QUALITY_TIERS):
+        """
+        Args:
+            road_name (str): Tên tuyến đường
+            variant (str, optional): Variant client yêu cầu. Defaults to None (bậc tốt nhất).
+            tiers (list): Danh sách (variant, fps tối đa), bậc 0 là tốt nhất
+        """
+        self.road_name = road_name
+        self.tiers = tiers
+        variants = [tier_variant for tier_variant, _ in tiers]
+        # Variant không có trong danh sách bậc (ví dụ variant mới thêm vào cấu hình) thì giữ cố định variant đó
+        self._fixed_variant = variant if variant is not None and variant not in variants else None
+        self.min_tier = variants.index(variant) if variant in variants else 0
+        self.tier = self.min_tier
+        self.stats = ClientStats()
+        self._packet = None
+        self._event = asyncio.Event()
+        self._next_due = 0.0
+        self._sends_since_change = 0
+
+    @property
+    def variant(self) -> str:
+        return self._fixed_variant or self.tiers[self.tier][0]
+
+    @property
+    def frame_interval(self) -> float:
+        return 1 / self.tiers[self.tier][1]
+
+    @property
+    def pending(self) -> int:
+        """Số frame đang chờ gửi (0 hoặc 1, client chỉ giữ frame mới nhất)"""
+        return int(self._packet is not None)
+
+    def push(self, packet):
+        """Được frame_hub gọi khi có frame mới"""
+        if self._packet is not None:
+            self.stats.dropped += 1
+        self._packet = packet
+        self._event.set()
+
+    async def next_packet(self):
+        """Chờ tới lượt gửi theo fps của bậc hiện tại rồi lấy frame mới nhất"""
+        delay = self._next_due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self._event.wait()
+        self._event.clear()
+        packet, self._packet = self._packet, None
+        self._next_due = time.monotonic() + self.frame_interval
+        return packet
+
+    def record_send(self, nbytes: int, latency: float):
+        """Ghi nhận 1 lần gửi thành công và điều chỉnh bậc chất lượng"""
+        stats = self.stats
+        stats.sent += 1
+        stats.bytes_sent += nbytes
+        stats.send_latency = latency if stats.sent == 1 else 0.8 * stats.send_latency + 0.2 * latency
+
+        self._sends_since_change += 1
+        if self._sends_since_change < settings_streaming.TIER_CHANGE_MIN_SENDS:
+            return
+        if (stats.send_latency > settings_streaming.DEGRADE_LATENCY_RATIO * self.frame_interval
+                and self.tier < len(self.tiers) - 1):
+            self._change_tier(self.tier + 1)
+        elif (self.tier > self.min_tier
+              and stats.send_latency < settings_streaming.UPGRADE_LATENCY_RATIO / self.tiers[self.tier - 1][1]):
+            self._change_tier(self.tier - 1)
+
+    def _change_tier(self, tier: int):
+        self.tier = tier
+        self._sends_since_change = 0
+
+    def as_dict(self) -> dict:
+        return {"tier": self.tier, "variant": self.variant, "max_fps": self.tiers[self.tier][1],
+                **self.stats.as_dict()}
+
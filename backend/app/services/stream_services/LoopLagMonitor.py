@@ -0,0 +1,49 @@
+import asyncio
+from collections import deque
+
+
+class LoopLagMonitor:
+    """Đo độ trễ của event loop: task nền ngủ interval giây rồi đo xem thực tế bị đánh thức muộn bao lâu.
+    Độ trễ lớn nghĩa là có code đồng bộ đang chặn event loop (encode, đọc file, CPU...) làm mọi client bị chậm.
+
+    Examples:
+        >>> monitor = LoopLagMonitor(interval=0.5)
+        >>> monitor.start()  # gọi trên event loop
+        >>> monitor.lag, monitor.max_lag
+        >>> await monitor.stop()
+    """
+    def __init__(self, interval: float = 0.5, window: int = 120):
+        """
+        Args:
+            interval (float): Chu kỳ đo (giây). Defaults to 0.5.
+            window (int): Số lần đo gần nhất dùng để tính max_lag. Defaults to 120.
+        """
+        self.interval = interval
+        self.lag = 0.0
+        self._samples = deque(maxlen=window)
+        self._task = None
+
+    @property
+    def max_lag(self) -> float:
+        return max(self._samples, default=0.0)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                expected = loop.time() + self.interval
+                await asyncio.sleep(self.interval)
+                self.lag = max(loop.time() - expected, 0.0)
+                self._samples.append(self.lag)
+        except asyncio.CancelledError:
+            pass
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,61 @@
+import math
+
+# Content-Type của Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value) -> str:
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value) if not value.is_integer() else str(int(value))
+
+
+class PrometheusText:
+    """Dựng nội dung trả về cho /metrics theo Prometheus text exposition format (không cần prometheus_client).
+    Mỗi metric có 1 dòng HELP, 1 dòng TYPE và các sample với label của nó.
+
+    Examples:
+        >>> metrics = PrometheusText(prefix="traffic")
+        >>> metrics.add("frames_processed_total", "counter", "Số frame đã xử lý", [({"road": "Văn Quán"}, 1200)])
+        >>> metrics.add("event_loop_lag_seconds", "gauge", "Độ trễ event loop", [({}, 0.002)])
+        >>> metrics.render()
+    """
+    def __init__(self, prefix: str = ""):
+        """
+        Args:
+            prefix (str): Tiền tố thêm vào tên mọi metric (ví dụ "traffic" -> traffic_<tên>). Defaults to "".
+        """
+        self.prefix = f"{prefix}_" if prefix else ""
+        self._lines = []
+
+    def add(self, name: str, kind: str, help_text: str, samples: list):
+        """Thêm 1 metric
+
+        Args:
+            name (str): Tên metric (chưa có tiền tố)
+            kind (str): counter, gauge, summary hoặc untyped
+            help_text (str): Mô tả metric
+            samples (list): Các (labels dict, value) hoặc (hậu tố tên, labels dict, value), hậu tố dùng cho
+            _sum/_count của summary
+        """
+        full_name = self.prefix + name
+        help_text = help_text.replace("\\", "\\\\").replace("\n", "\\n")
+        self._lines.append(f"# HELP {full_name} {help_text}")
+        self._lines.append(f"# TYPE {full_name} {kind}")
+        for sample in samples:
+            suffix, labels, value = sample if len(sample) == 3 else ("", *sample)
+            if value is None:
+                continue
+            label_text = ",".join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+            label_text = f"{{{label_text}}}" if label_text else ""
+            self._lines.append(f"{full_name}{suffix}{label_text} {_format_value(value)}")
+
+    def render(self) -> str:
+        return "\n".join(self._lines) + "\n"
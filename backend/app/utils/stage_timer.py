@@ -0,0 +1,85 @@
+from collections import deque
+from time import perf_counter
+
+import numpy as np
+
+
+class StageStats:
+    """Thống kê thời gian của 1 công đoạn: tổng số lần, tổng thời gian và cửa sổ các mẫu gần nhất để tính
+    percentile. Dùng làm context manager (không lồng cùng 1 công đoạn vào nhau)."""
+    __slots__ = ("samples", "count", "total", "_start")
+
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.add(perf_counter() - self._start)
+        return False
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, q: float) -> float:
+        """Percentile q (0-100) của cửa sổ mẫu, đơn vị giây"""
+        return float(np.percentile(self.samples, q)) if self.samples else 0.0
+
+    def quantiles(self, qs) -> list:
+        """Các quantile qs (0-1) của cửa sổ mẫu, đơn vị giây"""
+        if not self.samples:
+            return [0.0] * len(qs)
+        # Copy trước vì thread khác có thể đang thêm mẫu
+        return np.quantile(list(self.samples), qs).tolist()
+
+    def summary(self) -> dict:
+        samples = np.asarray(self.samples) * 1000 if self.samples else np.zeros(1)
+        p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+        return {
+            "count": self.count,
+            "mean_ms": round(float(samples.mean()), 3),
+            "p50_ms": round(float(p50), 3),
+            "p90_ms": round(float(p90), 3),
+            "p99_ms": round(float(p99), 3),
+            "max_ms": round(float(samples.max()), 3),
+        }
+
+
+class StageTimer:
+    """Bộ đo thời gian nhẹ cho từng công đoạn của pipeline (decode, resize, inference...).
+
+    Examples:
+        >>> timer = StageTimer()
+        >>> with timer.stage("inference"):
+        >>>     detections = detector.detect(frame)
+        >>> timer.summary()["inference"]["p99_ms"]
+    """
+    def __init__(self, window: int = 1000):
+        """
+        Args:
+            window (int): Số mẫu gần nhất giữ lại để tính percentile. Defaults to 1000.
+        """
+        self.window = window
+        self.stages = {}
+
+    def stage(self, name: str) -> StageStats:
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats(self.window)
+        return stats
+
+    def record(self, name: str, seconds: float):
+        self.stage(name).add(seconds)
+
+    def reset(self):
+        self.stages.clear()
+
+    def summary(self) -> dict:
+        return {name: stats.summary() for name, stats in self.stages.items()}
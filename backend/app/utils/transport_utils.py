@@ -1,31 +1,84 @@
+import math
 import numpy as np
 import cv2
 import time
 
-def convert_frame_to_byte(img: np.array) -> bytes:
+def convert_frame_to_byte(img: np.array, quality: int = None) -> bytes:
     """ Hàm chuyển đổi ảnh dạng numpy sang bytes
     Args:
         img (np.array): dũ liệu ảnh được đọc bởi cv2
+        quality (int, optional): Chất lượng JPEG (0-100). Defaults to None (mặc định của OpenCV).
 
     Returns:
         bytes: mã bytes
     """
     if img is not None:
         try:
-            _, jpeg = cv2.imencode('.jpg', img)
+            params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)] if quality is not None else []
+            _, jpeg = cv2.imencode('.jpg', img, params)
             return jpeg.tobytes()
         except Exception as e:
             print(f"Lỗi chuyển đổi sang bytes {e}")
             return None
     return None
 
+def region_crop_box(region, frame_size: tuple, margin: int = 0) -> tuple:
+    """Bounding box của vùng đa giác (nới thêm margin pixel mỗi phía), giới hạn trong frame
+
+    Args:
+        region (np.ndarray | dict): Các đỉnh (x, y) của vùng đa giác, hoặc dict tên vùng -> đa giác (lấy bounding\
+        box bao tất cả các vùng)
+        frame_size (tuple): Kích thước frame (width, height)
+        margin (int, optional): Số pixel nới thêm. Defaults to 0.
+
+    Returns:
+        tuple: (x0, y0, x1, y1), vùng crop là frame[y0:y1, x0:x1]
+    """
+    if isinstance(region, dict):
+        region = np.concatenate([np.asarray(polygon) for polygon in region.values()])
+    x0, y0 = np.min(region, axis=0) - margin
+    x1, y1 = np.max(region, axis=0) + margin
+    width, height = frame_size
+    return int(max(x0, 0)), int(max(y0, 0)), int(min(x1, width)), int(min(y1, height))
+
+def inference_size_for(crop_box: tuple, size, stride: int = 32) -> tuple:
+    """Kích thước (height, width) đầu vào model cho vùng crop
+
+    Args:
+        crop_box (tuple): (x0, y0, x1, y1) của vùng crop
+        size (int | tuple): Số nguyên = cạnh dài tối đa, cạnh còn lại theo tỉ lệ vùng crop và cả 2 cạnh được làm
+        tròn lên bội số stride (không phóng to vùng crop nhỏ hơn size). Tuple (height, width) = giữ nguyên
+        stride (int, optional): Stride lớn nhất của model. Defaults to 32.
+
+    Examples:
+        >>> inference_size_for((40, 120, 550, 400), 480)
+        (288, 480)
+    """
+    if not isinstance(size, (int, np.integer)):
+        return tuple(int(v) for v in size)
+    x0, y0, x1, y1 = crop_box
+    width, height = x1 - x0, y1 - y0
+    scale = min(size / max(width, height), 1.0)
+    return (math.ceil(height * scale / stride) * stride, math.ceil(width * scale / stride) * stride)
+
+def shared_inference_size(sizes) -> tuple:
+    """Kích thước (height, width) chung cho 1 batch gồm frame của nhiều vùng crop: lấy cạnh lớn nhất theo từng chiều
+    để vùng crop nào cũng letterbox vào được mà không bị thu nhỏ hơn kích thước riêng của nó
+
+    Examples:
+        >>> shared_inference_size([(288, 480), (224, 480)])
+        (288, 480)
+    """
+    heights, widths = zip(*sizes)
+    return max(heights), max(widths)
+
 def avg_none_zero(lst: list) -> int:
     non_zero = [x for x in lst if x != 0]
     return sum(non_zero) // len(non_zero) if non_zero else 0
     
 def log(names : str, shared_data : dict) -> str:
     """Hàm in ra log thông tin các processing
-    Hàm này lấy data tổng thể ở share_data (Manager.dict() dùng để giao tiếp các process với nhau)
+    Hàm này lấy data tổng thể ở share_data (dict tên tuyến đường -> SharedRoadSlot)
     Đặt hàm này là static method vì để tránh việc sử dụng multiprocessing bị lỗi do nó sẽ picke các biến\
     liên quan đến hàm để chuyển dữ liệu sang process con, đặc biệt là self chứa các tool của YOLO\
     và các biến khác không thể picke được.Dùng @staticmethod để tránh pickle cả class instance. Chỉ \
@@ -46,8 +99,7 @@ def log(names : str, shared_data : dict) -> str:
             for name in names:
                 try:
                     if name in shared_data:
-                        road_data = shared_data[name]
-                        info_dict = road_data['info']
+                        info_dict = shared_data[name].read_metrics()
                     
                         count_car = info_dict.get('count_car', 0)
                         count_motor = info_dict.get('count_motor', 0)
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# Test import theo app.services..., còn code trong app import theo core..., services... (chạy từ backend/app)
+# nên cần cả backend và backend/app trong sys.path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(BACKEND_DIR, "app"), BACKEND_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
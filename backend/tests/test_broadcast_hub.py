@@ -0,0 +1,91 @@
+import asyncio
+
+from app.services.stream_services.BroadcastHub import BroadcastHub
+
+
+class FakeSource:
+    def __init__(self):
+        self.version = 0
+        self.reads = 0
+
+    def get_version(self, road_name):
+        return self.version
+
+    def read(self, road_name):
+        self.reads += 1
+        return self.version, f"{road_name}-{self.version}"
+
+
+def test_each_new_version_is_read_once_and_fanned_out():
+    async def scenario():
+        source = FakeSource()
+        hub = BroadcastHub(source.get_version, source.read, poll_interval=0.001)
+        async with hub.subscribe("A") as first, hub.subscribe("A") as second:
+            assert hub.subscriber_count("A") == 2
+            source.version = 1
+            assert await asyncio.wait_for(first.get(), 1) == "A-1"
+            assert await asyncio.wait_for(second.get(), 1) == "A-1"
+            await asyncio.sleep(0.01)
+            # Unchanged version must not trigger extra reads
+            assert source.reads == 1
+        assert hub.subscriber_count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_late_subscriber_gets_latest_payload_and_channel_is_freed():
+    async def scenario():
+        source = FakeSource()
+        source.version = 7
+        hub = BroadcastHub(source.get_version, source.read, poll_interval=0.001)
+        async with hub.subscribe("B") as first:
+            assert await asyncio.wait_for(first.get(), 1) == "B-7"
+            async with hub.subscribe("B") as late:
+                assert await asyncio.wait_for(late.get(), 1) == "B-7"
+        assert "B" not in hub._channels
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_queue_stays_bounded():
+    async def scenario():
+        source = FakeSource()
+        hub = BroadcastHub(source.get_version, source.read, poll_interval=0.001, queue_size=2)
+        async with hub.subscribe("C") as slow:
+            for version in range(1, 6):
+                source.version = version
+                await asyncio.sleep(0.01)
+            assert slow.queue.qsize() == 2
+            assert await slow.get() == "C-4"
+            assert await slow.get() == "C-5"
+
+    asyncio.run(scenario())
+
+
+def test_notify_wakes_producer_before_poll_interval():
+    async def scenario():
+        source = FakeSource()
+        hub = BroadcastHub(source.get_version, source.read, poll_interval=60)
+        async with hub.subscribe("D") as subscription:
+            assert await asyncio.wait_for(subscription.get(), 1) == "D-0"
+            source.version = 1
+            hub.notify("D")
+            assert await asyncio.wait_for(subscription.get(), 1) == "D-1"
+
+    asyncio.run(scenario())
+
+
+def test_wait_for_newer_parks_until_version_passes_after():
+    async def scenario():
+        source = FakeSource()
+        source.version = 3
+        hub = BroadcastHub(source.get_version, source.read, poll_interval=0.001)
+        assert await hub.wait_for_newer("E", after=3, timeout=0.05) is None
+        waiter = asyncio.create_task(hub.wait_for_newer("E", after=3, timeout=1))
+        await asyncio.sleep(0.01)
+        source.version = 4
+        assert await waiter == (4, "E-4")
+        assert await hub.wait_for_newer("E", after=0, timeout=1) == (4, "E-4")
+        assert hub.subscriber_count() == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,33 @@
+import numpy as np
+
+from app.services.inference_services.Detections import Detections
+from app.services.road_services.DetectionScheduler import DetectionScheduler
+
+
+def _detections(scores):
+    return Detections(np.zeros((len(scores), 4)), scores, np.zeros(len(scores)))
+
+
+def test_detects_every_stride_frames_when_tracks_are_healthy():
+    scheduler = DetectionScheduler(detection_stride=3, min_track_score=0.4, max_unmatched_ratio=0.3)
+    plan = []
+    for _ in range(7):
+        if scheduler.should_detect():
+            plan.append("D")
+            scheduler.record_detection(_detections([0.9, 0.8]), np.array([0.9, 0.8]))
+        else:
+            plan.append("P")
+            scheduler.record_prediction()
+    assert "".join(plan) == "DPPDPPD"
+
+
+def test_falls_back_to_every_frame_when_tracks_degrade():
+    scheduler = DetectionScheduler(detection_stride=3, min_track_score=0.4, max_unmatched_ratio=0.3)
+    # 3 xe mới xuất hiện nhưng mới có 1 track
+    scheduler.record_detection(_detections([0.9, 0.9, 0.9]), np.array([0.9]))
+    assert scheduler.should_detect()
+    # Track có độ tin cậy thấp
+    scheduler.record_detection(_detections([0.3]), np.array([0.3]))
+    assert scheduler.should_detect()
+    scheduler.record_detection(_detections([0.9]), np.array([0.9]))
+    assert not scheduler.should_detect()
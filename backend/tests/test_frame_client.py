@@ -0,0 +1,42 @@
+import asyncio
+
+from app.services.stream_services.FrameClient import FrameClient
+
+TIERS = [("full", 30), ("medium", 15), ("thumb", 4)]
+
+
+def test_latest_frame_wins_and_counts_drops():
+    async def scenario():
+        client = FrameClient("A", tiers=TIERS)
+        for frame_id in range(1, 4):
+            client.push((frame_id, 0.0, b"x"))
+        packet = await asyncio.wait_for(client.next_packet(), 1)
+        assert packet[0] == 3
+        assert client.stats.dropped == 2
+
+    asyncio.run(scenario())
+
+
+def test_tier_degrades_on_slow_sends_and_recovers():
+    client = FrameClient("A", tiers=TIERS)
+    for _ in range(10):
+        client.record_send(1000, latency=0.5)
+    assert client.tier == 1
+    for _ in range(10):
+        client.record_send(1000, latency=0.5)
+    assert client.tier == 2
+    for _ in range(40):
+        client.record_send(1000, latency=0.001)
+    assert client.tier == 0
+    assert client.stats.sent == 60
+
+
+def test_client_never_upgrades_above_requested_variant():
+    client = FrameClient("A", variant="medium", tiers=TIERS)
+    assert client.variant == "medium"
+    for _ in range(40):
+        client.record_send(1000, latency=0.0)
+    assert client.variant == "medium"
+    for _ in range(10):
+        client.record_send(1000, latency=0.5)
+    assert client.variant == "thumb"
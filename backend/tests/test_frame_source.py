@@ -0,0 +1,50 @@
+import time
+
+import cv2
+import numpy as np
+
+from app.benchmarks.synthetic_clip import write_synthetic_clip
+from app.services.road_services.FrameSource import (
+    GeneratorSource, ImageDirectorySource, StreamSource, VideoFileSource, next_backoff, open_source, source_name,
+)
+
+
+def test_source_name_and_factory():
+    assert source_name("./video_test/Văn Quán.mp4") == "Văn Quán"
+    assert source_name("rtsp://10.0.0.5:554/cam/1") == "10.0.0.5_cam_1"
+    assert isinstance(open_source("rtsp://10.0.0.5/cam"), StreamSource)
+    assert isinstance(open_source("./video_test/Văn Quán.mp4"), VideoFileSource)
+    assert [next_backoff(b, 4.0) for b in (0.5, 1.0, 2.0, 4.0)] == [1.0, 2.0, 4.0, 4.0]
+
+
+def test_generator_and_image_directory_loop(tmp_path):
+    generator = GeneratorSource(lambda index: np.full((2, 2, 3), index, np.uint8), n_frames=3)
+    assert [int(generator.read()[1][0, 0, 0]) for _ in range(5)] == [0, 1, 2, 0, 1]
+
+    for index in range(2):
+        cv2.imwrite(str(tmp_path / f"{index:03d}.png"), np.full((4, 4, 3), index * 100, np.uint8))
+    images = ImageDirectorySource(str(tmp_path), fps=5)
+    assert images.open()
+    assert [int(images.read()[1][0, 0, 0]) for _ in range(3)] == [0, 100, 0]
+
+
+def test_stream_source_keeps_only_latest_frame(tmp_path):
+    clip = write_synthetic_clip(str(tmp_path / "clip.mp4"), n_frames=60, fps=30, size=(64, 48))
+    stream = open_source(f"stream+file://{clip}")
+    with stream:
+        assert stream.read()[0]
+        time.sleep(0.3)  # Worker chậm: các frame đến trong lúc này bị frame mới nhất đè lên
+        check, frame = stream.read()
+        assert check and frame.shape == (48, 64, 3)
+        assert stream.connected
+        assert stream.dropped >= 3
+
+
+def test_unreachable_stream_does_not_block_reader(tmp_path):
+    stream = StreamSource(str(tmp_path / "missing.mp4"), pace=True, read_timeout=0.05, min_backoff=0.01,
+                          max_backoff=0.02)
+    with stream:
+        started = time.monotonic()
+        assert stream.read() == (False, None)
+        assert time.monotonic() - started < 1
+        assert not stream.connected
@@ -0,0 +1,57 @@
+import io
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq  # noqa: E402
+
+from app.services.history_services.HistoryExport import (  # noqa: E402
+    ExportWriter, arrow_schema, export_tables, rows_to_batch, time_chunks,
+)
+
+
+def _event_rows(n):
+    left = datetime(2026, 10, 1, tzinfo=timezone.utc)
+    return [("A", i, "car", left - timedelta(seconds=5), left, None if i % 2 else 30.0) for i in range(n)]
+
+
+def test_time_chunks_cover_range_without_gaps():
+    start = datetime(2026, 9, 1, tzinfo=timezone.utc)
+    chunks = list(time_chunks(start, start + timedelta(days=2, hours=6), 86400))
+    assert len(chunks) == 3
+    assert chunks[0][0] == start and chunks[-1][1] == start + timedelta(days=2, hours=6)
+    assert all(previous[1] == current[0] for previous, current in zip(chunks, chunks[1:]))
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_streamed_chunks_form_a_readable_file(fmt):
+    table, _ = export_tables()["events"]
+    schema = arrow_schema(table)
+    assert "id" not in schema.names
+    writer = ExportWriter(fmt, schema)
+    data = b""
+    for _ in range(3):
+        writer.write(rows_to_batch(_event_rows(4), schema))
+        data += writer.drain()
+    writer.write(rows_to_batch([], schema))
+    writer.close()
+    data += writer.drain()
+    if fmt == "parquet":
+        result = pq.read_table(io.BytesIO(data))
+    else:
+        result = pa.ipc.open_file(pa.BufferReader(data)).read_all()
+    assert result.num_rows == 12 and writer.rows == 12
+    assert result.column("speed").null_count == 6
+
+
+def test_arrow_file_can_be_memory_mapped(tmp_path):
+    table, _ = export_tables()["history"]
+    schema = arrow_schema(table)
+    path = str(tmp_path / "history.arrow")
+    writer = ExportWriter("arrow", schema, path)
+    now = datetime(2026, 10, 1, tzinfo=timezone.utc)
+    writer.write(rows_to_batch([("A", now, 2.0, 5.0, 30.0, 25.0)], schema))
+    writer.close()
+    result = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    assert result.column("road_name").to_pylist() == ["A"]
@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services.history_services.HistoryStore import RESOLUTIONS, merge_buckets, plan_query, rollup_rows
+
+
+def _row(road_name, timestamp, car_count, car_speed, motor_count=0, motor_speed=0):
+    return {"road_name": road_name, "recorded_at": datetime.fromtimestamp(timestamp, tz=timezone.utc),
+            "car_count": car_count, "motor_count": motor_count, "car_speed": car_speed, "motor_speed": motor_speed}
+
+
+def test_rollup_groups_by_road_and_bucket_and_skips_zero_speeds():
+    rows = [_row("A", 0, 2, 30), _row("A", 30, 4, 0), _row("A", 61, 1, 20), _row("B", 10, 5, 40)]
+    minute = {(row["road_name"], row["bucket"].timestamp()): row for row in rollup_rows(rows, RESOLUTIONS["minute"])}
+    assert set(minute) == {("A", 0), ("A", 60), ("B", 0)}
+    first = minute[("A", 0)]
+    assert first["samples"] == 2 and first["car_count_sum"] == 6
+    assert first["car_speed_sum"] == 30 and first["car_speed_samples"] == 1
+    hour = rollup_rows(rows, RESOLUTIONS["hour"])
+    assert [(row["road_name"], row["samples"]) for row in hour] == [("A", 3), ("B", 1)]
+
+
+def test_merging_minute_rollups_matches_direct_averages():
+    rows = [_row("A", t, t // 60, 10 + t // 60) for t in range(0, 600, 30)]
+    series = merge_buckets(rollup_rows(rows, RESOLUTIONS["minute"]), step=300)["A"]
+    assert [point["samples"] for point in series] == [10, 10]
+    assert series[0]["car_count"] == pytest.approx(sum(t // 60 for t in range(0, 300, 30)) / 10)
+    assert series[1]["car_speed"] == pytest.approx(sum(10 + t // 60 for t in range(300, 600, 30)) / 10)
+    assert series[1]["timestamp"] == "1970-01-01T00:05:00+00:00"
+
+
+def test_plan_query_picks_coarsest_exact_resolution_and_bounds_points():
+    day = 86400
+    assert plan_query(0, day, step=300, now=day) == ("minute", 300)
+    assert plan_query(0, 30 * day, step=3 * 3600, now=30 * day) == ("hour", 3 * 3600)
+    resolution, step = plan_query(0, 30 * day, now=30 * day)
+    assert resolution == "hour" and 30 * day / step <= 1000
+    assert plan_query(0, 365 * day, now=365 * day) == ("hour", 12 * 3600)
+    assert plan_query(0, 365 * day, step=7 * day, now=365 * day) == ("day", 7 * day)
+    for start, end, step in [(10, 10, None), (0, day, 90), (0, 30 * day, 60), (0, 400 * day, None)]:
+        with pytest.raises(ValueError):
+            plan_query(start, end, step, now=end)
+
+
+def test_plan_query_skips_resolutions_pruned_by_retention():
+    day = 86400
+    now = 1800000000.0
+    # Rollup phút chỉ giữ 30 ngày, rollup giờ 365 ngày
+    assert plan_query(now - 45 * day, now - 44 * day, now=now) == ("hour", 3600)
+    assert plan_query(now - 45 * day, now - 44 * day, step=3 * 3600, now=now) == ("hour", 3 * 3600)
+    assert plan_query(now - 400 * day, now - 399 * day, now=now) == ("day", day)
+    assert plan_query(now - day, now, now=now) == ("minute", 300)
+    for step in (300, 1800):
+        with pytest.raises(ValueError):
+            plan_query(now - 45 * day, now - 44 * day, step=step, now=now)
@@ -0,0 +1,85 @@
+import asyncio
+
+import numpy as np
+
+from app.services.history_services.HistoryWriter import HistoryWriter, history_row, vehicle_event_rows
+
+
+def _row(i):
+    return history_row("A", {"count_car": i, "count_motor": 2 * i, "speed_car": 30, "speed_motor": 25,
+                             "updated_at": 1760000000.0 + i})
+
+
+def test_history_row_uses_worker_timestamp():
+    row = _row(1)
+    assert row["road_name"] == "A"
+    assert row["car_count"] == 1.0 and row["motor_count"] == 2.0
+    assert row["recorded_at"].timestamp() == 1760000001.0
+    assert row["recorded_at"].tzinfo is not None
+
+
+def test_rows_are_written_in_batches():
+    async def scenario():
+        batches = []
+
+        async def sink(rows):
+            batches.append(list(rows))
+
+        writer = HistoryWriter(sink=sink, queue_size=100, batch_size=4, flush_interval=0.05)
+        writer.start()
+        for i in range(10):
+            writer.submit(_row(i))
+        await asyncio.sleep(0.2)
+        assert [len(batch) for batch in batches] == [4, 4, 2]
+        assert writer.written == 10 and writer.queue_depth() == 0
+        await writer.close()
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_drops_new_rows_and_close_flushes_the_rest():
+    async def scenario():
+        written = []
+
+        async def sink(rows):
+            written.extend(rows)
+
+        # Không start: không có gì được ghi cho tới close
+        writer = HistoryWriter(sink=sink, queue_size=3, batch_size=2, flush_interval=0.05)
+        accepted = [writer.submit(_row(i)) for i in range(5)]
+        assert accepted == [True, True, True, False, False]
+        assert writer.dropped == 2
+        await writer.close()
+        assert [row["car_count"] for row in written] == [0.0, 1.0, 2.0]
+
+    asyncio.run(scenario())
+
+
+def test_failed_batch_is_counted_and_writer_keeps_running():
+    async def scenario():
+        calls = []
+
+        async def sink(rows):
+            calls.append(len(rows))
+            if len(calls) == 1:
+                raise ConnectionError("database down")
+
+        writer = HistoryWriter(sink=sink, queue_size=100, batch_size=2, flush_interval=0.01)
+        writer.start()
+        for i in range(4):
+            writer.submit(_row(i))
+        await asyncio.sleep(0.1)
+        assert writer.failed == 2 and writer.written == 2
+        await writer.close()
+
+    asyncio.run(scenario())
+
+
+def test_vehicle_event_rows_map_classes_and_missing_speed():
+    departures = {"track_id": np.array([3, 4]), "class_id": np.array([1, -1], dtype=np.int8),
+                  "first_time": np.array([1760000000.0, 1760000001.0]), "last_time": np.array([1760000004.0, 1760000002.0]),
+                  "speed": np.array([35.5, np.nan])}
+    rows = vehicle_event_rows("A", departures)
+    assert [row["vehicle"] for row in rows] == ["motor", "unknown"]
+    assert rows[0]["speed"] == 35.5 and rows[1]["speed"] is None
+    assert (rows[0]["left_at"] - rows[0]["entered_at"]).total_seconds() == 4.0
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from app.services.inference_services.InferenceBackend import (
+    BACKENDS, InferenceBackend, create_backend, decode_predictions, letterbox, non_max_suppression,
+)
+
+
+def test_letterbox_keeps_aspect_ratio_and_centers_image():
+    image = np.zeros((200, 400, 3), dtype=np.uint8)
+    padded, ratio, pad = letterbox(image, (640, 640))
+    assert padded.shape == (640, 640, 3)
+    assert ratio == 1.6
+    assert pad == (0, 160)
+    assert padded[0, 0, 0] == 114
+
+
+def test_nms_is_per_class():
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [0, 0, 10, 10]], dtype=np.float32)
+    scores = np.array([0.9, 0.8, 0.7], dtype=np.float32)
+    classes = np.array([0, 0, 1])
+    assert non_max_suppression(boxes, scores, classes, 0.5).tolist() == [0, 2]
+
+
+def test_decode_maps_boxes_back_to_original_image():
+    # 2 anchor, 2 lớp: anchor 0 là lớp 1 (Motor) độ tin cậy cao, anchor 1 dưới ngưỡng
+    output = np.array([
+        [320.0, 100.0],   # cx
+        [320.0, 100.0],   # cy
+        [64.0, 10.0],     # w
+        [32.0, 10.0],     # h
+        [0.1, 0.05],      # car
+        [0.9, 0.1],       # Motor
+    ])
+    detections = decode_predictions(output, conf=0.2, iou=0.5, ratio=1.6, pad=(0, 160), image_shape=(200, 400))
+    assert len(detections) == 1
+    assert detections.cls.tolist() == [1]
+    np.testing.assert_allclose(detections.xyxy[0], [180, 90, 220, 110])
+
+
+def test_registry_creates_registered_backend_and_rejects_unknown(monkeypatch):
+    class FakeBackend(InferenceBackend):
+        def forward(self, blob):
+            return np.zeros((len(blob), 6, 1), dtype=np.float32)
+
+    monkeypatch.setitem(BACKENDS, "fake", FakeBackend)
+    backend = create_backend("fake", "model.bin", batch=2)
+    results = backend.detect_batch([np.zeros((50, 80, 3), np.uint8)] * 3)
+    assert [len(detections) for detections in results] == [0, 0, 0]
+    with pytest.raises(ValueError):
+        create_backend("tensorrt", "model.engine")
+
+
+def test_backend_without_forward_fails_on_creation():
+    class HalfBuiltBackend(InferenceBackend):
+        pass
+
+    with pytest.raises(TypeError):
+        HalfBuiltBackend("model.bin")
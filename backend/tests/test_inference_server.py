@@ -0,0 +1,33 @@
+import queue
+
+import numpy as np
+
+from app.services.inference_services.Detections import Detections
+from app.services.inference_services.InferenceServer import collect_batch
+
+
+def test_batch_is_capped_by_max_batch():
+    requests = queue.Queue()
+    for i in range(5):
+        requests.put((i, 1, (2, 2, 3)))
+    batch = collect_batch(requests, max_batch=3, max_wait=1)
+    assert [client_id for client_id, _, _ in batch] == [0, 1, 2]
+    assert len(collect_batch(requests, max_batch=3, max_wait=0.01)) == 2
+
+
+def test_stop_flushes_pending_batch_first():
+    requests = queue.Queue()
+    requests.put((0, 1, (2, 2, 3)))
+    requests.put(None)
+    assert len(collect_batch(requests, max_batch=4, max_wait=0.05)) == 1
+    assert collect_batch(requests, max_batch=4, max_wait=0.05) is None
+
+
+def test_detections_support_tracker_interface():
+    detections = Detections([[0, 0, 10, 20], [5, 5, 7, 9]], [0.9, 0.1], [0, 1])
+    assert len(detections) == 2
+    np.testing.assert_allclose(detections.xywh[0], [5, 10, 10, 20])
+    kept = detections[detections.conf > 0.5]
+    assert len(kept) == 1
+    assert kept.cls.tolist() == [0]
+    assert len(Detections()) == 0
@@ -0,0 +1,31 @@
+import numpy as np
+
+from app.services.road_services.MotionGate import MotionGate
+
+
+def _gate(max_skip=3):
+    region = np.array([[0, 0], [100, 0], [100, 100], [0, 100]])
+    return MotionGate([region], crop_box=(0, 0, 200, 100), scale=0.5, pixel_threshold=25,
+                      min_changed_ratio=0.01, max_skip=max_skip)
+
+
+def test_static_frames_are_skipped_until_max_skip():
+    gate = _gate(max_skip=3)
+    frame = np.full((100, 200, 3), 80, dtype=np.uint8)
+    plan = "".join("D" if gate.check(frame) else "S" for _ in range(9))
+    # Lần đầu luôn detect, sau 3 lần bỏ qua liên tiếp thì bắt buộc detect lại
+    assert plan == "DSSSDSSSD"
+    assert gate.skipped == 6
+    assert abs(gate.skip_rate - 6 / 9) < 1e-9
+
+
+def test_only_motion_inside_region_triggers_detection():
+    gate = _gate(max_skip=100)
+    frame = np.full((100, 200, 3), 80, dtype=np.uint8)
+    assert gate.check(frame)
+    outside = frame.copy()
+    outside[20:60, 140:180] = 255  # Ngoài region (x >= 100)
+    assert not gate.check(outside)
+    inside = frame.copy()
+    inside[20:60, 20:60] = 255
+    assert gate.check(inside)
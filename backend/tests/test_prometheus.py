@@ -0,0 +1,22 @@
+from app.utils.prometheus import PrometheusText
+
+
+def test_render_text_format_with_labels_and_summary_suffixes():
+    metrics = PrometheusText(prefix="traffic")
+    metrics.add("frames_processed_total", "counter", "Số frame đã xử lý",
+                [({"road": 'Ngã "Tư" Sở'}, 120), ({"road": "Văn Quán"}, None)])
+    metrics.add("stage_duration_seconds", "summary", "Thời gian",
+                [("", {"stage": "decode", "quantile": 0.5}, 0.0025), ("_count", {"stage": "decode"}, 4)])
+    metrics.add("event_loop_lag_seconds", "gauge", "Độ trễ", [({}, float("nan"))])
+    assert metrics.render().splitlines() == [
+        "# HELP traffic_frames_processed_total Số frame đã xử lý",
+        "# TYPE traffic_frames_processed_total counter",
+        'traffic_frames_processed_total{road="Ngã \\"Tư\\" Sở"} 120',
+        "# HELP traffic_stage_duration_seconds Thời gian",
+        "# TYPE traffic_stage_duration_seconds summary",
+        'traffic_stage_duration_seconds{stage="decode",quantile="0.5"} 0.0025',
+        'traffic_stage_duration_seconds_count{stage="decode"} 4',
+        "# HELP traffic_event_loop_lag_seconds Độ trễ",
+        "# TYPE traffic_event_loop_lag_seconds gauge",
+        "traffic_event_loop_lag_seconds NaN",
+    ]
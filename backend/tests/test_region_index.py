@@ -0,0 +1,22 @@
+import numpy as np
+
+from app.services.road_services.RegionIndex import RegionIndex, as_named_regions
+
+
+def test_named_regions_are_looked_up_per_point_in_crop_coordinates():
+    regions = {
+        "left": np.array([[10, 10], [50, 10], [50, 50], [10, 50]]),
+        "right": np.array([[40, 10], [90, 10], [90, 50], [40, 50]]),
+    }
+    index = RegionIndex(regions, crop_box=(10, 10, 100, 60))
+    # Toạ độ theo vùng crop: (x - 10, y - 10)
+    points = np.array([[5, 5], [35, 20], [70, 20], [85, 45], [-5, 5], [200, 200]])
+    assert index.contains(points).tolist() == [True, True, True, False, False, False]
+    assert index.contains(points, "left").tolist() == [True, True, False, False, False, False]
+    assert index.contains(points, "right").tolist() == [False, True, True, False, False, False]
+    assert index.lookup(points).tolist() == [1, 3, 2, 0, 0, 0]
+
+
+def test_single_polygon_gets_default_name():
+    regions = as_named_regions(np.array([[0, 0], [10, 0], [10, 10]]))
+    assert list(regions) == ["region"]
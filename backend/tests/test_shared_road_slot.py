@@ -0,0 +1,150 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from app.services.road_services.SharedRoadSlot import SharedRoadSlot, TRAFFIC_WINDOWS
+
+
+def test_read_before_first_write_returns_none():
+    slot = SharedRoadSlot.create(frame_capacities={"thumb": 16, "full": 64})
+    try:
+        assert slot.read_frame() is None
+        assert slot.read_metrics() == {
+            "count_car": 0, "count_motor": 0, "speed_car": 0, "speed_motor": 0,
+            "version": 0, "updated_at": 0.0,
+        }
+    finally:
+        slot.close()
+        slot.unlink()
+
+
+def test_frames_are_double_buffered_and_sequenced():
+    slot = SharedRoadSlot.create(frame_capacities={"thumb": 16, "full": 64})
+    try:
+        slot.write_frame({"thumb": b"t1", "full": b"first-jpeg"}, timestamp=10.0)
+        slot.write_frame({"thumb": b"t2", "full": b"second"}, timestamp=11.0)
+
+        frame_id, timestamp, frames = slot.read_frame()
+        assert frame_id == 2
+        assert timestamp == 11.0
+        assert frames == {"thumb": b"t2", "full": b"second"}
+
+        slot.write_frame({"thumb": b"t3", "full": b"third-frame"})
+        assert slot.read_frame()[0] == 3
+        assert slot.read_frame(variants=("thumb",))[2] == {"thumb": b"t3"}
+    finally:
+        slot.close()
+        slot.unlink()
+
+
+def test_oversized_frame_is_rejected():
+    slot = SharedRoadSlot.create(frame_capacities={"full": 8})
+    try:
+        with pytest.raises(ValueError):
+            slot.write_frame({"full": b"x" * 9})
+        assert slot.read_frame() is None
+    finally:
+        slot.close()
+        slot.unlink()
+
+
+def test_pickled_slot_attaches_to_same_memory():
+    slot = SharedRoadSlot.create(frame_capacities={"thumb": 16, "full": 64})
+    try:
+        clone = pickle.loads(pickle.dumps(slot))
+        clone.write_metrics(count_car=3, speed_motor=42)
+        assert slot.read_metrics()["count_car"] == 3
+        assert slot.read_metrics()["speed_motor"] == 42
+        assert slot.read_metrics_version() == 1
+        clone.close()
+    finally:
+        slot.close()
+        slot.unlink()
+
+
+def test_stats_round_trip_and_unknown_stages_are_ignored():
+    slot = SharedRoadSlot.create(frame_capacities={"full": 8})
+    try:
+        assert slot.read_stats()["updated_at"] == 0.0
+        assert slot.read_frame_info() == (0, 0.0)
+        slot.write_frame({"full": b"jpeg"}, timestamp=5.0)
+        slot.write_stats(
+            stages={"inference": (10, 0.5, [0.04, 0.06, 0.09]), "unknown": (1, 1.0, [1.0, 1.0, 1.0])},
+            frames_processed=30, frames_dropped=2, inference_fps=9.5,
+        )
+        stats = slot.read_stats()
+        assert slot.read_frame_info() == (1, 5.0)
+        assert stats["frames_processed"] == 30
+        assert stats["frames_dropped"] == 2
+        assert stats["inference_fps"] == 9.5
+        assert stats["updated_at"] > 0
+        assert stats["stages"]["inference"] == {"count": 10, "sum": 0.5, "quantiles": {0.5: 0.04, 0.9: 0.06, 0.99: 0.09}}
+        assert "unknown" not in stats["stages"]
+    finally:
+        slot.close()
+        slot.unlink()
+
+
+def test_windows_round_trip_without_new_version():
+    slot = SharedRoadSlot.create(frame_capacities={"full": 8})
+    try:
+        values = np.zeros((len(TRAFFIC_WINDOWS), 2, 6))
+        values[0, 0, 3] = 55.0
+        slot.write_windows(values)
+        data = slot.read_windows()
+        assert data["updated_at"] > 0
+        assert data["windows"][TRAFFIC_WINDOWS[0]]["car"]["speed_p85"] == 55.0
+        assert slot.read_metrics_version() == 0
+    finally:
+        slot.close()
+        slot.unlink()
+
+
+class _WriteDuringCopy(list):
+    """Buffer frame của reader: lần truy cập đầu tiên cho writer publish xong 1 frame và ghi dở payload frame kế
+    tiếp (chưa tăng seq) vào đúng buffer reader đang copy"""
+    def __init__(self, buffers, writer):
+        super().__init__(buffers)
+        self.writer = writer
+        self.fired = False
+
+    def __getitem__(self, index):
+        if not self.fired:
+            self.fired = True
+            self.writer.write_frame({"full": b"second"})
+            self.writer._frames["full"][index][:5] = np.frombuffer(b"THIRD", dtype=np.uint8)
+        return super().__getitem__(index)
+
+
+def test_frame_overwritten_during_copy_is_not_returned():
+    slot = SharedRoadSlot.create(frame_capacities={"full": 16})
+    try:
+        writer = pickle.loads(pickle.dumps(slot))
+        slot.write_frame({"full": b"first"})
+        slot._frames["full"] = _WriteDuringCopy(slot._frames["full"], writer)
+        frame_id, _, frames = slot.read_frame()
+        assert (frame_id, frames) == (2, {"full": b"second"})
+        writer.close()
+    finally:
+        slot.close()
+        slot.unlink()
+
+
+def test_reader_does_not_hang_when_writer_dies_mid_write():
+    slot = SharedRoadSlot.create(frame_capacities={"full": 16})
+    try:
+        slot.write_frame({"full": b"jpeg"}, timestamp=5.0)
+        slot.write_metrics(count_car=3)
+        assert slot.read_frame()[0] == 1 and slot.read_metrics()["count_car"] == 3
+        # Writer chết giữa 2 lần seq += 1
+        slot._header["seq"] += 1
+        slot._metrics["seq"] += 1
+        slot._metrics["count_car"] = 9
+        assert slot.read_frame() == (1, 5.0, {"full": b"jpeg"})
+        assert slot.read_frame_info() == (1, 5.0)
+        assert slot.read_metrics()["count_car"] == 3
+        assert slot.read_stats()["updated_at"] == 0.0
+    finally:
+        slot.close()
+        slot.unlink()
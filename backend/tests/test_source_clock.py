@@ -0,0 +1,26 @@
+import time
+
+from app.services.road_services.SourceClock import SourceClock
+
+
+def test_pts_follows_native_fps_without_pacing():
+    clock = SourceClock(fps=25, realtime=False)
+    started = time.monotonic()
+    timestamps = [clock.tick() for _ in range(50)]
+    assert all(clock.wait(pts) for pts in timestamps)
+    assert time.monotonic() - started < 0.5
+    assert timestamps[:3] == [0.0, 0.04, 0.08]
+    assert abs(timestamps[-1] - 49 / 25) < 1e-9
+
+
+def test_realtime_waits_for_due_time_and_skips_when_behind():
+    clock = SourceClock(fps=20)
+    started = time.monotonic()
+    assert clock.wait(clock.tick())
+    assert clock.wait(clock.tick())
+    assert time.monotonic() - started >= 0.045
+    time.sleep(0.3)  # Xử lý chậm: các frame đã quá hạn bị bỏ qua tới khi đuổi kịp nhịp
+    plan = [clock.wait(clock.tick()) for _ in range(8)]
+    assert plan[:3] == [False] * 3
+    assert plan[-1] is True
+    assert clock.skipped == plan.count(False)
@@ -0,0 +1,45 @@
+import numpy as np
+
+from app.services.road_services.SpeedEngine import GroundProjection, SpeedEngine
+
+# Camera nhìn xiên: đoạn đường 7 m x 40 m hiện lên thành hình thang, ở xa hẹp hơn ở gần
+CALIBRATION = {
+    "image": [[100, 400], [500, 400], [350, 100], [250, 100]],
+    "world": [[0, 0], [7, 0], [7, 40], [0, 40]],
+}
+
+
+def test_homography_maps_calibration_points_and_crop_origin():
+    projection = GroundProjection.from_config(CALIBRATION, origin=(50, 80))
+    image = np.asarray(CALIBRATION["image"]) - [50, 80]
+    assert np.allclose(projection.project(image), CALIBRATION["world"], atol=1e-6)
+    assert np.allclose(GroundProjection.from_config(0.05).project([[20, 40]]), [[1, 2]])
+
+
+def test_same_real_speed_near_and_far_under_perspective():
+    projection = GroundProjection.from_config(CALIBRATION)
+    inverse = np.linalg.inv(projection.homography)
+    engine = SpeedEngine(projection, capacity=4, history=6, smoothing=1, min_span=0.5)
+    # 2 xe cùng đi 10 m/s dọc làn, 1 xe ở gần (y = 2 m) và 1 xe ở xa (y = 30 m) nên đi ít pixel hơn hẳn
+    for frame in range(8):
+        world = np.array([[2.0, 2.0 + frame], [5.0, 30.0 + frame]])
+        pixels = np.column_stack((world, np.ones(2))) @ inverse.T
+        speeds = engine.update([1, 2], pixels[:, :2] / pixels[:, 2:], timestamp=frame / 10)
+    assert np.allclose(speeds, [36, 36])
+
+
+def test_full_engine_reuses_slot_of_oldest_track():
+    engine = SpeedEngine(GroundProjection(meter_per_pixel=1.0), capacity=2, history=3)
+    engine.update([1, 2], [[0, 0], [0, 0]], timestamp=0.0)
+    engine.update([2], [[0, 0]], timestamp=1.0)
+    engine.update([3], [[0, 0]], timestamp=2.0)
+    slots = engine.store.lookup([1, 2, 3])
+    assert slots[0] == -1 and (slots[1:] >= 0).all()
+
+
+def test_tracks_beyond_capacity_get_nan_speed():
+    engine = SpeedEngine(GroundProjection(meter_per_pixel=1.0), capacity=2, history=3, smoothing=1, min_span=0.5)
+    for frame in range(3):
+        speeds = engine.update([1, 2, 3], [[frame, 0], [frame, 0], [frame, 0]], timestamp=float(frame))
+    assert np.allclose(speeds[:2], [3.6, 3.6]) and np.isnan(speeds[2])
+    assert engine.store.dropped == 3
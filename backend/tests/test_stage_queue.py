@@ -0,0 +1,37 @@
+import threading
+
+from app.services.road_services.StageQueue import StageQueue
+
+
+def test_full_queue_drops_oldest():
+    frames = StageQueue(maxsize=2)
+    for i in range(5):
+        frames.put(i)
+    assert frames.depth == 2
+    assert frames.dropped == 3
+    assert [frames.get(timeout=0), frames.get(timeout=0)] == [3, 4]
+    assert frames.get(timeout=0.01) is None
+
+
+def test_close_drains_remaining_items_then_returns_none():
+    frames = StageQueue(maxsize=3)
+    frames.put("a")
+    frames.put("b")
+    frames.close()
+    frames.put("c")  # Bị bỏ qua sau khi đóng
+    assert [frames.get(), frames.get(), frames.get()] == ["a", "b", None]
+
+
+def test_get_wakes_up_on_put_from_other_thread():
+    frames = StageQueue()
+    threading.Timer(0.05, frames.put, args=("frame",)).start()
+    assert frames.get(timeout=2) == "frame"
+
+
+def test_blocking_put_waits_for_consumer_instead_of_dropping():
+    frames = StageQueue(maxsize=1)
+    frames.put(0)
+    threading.Timer(0.05, frames.get).start()
+    frames.put(1, block=True)
+    assert frames.dropped == 0
+    assert frames.get(timeout=0) == 1
@@ -0,0 +1,18 @@
+from app.utils.stage_timer import StageTimer
+
+
+def test_stage_timer_records_context_and_manual_samples():
+    timer = StageTimer(window=3)
+    with timer.stage("inference"):
+        pass
+    for seconds in (0.001, 0.002, 0.003, 0.004):
+        timer.record("decode", seconds)
+    summary = timer.summary()
+    assert summary["inference"]["count"] == 1
+    # Cửa sổ chỉ giữ 3 mẫu gần nhất nhưng count vẫn đếm tất cả
+    assert summary["decode"]["count"] == 4
+    assert summary["decode"]["p50_ms"] == 3.0
+    assert summary["decode"]["max_ms"] == 4.0
+    assert abs(timer.stage("decode").total - 0.010) < 1e-9
+    timer.reset()
+    assert timer.summary() == {}
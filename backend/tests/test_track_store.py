@@ -0,0 +1,56 @@
+import numpy as np
+
+from app.services.road_services.TrackStore import TrackStore
+
+
+def test_assign_and_vectorized_lookup():
+    store = TrackStore(capacity=4, history=3, ttl=10)
+    slots = store.assign([5, 2, 9], frame=1, classes=[0, 1, 0])
+    assert len(store) == 3
+    assert store.lookup([9, 5, 3, 2]).tolist() == [slots[2], slots[0], -1, slots[1]]
+    assert store.classes[store.lookup([2])].tolist() == [1]
+    # id đã có giữ nguyên slot
+    assert store.assign([2, 9], frame=2).tolist() == [slots[1], slots[2]]
+
+
+def test_tracks_unseen_for_ttl_frames_are_evicted():
+    store = TrackStore(capacity=8, history=3, ttl=5)
+    store.assign([1, 2], frame=0)
+    for frame in range(1, 7):
+        store.assign([2], frame=frame)
+    assert store.lookup([1, 2]).tolist()[0] == -1
+    assert len(store) == 1 and store.evicted == 1
+    # Chạy lâu với id tăng mãi: số track không vượt quá capacity
+    for frame in range(7, 1000):
+        store.assign([frame, frame + 1000], frame=frame)
+    assert len(store) <= 8
+    assert np.count_nonzero(store.ids >= 0) == len(store)
+
+
+def test_departures_are_recorded_and_drained():
+    store = TrackStore(capacity=4, history=3, ttl=2, record_departures=True)
+    slots = store.assign([7, 8], frame=0, classes=[0, 1])
+    store.first_time[slots] = 1.0
+    store.last_time[slots] = 2.5
+    store.speeds[slots[0]] = 40.0
+    store.assign([8], frame=2)
+    store.assign([8], frame=3)
+    departures = store.drain_departures()
+    assert departures["track_id"].tolist() == [7]
+    assert departures["class_id"].tolist() == [0]
+    assert departures["last_time"].tolist() == [2.5] and departures["speed"].tolist() == [40.0]
+    assert len(store.drain_departures()["track_id"]) == 0
+
+
+def test_frame_with_more_tracks_than_capacity_drops_the_rest():
+    store = TrackStore(capacity=3, history=3, ttl=10)
+    store.assign([1], frame=0)
+    slots = store.assign([5, 6, 7, 8, 9], frame=1, classes=[0, 1, 0, 1, 0])
+    # Track 1 bị xoá trước hạn, 3 id mới đầu tiên được cấp slot, 2 id còn lại bị bỏ qua
+    assert store.lookup([1]).tolist() == [-1]
+    assert sorted(slots[:3].tolist()) == [0, 1, 2] and slots[3:].tolist() == [-1, -1]
+    assert len(store) == 3 and store.dropped == 2
+    assert store.classes[slots[:3]].tolist() == [0, 1, 0]
+    # Frame sau toàn id đã có và id mới: id đã có giữ slot, id mới không có chỗ
+    assert store.assign([5, 6, 7, 10], frame=2).tolist() == slots[:3].tolist() + [-1]
+    assert store.dropped == 3
@@ -0,0 +1,29 @@
+import numpy as np
+
+from app.services.road_services.TrafficAggregator import TrafficAggregator, histogram_quantile
+
+
+def test_histogram_quantile():
+    histogram = np.bincount([10, 20, 20, 30, 40], minlength=50)
+    assert histogram_quantile(histogram, 0.5) == 20
+    assert histogram_quantile(histogram, 0.85) == 40
+    assert histogram_quantile(np.zeros(5), 0.5) == 0
+
+
+def test_windows_are_queryable_at_any_time_and_forget_old_frames():
+    aggregator = TrafficAggregator(windows=(10, 60), buckets=10, max_speed=120)
+    # 30 giây đầu xe chạy 40 km/h, 30 giây sau 20 km/h, 10 frame/giây
+    for frame in range(600):
+        pts = frame / 10
+        speed = 40 if pts < 30 else 20
+        aggregator.add(pts, 2 if frame % 2 else 0, 1, np.full(2, speed), np.array([0, speed]))
+    last_10s = aggregator.summary(10, 59.9)
+    last_60s = aggregator.summary(60, 59.9)
+    assert last_10s["car"]["speed_p50"] == 20 and last_10s["car"]["speed_p85"] == 20
+    assert last_60s["car"]["speed_p50"] == 20 and last_60s["car"]["speed_p85"] == 40
+    assert last_60s["car"]["speed_mean"] == 30
+    # Frame 0 xe không tính vào số xe trung bình, tốc độ 0 km/h bị bỏ qua
+    assert last_10s["car"]["count"] == 2
+    assert last_10s["motor"]["speed_samples"] == 100
+    assert last_10s["car"]["frames"] == 100
+    assert aggregator.summary_array(59.9).shape == (2, 2, 6)
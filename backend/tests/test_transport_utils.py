@@ -0,0 +1,20 @@
+import numpy as np
+
+from app.utils.transport_utils import region_crop_box, inference_size_for, shared_inference_size
+
+
+def test_crop_box_follows_region_and_inference_size_keeps_crop_aspect():
+    region = np.array([[50, 400], [50, 265], [370, 130], [540, 130], [490, 400]])
+    crop_box = region_crop_box(region, frame_size=(600, 400), margin=10)
+    # Nới margin nhưng không vượt ra ngoài frame
+    assert crop_box == (40, 120, 550, 400)
+    assert inference_size_for(crop_box, 480) == (288, 480)
+    assert inference_size_for(crop_box, 320) == (192, 320)
+    # Không phóng to vùng crop nhỏ hơn size, chỉ làm tròn lên bội số stride
+    assert inference_size_for(crop_box, 1024) == (288, 512)
+    assert inference_size_for(crop_box, (640, 640)) == (640, 640)
+
+
+def test_shared_inference_size_fits_every_crop():
+    assert shared_inference_size([(288, 480), (224, 480)]) == (288, 480)
+    assert shared_inference_size([(288, 480), (480, 256)]) == (480, 480)
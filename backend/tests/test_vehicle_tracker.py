@@ -0,0 +1,52 @@
+import numpy as np
+
+from app.services.road_services.VehicleTracker import VehicleTracker
+
+
+class MovingTracker:
+    """Giả lập 1 track id 7 (car) đi sang phải 10 pixel mỗi frame"""
+    def __init__(self):
+        self.x = 0
+
+    def update(self, detections):
+        self.x += 10
+        return np.array([[self.x, 0, self.x + 20, 20, 7, 0.9, 0, 0]], dtype=np.float32)
+
+    def predict(self, shifts=None):
+        return self.update(None)
+
+
+def test_speed_from_history_including_predicted_frames():
+    tracker = VehicleTracker(meter_per_pixel=0.1, fps=10, max_hist=6, max_speed=120, tracker=MovingTracker())
+    tracker.update(None)
+    # Frame không detect (track được đẩy bằng Kalman) vẫn tính vào lịch sử tốc độ
+    for _ in range(4):
+        tracker.predict()
+    # Mới có 0.4 giây lịch sử (< SPEED_MIN_SPAN)
+    assert np.isnan(tracker.speeds).all()
+    tracker.update(None)
+    # 10 pixel * 0.1 m mỗi frame, 10 fps = 10 m/s = 36 km/h
+    assert np.allclose(tracker.speeds, [36])
+    tracker.update(None)
+    assert np.allclose(tracker.speeds, [36])
+    assert tracker.ids.tolist() == [7]
+    assert tracker.classes.tolist() == [0]
+
+
+def test_empty_frame_clears_current_tracks():
+    class EmptyTracker:
+        def update(self, detections):
+            return np.empty((0, 8), np.float32)
+
+    tracker = VehicleTracker(meter_per_pixel=0.1, tracker=EmptyTracker())
+    tracker.update(None)
+    assert len(tracker.ids) == 0
+    assert tracker.boxes.shape == (0, 4)
+
+
+def test_speed_uses_frame_timestamps():
+    tracker = VehicleTracker(meter_per_pixel=0.1, fps=10, max_hist=5, max_speed=120, tracker=MovingTracker())
+    # Frame bị bỏ qua giữa chừng: 10 pixel * 0.1 m mỗi 0.5 giây theo PTS = 2 m/s = 7.2 km/h
+    for timestamp in (0.0, 0.5, 1.0, 1.5, 2.0):
+        tracker.update(None, timestamp=timestamp)
+    assert np.allclose(tracker.speeds, [7.2])
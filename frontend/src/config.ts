@@ -64,6 +64,9 @@ class UserConfig {
 // ============================================
 // WebSocket Configuration
 // ============================================
+// Frame variants produced by the backend worker (see FRAME_VARIANTS in backend config)
+export type FrameVariant = "thumb" | "medium" | "full";
+
 class WebSocketConfig {
   // WebSocket Paths
   CHAT_PATH = "/ws/chat";
@@ -75,10 +78,11 @@ class WebSocketConfig {
     return `${apiConfig.API_WS_BASE}${this.CHAT_PATH}`;
   }
 
-  framesWs(roadName: string) {
-    return `${apiConfig.API_WS_BASE}${this.FRAMES_PATH}/${encodeURIComponent(
+  framesWs(roadName: string, variant?: FrameVariant) {
+    const url = `${apiConfig.API_WS_BASE}${this.FRAMES_PATH}/${encodeURIComponent(
       roadName
     )}`;
+    return variant ? `${url}?variant=${variant}` : url;
   }
 
   infoWs(roadName: string) {
@@ -114,7 +118,8 @@ export const API_WS_BASE = apiConfig.API_WS_BASE;
 
 export const endpoints = {
   roadNames: `${apiConfig.API_HTTP_BASE}/roads_name`,
-  framesWs: (roadName: string) => wsConfig.framesWs(roadName),
+  framesWs: (roadName: string, variant?: FrameVariant) =>
+    wsConfig.framesWs(roadName, variant),
   infoWs: (roadName: string) => wsConfig.infoWs(roadName),
   chatWs: wsConfig.CHAT_WS,
 };
@@ -1,5 +1,5 @@
 import { useEffect, useRef, useState, useCallback } from "react";
-import { endpoints } from "../config";
+import { endpoints, type FrameVariant } from "../config";
 
 interface WebSocketHookOptions {
   reconnectInterval?: number;
@@ -373,7 +373,10 @@ export const useMultipleTrafficInfo = (roadNames: string[]) => {
 };
 
 // Hook for multiple frame streams
-export const useMultipleFrameStreams = (roadNames: string[]) => {
+export const useMultipleFrameStreams = (
+  roadNames: string[],
+  variant?: FrameVariant
+) => {
   const [frameData, setFrameData] = useState<Record<string, { frame: string }>>(
     {}
   );
@@ -414,7 +417,9 @@ export const useMultipleFrameStreams = (roadNames: string[]) => {
     roadNames.forEach((road) => {
       if (currentSockets[road]) return;
       const token = localStorage.getItem("access_token");
-      const wsUrl = token ? `${endpoints.framesWs(road)}?token=${encodeURIComponent(token)}` : endpoints.framesWs(road);
+      const baseUrl = endpoints.framesWs(road, variant);
+      const separator = baseUrl.includes("?") ? "&" : "?";
+      const wsUrl = token ? `${baseUrl}${separator}token=${encodeURIComponent(token)}` : baseUrl;
       const ws = new WebSocket(wsUrl);
       ws.binaryType = "arraybuffer"; // Set to handle binary data
       currentSockets[road] = ws;
@@ -465,7 +470,7 @@ export const useMultipleFrameStreams = (roadNames: string[]) => {
       socketsRef.current = {};
     };
     // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, [JSON.stringify(roadNames)]);
+  }, [JSON.stringify(roadNames), variant]);
 
   const isAnyConnected = Object.values(connections).some(Boolean);
   const areAllConnected =
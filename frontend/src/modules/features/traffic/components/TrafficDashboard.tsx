@@ -67,7 +67,8 @@ const TrafficDashboard = () => {
 
   // Use WebSocket for traffic data
   const { trafficData, isAnyConnected } = useMultipleTrafficInfo(allowedRoads);
-  const { frameData: frames } = useMultipleFrameStreams(allowedRoads);
+  // The grid only needs the medium variant; the full-size frame is streamed by the modal
+  const { frameData: frames } = useMultipleFrameStreams(allowedRoads, "medium");
 
   const loading = !isAnyConnected;
 
@@ -15,6 +15,7 @@ import {
 } from "lucide-react";
 import { motion, AnimatePresence } from "framer-motion";
 import VideoModal from "./VideoModal";
+import { useMultipleFrameStreams } from "../../../../hooks/useWebSocket";
 
 interface VehicleData {
   count_car: number;
@@ -54,6 +55,11 @@ const VideoMonitor = ({
 }: VideoMonitorProps) => {
   const [modalOpen, setModalOpen] = useState(false);
   const [modalRoadName, setModalRoadName] = useState<string>("");
+  // Stream the full-size variant only while the modal is open
+  const { frameData: modalFrames } = useMultipleFrameStreams(
+    modalOpen && modalRoadName ? [modalRoadName] : [],
+    "full"
+  );
 
   const getTrafficStatus = (roadName: string) => {
     const data = trafficData[roadName];
@@ -301,7 +307,11 @@ const VideoMonitor = ({
         }}
         roadName={modalRoadName}
         frameData={
-          modalRoadName ? frameData[modalRoadName]?.frame || null : null
+          modalRoadName
+            ? modalFrames[modalRoadName]?.frame ||
+              frameData[modalRoadName]?.frame ||
+              null
+            : null
         }
         trafficData={modalRoadName ? trafficData[modalRoadName] : undefined}
       />